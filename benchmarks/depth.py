@@ -0,0 +1,94 @@
+# Parses programs nested thousands of levels deep, in each of the ways the
+# grammar nests, at the default recursion limit. Nesting is only limited by
+# memory, so every depth has to parse, and the time per level has to stay flat
+# as the depth grows.
+#
+#     python benchmarks/depth.py                          # exit 1 on failures
+#     python benchmarks/depth.py --depth 10000 --depth 1000000 --shape parens
+#
+# Only the front end is measured: CPython's own compile() and ast.unparse()
+# still recurse, and give up on trees this deep.
+import argparse
+import gc
+import math
+import os
+import sys
+import time
+from typing import Callable, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from scy.backend import parse  # noqa: E402
+from scy.utils import count_nodes, tree_depth  # noqa: E402
+
+DEFAULT_DEPTHS = [1000, 10000, 100000]
+
+# Shape name -> function building a program nested that many levels deep
+SHAPES: dict[str, Callable[[int], str]] = {
+    'parens':    lambda depth: 'x = ' + '(' * depth + 'a' + ')' * depth + ';\n',
+    'operands':  lambda depth: 'x = ' + 'a + (b * ' * depth + 'c' + ')' * depth + ';\n',
+    'prefix':    lambda depth: 'x = ' + '- ' * depth + 'a;\n',
+    'calls':     lambda depth: 'f(' * depth + 'a' + ')' * depth + ';\n',
+    'named':     lambda depth: 'x = (' + 'a = ' * depth + 'b);\n',
+    'comprehensions': lambda depth: 'x = ' + '[' * depth + 'a' + ' for (a : b)]' * depth + ';\n',
+    'blocks':    lambda depth: 'if (a) {\n' * depth + 'b;\n' + '}\n' * depth,
+    'braceless': lambda depth: 'while (a) ' * depth + 'b;\n',
+    'functions': lambda depth: 'def f() {\n' * depth + 'return 1;\n' + '}\n' * depth,
+    'elif':      lambda depth: 'if (a) { b; }\n' + 'else if (a) { b; }\n' * depth,
+}
+
+
+def measure(source: str, name: str, repeat: int) -> tuple[float, int, int]:
+    best = math.inf
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            tree = parse(source, name)
+            best = min(best, time.perf_counter() - start)
+    finally:
+        if enabled:
+            gc.enable()
+    return best, count_nodes(tree), tree_depth(tree)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser('python benchmarks/depth.py')
+    parser.add_argument('-d', '--depth', type=int, action='append',
+                        help=f'nesting depth to parse; may be repeated (default: {DEFAULT_DEPTHS})')
+    parser.add_argument('-s', '--shape', choices=SHAPES, action='append', help='only parse these shapes')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='runs per input; the fastest is kept')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed excess over a linear exponent (default: 0.25)')
+    args = parser.parse_args(argv)
+    depths = sorted(args.depth or DEFAULT_DEPTHS)
+
+    print(f'recursion limit {sys.getrecursionlimit()}')
+    width = max(map(len, SHAPES))
+    print(f'{"shape":<{width}} {"depth":>8} {"nodes":>9} {"tree depth":>10} {"parse":>10} {"per level":>10}')
+    ok = True
+    for shape in args.shape or SHAPES:
+        times = []
+        for depth in depths:
+            try:
+                elapsed, nodes, levels = measure(SHAPES[shape](depth), f'{shape}-{depth}', args.repeat)
+            except (RecursionError, MemoryError) as e:
+                print(f'{shape:<{width}} {depth:>8}  FAILED: {type(e).__name__}: {e}')
+                ok = False
+                break
+            times.append(elapsed)
+            print(f'{shape:<{width}} {depth:>8} {nodes:>9} {levels:>10} {elapsed * 1000:>8.1f}ms '
+                  f'{elapsed / depth * 1e6:>8.2f}us')
+        else:
+            if len(depths) > 1 and times[0] > 0:
+                exponent = math.log(times[-1] / times[0]) / math.log(depths[-1] / depths[0])
+                status = 'ok' if exponent <= 1 + args.tolerance else 'NONLINEAR'
+                ok = ok and status == 'ok'
+                print(f'{shape:<{width}} exponent {exponent:.2f}  {status}')
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
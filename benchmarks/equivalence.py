@@ -0,0 +1,171 @@
+# Checks that the working tree's front end parses exactly like another
+# revision's: the same trees with the same positions, and the same syntax
+# errors, for the examples, generated programs and random token soup.
+# Parser rewrites are meant to change nothing, so any difference is a bug.
+#
+#     python benchmarks/equivalence.py                    # against HEAD; exit 1 on differences
+#     python benchmarks/equivalence.py --against v0.1.1 --seed 7 --cases 5000 --exclude augmented
+#     python benchmarks/equivalence.py --against-dir ../Scython-main
+#
+# Grammar changes show up as differences too, for the cases that use them;
+# --exclude leaves out syntax the other revision doesn't have yet.
+import argparse
+import glob
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tarfile
+import tempfile
+from typing import Any, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from generate import generate  # noqa: E402
+
+# Mode ('eval', 'exec' or 'recover') and source
+Case = tuple[str, str]
+
+EXPRESSION_TOKENS = [
+    'a', 'b', '1', '2.5', '"s"', 'true', 'x.y', 'f(', ',', '(', ')', '[', ']', '{', '}', ':', 'for',
+    '-', '+', '~', '!', '*', '/', '//', '%', '@', '**', '|', '^', '&', '<<', '>>', '||', '&&',
+    '<', '<=', '>', '>=', '==', '!=', 'is', 'not', 'in', 'await', 'yield', 'from', '=',
+]
+LEAVES = ['a', 'b', '1', 'f(a)', 'x.y', '"s"']
+INFIX_OPERATORS = EXPRESSION_TOKENS[19:41] + ['is not', 'not in']
+PREFIX_OPERATORS = ['-', '+', '~', '!', 'await ']
+STATEMENT_TOKENS = [
+    'x', 'y', '1', '0b1', '0b2', '012', '"s"', '"\\g"', '"open', "'''t\nq'''", '(', ')', '{', '}', ';', ';', ';',
+    '=', '+=', '+', '*', '$', 'def', 'f', 'class', 'C', 'if', 'while', 'for', 'return', 'else', ':', ',', '.',
+    'import', 'from', 'yield', '\n', 'lambda', '#c\n', '[', ']',
+]
+# Syntax added later than some revisions worth comparing with -> a token only
+# it uses, which marks the examples to skip, and the tokens to leave out of the
+# random cases. Braces, ':' and 'for' start comprehensions in expressions, so
+# without comprehensions the random statements have no blocks; the examples
+# and generated programs still do.
+FEATURES: dict[str, tuple[str, list[str]]] = {
+    'comprehensions': ('[', ['[', ']', '{', '}', ':', 'for']),
+    'augmented':      ('+=', ['+=']),
+}
+
+# Runs inside the tree being checked, so it can only use what every revision has
+WORKER = r'''
+import ast, json, sys
+sys.path.insert(0, sys.argv[1])
+from scy.backend import parse, parse_recovering
+
+def error(e):
+    return [type(e).__name__, getattr(e, 'msg', str(e)), getattr(e, 'lineno', None), getattr(e, 'offset', None)]
+
+results = []
+for mode, source in json.load(sys.stdin):
+    try:
+        if mode == 'recover':
+            errors = parse_recovering(source, '<case>')[1]
+            results.append([error(e) for e in errors])
+        else:
+            results.append(ast.dump(parse(source, '<case>', mode), include_attributes=True))
+    except (SyntaxError, RecursionError, ValueError) as e:
+        results.append(error(e))
+json.dump(results, sys.stdout)
+'''
+
+
+def expression(rng: random.Random, level: int = 0) -> str:
+    choice = rng.random()
+    if level > 3 or choice < 0.3:
+        return rng.choice(LEAVES)
+    if choice < 0.6:
+        return f'{expression(rng, level + 1)} {rng.choice(INFIX_OPERATORS)} {expression(rng, level + 1)}'
+    if choice < 0.8:
+        return rng.choice(PREFIX_OPERATORS) + expression(rng, level + 1)
+    return f'({expression(rng, level + 1)})'
+
+
+def make_cases(seed: int, count: int, excluded: list[str]) -> list[Case]:
+    rng = random.Random(seed)
+    markers = [FEATURES[feature][0] for feature in excluded]
+    left_out = {token for feature in excluded for token in FEATURES[feature][1]}
+    expression_tokens = [token for token in EXPRESSION_TOKENS if token not in left_out]
+    statement_tokens = [token for token in STATEMENT_TOKENS if token not in left_out]
+    cases: list[Case] = []
+    for path in sorted(glob.glob(os.path.join(ROOT, 'examples', '*.scy'))):
+        with open(path, encoding='utf-8') as fp:
+            source = fp.read()
+        if not any(marker in source for marker in markers):
+            cases += [('exec', source), ('recover', source)]
+    for index in range(max(1, count // 500)):
+        cases.append(('exec', generate(50, rng.randint(1, 6), seed + index)))
+    for _ in range(count):
+        # Mostly invalid, to compare the errors
+        soup = ' '.join(rng.choice(expression_tokens) for _ in range(rng.randint(1, 14)))
+        valid = expression(rng)
+        for source in (soup, valid):
+            cases += [('eval', source), ('exec', f'def g() {{ z = {source}; }}\n')]
+        statements = ' '.join(rng.choice(statement_tokens) for _ in range(rng.randint(1, 40)))
+        cases += [('exec', statements), ('recover', statements)]
+    return cases
+
+
+def run(root: str, cases: list[Case]) -> list[Any]:
+    # Isolated, so neither the current directory nor PYTHONPATH can supply another scy
+    process = subprocess.run([sys.executable, '-I', '-c', WORKER, root], input=json.dumps(cases),
+                             capture_output=True, text=True)
+    if process.returncode:
+        raise RuntimeError(f'parsing with {root} failed:\n{process.stderr}')
+    return json.loads(process.stdout)
+
+
+def export(revision: str, directory: str) -> None:
+    archive = subprocess.run(['git', 'archive', '--format=tar', revision, 'scy'],
+                             cwd=ROOT, capture_output=True, check=True).stdout
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(directory)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser('python benchmarks/equivalence.py')
+    parser.add_argument('--against', metavar='REVISION', default='HEAD',
+                        help='git revision to compare the working tree with (default: HEAD)')
+    parser.add_argument('--against-dir', metavar='PATH', help='compare with the scy package under PATH instead')
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    parser.add_argument('-n', '--cases', type=int, default=2000, help='random cases of each kind')
+    parser.add_argument('-x', '--exclude', choices=FEATURES, action='append', default=[],
+                        help='leave out syntax the other revision lacks; may be repeated')
+    parser.add_argument('--show', type=int, default=5, help='differences to print')
+    args = parser.parse_args(argv)
+    cases = make_cases(args.seed, args.cases, args.exclude)
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            if args.against_dir is None:
+                export(args.against, directory)
+                reference = run(directory, cases)
+                name = args.against
+            else:
+                reference = run(os.path.abspath(args.against_dir), cases)
+                name = args.against_dir
+        current = run(ROOT, cases)
+    except subprocess.CalledProcessError as e:
+        print(f"can't export {args.against}: {e.stderr.decode(errors='replace').strip()}", file=sys.stderr)
+        return 2
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    differences = [index for index in range(len(cases)) if reference[index] != current[index]]
+    for index in differences[:args.show]:
+        mode, source = cases[index]
+        print(f'{mode}: {source[:200]!r}')
+        print(f'  {name}: {str(reference[index])[:300]}')
+        print(f'  working tree: {str(current[index])[:300]}')
+    print(f'{len(differences)} of {len(cases)} cases differ from {name}')
+    return 1 if differences else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,168 @@
+# Times each front-end phase separately on the examples and on generated programs.
+#
+#     python benchmarks/frontend.py                       # report
+#     python benchmarks/frontend.py --scaling             # also check for nonlinear growth
+#     python benchmarks/frontend.py --save-baseline b.json
+#     python benchmarks/frontend.py --compare b.json      # exit 1 on regressions
+import argparse
+import ast
+import gc
+import glob
+import json
+import math
+import os
+import platform
+import sys
+import time
+import warnings
+from typing import Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from generate import generate  # noqa: E402
+from scy.parser import parse_tree  # noqa: E402
+from scy.tokenizer import tokenize  # noqa: E402
+from scy.utils import count_nodes  # noqa: E402
+
+PHASES = ('tokenize', 'parse', 'compile', 'unparse')
+# Baseline comparisons ignore phases faster than this; they're mostly noise
+MIN_COMPARED_TIME = 0.001
+
+Result = dict[str, float]
+
+
+def measure(source: str, filename: str, repeat: int = 5) -> Result:
+    try:
+        mode = 'exec'
+        parse_tree(tokenize(source, filename), mode, filename, source)
+    except SyntaxError:
+        # Some examples are a single expression
+        mode = 'eval'
+    best = dict.fromkeys(PHASES, math.inf)
+    # Like timeit, keep the cyclic GC out of it; its cost grows with the number
+    # of live objects, which would otherwise show up as nonlinear scaling
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', SyntaxWarning)
+            for _ in range(repeat):
+                start = time.perf_counter()
+                tokens = tokenize(source, filename)
+                tokenized = time.perf_counter()
+                tree = parse_tree(tokens, mode, filename, source)
+                parsed = time.perf_counter()
+                compile(tree, filename, mode, dont_inherit=True)
+                compiled = time.perf_counter()
+                ast.unparse(tree)
+                end = time.perf_counter()
+                for phase, elapsed in zip(PHASES, (tokenized - start, parsed - tokenized,
+                                                   compiled - parsed, end - compiled)):
+                    best[phase] = min(best[phase], elapsed)
+    finally:
+        if enabled:
+            gc.enable()
+    return {'bytes': len(source), 'tokens': len(tokens), 'nodes': count_nodes(tree), **best}
+
+
+def rate(count: float, seconds: float) -> str:
+    if not seconds:
+        return '-'
+    return f'{count / seconds / 1000:,.0f}k/s'
+
+
+def report(results: dict[str, Result]) -> None:
+    width = max(len(name) for name in results)
+    print(f'{"benchmark":<{width}}  {"tokens":>8}  {"nodes":>8}  '
+          + '  '.join(f'{phase:>9}' for phase in PHASES) + f'  {"tokens":>10}  {"nodes":>10}')
+    for name, result in results.items():
+        print(f'{name:<{width}}  {result["tokens"]:>8}  {result["nodes"]:>8}  '
+              + '  '.join(f'{result[phase] * 1000:>7.2f}ms' for phase in PHASES)
+              + f'  {rate(result["tokens"], result["tokenize"]):>10}  {rate(result["nodes"], result["parse"]):>10}')
+
+
+def run_benchmarks(statements: int, depth: int, repeat: int, examples: bool) -> dict[str, Result]:
+    results = {}
+    if examples:
+        for path in sorted(glob.glob(os.path.join(ROOT, 'examples', '*.scy'))):
+            with open(path, encoding='utf-8') as fp:
+                source = fp.read()
+            results[os.path.basename(path)] = measure(source, path, repeat)
+    for size in (statements, statements * 4):
+        name = f'generated-{size}x{depth}'
+        results[name] = measure(generate(size, depth), name, repeat)
+    return results
+
+
+def check_scaling(statements: int, depth: int, repeat: int, tolerance: float) -> bool:
+    # Fit the exponent of time against token count between the smallest and
+    # largest input; 1.0 is linear
+    sizes = [statements * factor for factor in (1, 2, 4, 8)]
+    results = [measure(generate(size, depth), f'scaling-{size}', repeat) for size in sizes]
+    ok = True
+    print(f'\nscaling over {sizes[0]}..{sizes[-1]} statements (depth {depth}):')
+    for phase in PHASES:
+        first, last = results[0], results[-1]
+        exponent = math.log(last[phase] / first[phase]) / math.log(last['tokens'] / first['tokens'])
+        per_token = ', '.join(f'{result[phase] / result["tokens"] * 1e9:.0f}' for result in results)
+        status = 'ok' if exponent <= 1 + tolerance else 'NONLINEAR'
+        ok = ok and status == 'ok'
+        print(f'  {phase:<9} exponent {exponent:.2f}  ns/token {per_token}  {status}')
+    return ok
+
+
+def compare(results: dict[str, Result], baseline: dict[str, Result], threshold: float) -> bool:
+    ok = True
+    print('\ncompared to baseline:')
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        changes = []
+        for phase in PHASES:
+            before = baseline[name].get(phase)
+            if not before:
+                continue
+            ratio = result[phase] / before
+            mark = ''
+            if ratio > 1 + threshold and before >= MIN_COMPARED_TIME:
+                mark = ' REGRESSED'
+                ok = False
+            changes.append(f'{phase} {ratio - 1:+.0%}{mark}')
+        print(f'  {name}: ' + ', '.join(changes))
+    return ok
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser('python benchmarks/frontend.py')
+    parser.add_argument('-n', '--statements', type=int, default=250,
+                        help='top-level statements in the generated programs')
+    parser.add_argument('-d', '--depth', type=int, default=4, help='block nesting depth of generated programs')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='runs per benchmark; the fastest is kept')
+    parser.add_argument('--no-examples', dest='examples', action='store_false')
+    parser.add_argument('--scaling', action='store_true', help='fail if a phase grows faster than linearly')
+    parser.add_argument('--scaling-tolerance', type=float, default=0.25,
+                        help='allowed excess over a linear exponent (default: 0.25)')
+    parser.add_argument('--save-baseline', metavar='PATH', help='write the results as JSON')
+    parser.add_argument('--compare', metavar='PATH', help='compare against results saved with --save-baseline')
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help='slowdown that counts as a regression (default: 0.15)')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.statements, args.depth, args.repeat, args.examples)
+    report(results)
+    ok = True
+    if args.scaling:
+        ok = check_scaling(args.statements, args.depth, args.repeat, args.scaling_tolerance) and ok
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as fp:
+            baseline = json.load(fp)
+        ok = compare(results, baseline['results'], args.threshold) and ok
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as fp:
+            json.dump({'python': platform.python_version(), 'results': results}, fp, indent=2)
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,130 @@
+# Generates synthetic Scython programs for the benchmarks.
+#
+#     python benchmarks/generate.py -n 5000 -d 6 -o big.scy
+#
+# Output size grows linearly with the statement count: every top-level
+# statement is either a simple statement or a nest of blocks exactly `depth`
+# levels deep with a few statements on each level.
+import argparse
+import random
+import sys
+from typing import Optional
+
+BINARY_OPERATORS = [
+    '+', '-', '*', '/', '//', '%', '**', '|', '^', '&', '<<', '>>', '||', '&&',
+    '<', '<=', '>', '>=', '==', '!=', 'is', 'in', 'is not', 'not in',
+]
+UNARY_OPERATORS = ['-', '+', '~']
+LEAVES = [
+    'a', 'b', 'value', 'self.count', '0', '1', '42', '0x1f', '0b101', '2.5', '1_000',
+    '"text"', "'single'", "r'raw\\d'", '"esc\\n"', 'true', 'false', 'None', '...',
+]
+NAMES = ['a', 'b', 'value', 'total', 'self.count']
+CALLEES = ['f', 'print', 'obj.method', 'math.sqrt']
+BLOCKS = ['if', 'while', 'for_in', 'for', 'def', 'class']
+
+
+class ProgramGenerator:
+    random: random.Random
+    depth: int
+    expression_depth: int
+
+    def __init__(self, seed: int = 0, depth: int = 3, expression_depth: int = 3) -> None:
+        self.random = random.Random(seed)
+        self.depth = depth
+        self.expression_depth = expression_depth
+
+    def expression(self, level: int = 0) -> str:
+        choice = self.random.random()
+        if level >= self.expression_depth or choice < 0.3:
+            return self.random.choice(LEAVES)
+        if choice < 0.6:
+            operator = self.random.choice(BINARY_OPERATORS)
+            return f'{self.expression(level + 1)} {operator} {self.expression(level + 1)}'
+        if choice < 0.7:
+            return f'({self.random.choice(UNARY_OPERATORS)}{self.expression(level + 1)})'
+        if choice < 0.8:
+            return f'({self.expression(level + 1)})'
+        args = ', '.join(self.expression(level + 1) for _ in range(self.random.randint(0, 3)))
+        return f'{self.random.choice(CALLEES)}({args})'
+
+    def simple_statement(self, in_function: bool, in_loop: bool) -> str:
+        choice = self.random.random()
+        if in_function and choice < 0.1:
+            return f'return {self.expression()};'
+        if in_loop and choice < 0.15:
+            return self.random.choice(['break;', 'continue;'])
+        if choice < 0.2:
+            return 'import os.path as p, sys;'
+        if choice < 0.6:
+            return f'{self.random.choice(NAMES)} = {self.expression()};'
+        return f'{self.expression()};'
+
+    def nested_statement(self, lines: list[str], depth: Optional[int] = None) -> None:
+        # Built level by level rather than recursively, so any depth works
+        if depth is None:
+            depth = self.depth
+        in_function = in_loop = False
+        closers = []
+        for level in range(depth):
+            indent = '    ' * level
+            body = indent + '    '
+            kind = self.random.choice(BLOCKS)
+            if kind == 'if':
+                lines.append(f'{indent}if ({self.expression()}) {{')
+                closers.append([f'{indent}}} else {{', body + self.simple_statement(in_function, in_loop), f'{indent}}}'])
+            elif kind == 'while':
+                lines.append(f'{indent}while ({self.expression()}) {{')
+                in_loop = True
+                closers.append([body + 'break;', f'{indent}}}'])
+            elif kind == 'for_in':
+                lines.append(f'{indent}for (item : {self.random.choice(NAMES)}) {{')
+                in_loop = True
+                closers.append([f'{indent}}}'])
+            elif kind == 'for':
+                lines.append(f'{indent}for (i = 0; i < {self.random.choice(NAMES)}; i = i + 1) {{')
+                in_loop = True
+                closers.append([f'{indent}}}'])
+            elif kind == 'def':
+                lines.append(f'{indent}def function{level}(a, b, c) {{')
+                in_function = True
+                in_loop = False
+                closers.append([f'{indent}}}'])
+            else:
+                lines.append(f'{indent}class Class{level}(object) {{')
+                in_function = in_loop = False
+                closers.append([f'{indent}}}'])
+            for _ in range(self.random.randint(1, 3)):
+                lines.append(body + self.simple_statement(in_function, in_loop))
+        for closer in reversed(closers):
+            lines.extend(closer)
+
+    def program(self, statements: int) -> str:
+        lines = []
+        for _ in range(statements):
+            if self.depth and self.random.random() < 0.5:
+                self.nested_statement(lines)
+            else:
+                lines.append(self.simple_statement(False, False))
+        lines.append('')
+        return '\n'.join(lines)
+
+
+def generate(statements: int = 100, depth: int = 3, seed: int = 0) -> str:
+    return ProgramGenerator(seed, depth).program(statements)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser('python benchmarks/generate.py')
+    parser.add_argument('-n', '--statements', type=int, default=100, help='number of top-level statements')
+    parser.add_argument('-d', '--depth', type=int, default=3, help='block nesting depth')
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', type=argparse.FileType('w'), default='-')
+    args = parser.parse_args(argv)
+    with args.output:
+        args.output.write(generate(args.statements, args.depth, args.seed))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+# Checks how much importing costs `python -m scy -M compile_only`, using the
+# interpreter's own -X importtime report. Fails if startup goes over budget or
+# if modules that compile_only shouldn't need get imported.
+#
+#     python benchmarks/startup.py                  # exit 1 if over budget
+#     python benchmarks/startup.py --budget 30 --top 15
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SCRIPT = os.path.join(ROOT, 'examples', 'squares.scy')
+
+# Modules that only other modes (or nothing at all) need; any of these showing
+# up means an import crept back onto the compile path
+FORBIDDEN = (
+    'argparse',
+    'dataclasses',
+    'importlib.abc',
+    'inspect',
+    'py_compile',
+    'scy.importer',
+    'scy.optimizer',
+    'shutil',
+    'tempfile',
+)
+
+# Microseconds of import time spent in each module, by name
+Imports = dict[str, int]
+
+
+def import_times(arguments: list[str], cache_dir: str) -> Imports:
+    env = dict(os.environ, PYTHONPATH=ROOT, PYTHONPYCACHEPREFIX=cache_dir)
+    # Without bytecode every import would be timed compiling its source
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    result = subprocess.run([sys.executable, '-X', 'importtime', *arguments], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+    times: Imports = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        own, _, name = line[len('import time:'):].split('|')
+        if own.strip().isdigit():
+            times[name.strip()] = int(own)
+    return times
+
+
+def fastest(arguments: list[str], cache_dir: str, repeat: int) -> Imports:
+    # The first run writes the bytecode; after that, keep the quickest run
+    import_times(arguments, cache_dir)
+    runs = [import_times(arguments, cache_dir) for _ in range(repeat)]
+    return min(runs, key=lambda times: sum(times.values()))
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser('python benchmarks/startup.py')
+    parser.add_argument('script', nargs='?', default=DEFAULT_SCRIPT)
+    parser.add_argument('-b', '--budget', type=float, default=40.0,
+                        help='milliseconds of imports allowed on top of a bare interpreter')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='runs to measure; the fastest is kept')
+    parser.add_argument('--top', type=int, default=10, help='slowest modules to list')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        bare = fastest(['-c', 'pass'], cache_dir, args.repeat)
+        scy = fastest(['-m', 'scy', '-M', 'compile_only', args.script], cache_dir, args.repeat)
+    extra = {name: time for (name, time) in scy.items() if name not in bare}
+    overhead = (sum(scy.values()) - sum(bare.values())) / 1000
+
+    print(f'bare interpreter: {sum(bare.values()) / 1000:8.2f}ms')
+    print(f'-M compile_only:  {sum(scy.values()) / 1000:8.2f}ms  ({overhead:+.2f}ms, budget {args.budget:.2f}ms)')
+    print(f'slowest of the {len(extra)} modules a bare interpreter does not import:')
+    for name, time in sorted(extra.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f'    {time / 1000:8.2f}ms  {name}')
+
+    status = 0
+    forbidden = [name for name in FORBIDDEN if name in scy]
+    if forbidden:
+        print(f'compile_only imported {", ".join(forbidden)}', file=sys.stderr)
+        status = 1
+    if overhead > args.budget:
+        print(f'startup is {overhead - args.budget:.2f}ms over budget', file=sys.stderr)
+        status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
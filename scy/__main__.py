@@ -1,15 +1,65 @@
-import argparse
 import ast
 import builtins
+import importlib
+import os
 import sys
-import time
+from types import SimpleNamespace
+from typing import Any, Optional
 
-from scy.backend import parse
+from scy.backend import parse, parse_file
 from scy.utils import count_nodes
 
-parser = argparse.ArgumentParser('python -m scy')
-parser.add_argument('script', type=argparse.FileType('r'))
-parser.add_argument('-M', '--mode', choices=['auto', 'run', 'dump', 'py', 'compile_only'], default='auto')
+PROG = 'python -m scy'
+MODES = ['auto', 'run', 'dump', 'py', 'compile_only', 'watch', 'stats']
+
+
+def make_parser() -> Any:
+    import argparse
+    parser = argparse.ArgumentParser(PROG)
+    parser.add_argument('script', help="a .scy file, or '-' to read standard input (except in watch and stats modes)")
+    parser.add_argument('-M', '--mode', choices=MODES, default='auto')
+    parser.add_argument('-O', '--optimize-ast', action='store_true',
+                        help='fold constants and drop dead branches before compiling')
+    parser.add_argument('--interval', type=float, default=0.5, help='seconds between checks for changes in watch mode')
+    parser.add_argument('--json', metavar='PATH', help="also write stats mode's report as JSON ('-' for stdout)")
+    parser.add_argument('--no-tracemalloc', dest='tracemalloc', action='store_false',
+                        help='skip memory tracking in stats mode, which slows every phase down')
+    return parser
+
+
+def quick_args(argv: list[str]) -> Optional[SimpleNamespace]:
+    # Reads the plain 'SCRIPT [-M MODE] [-O]' command lines without argparse,
+    # which together with the gettext, locale and shutil imports it triggers
+    # takes longer than compiling a small script. Anything else returns None
+    # and goes through argparse, which also reports the errors.
+    args = SimpleNamespace(script=None, mode='auto', optimize_ast=False, interval=0.5, json=None, tracemalloc=True)
+    script = None
+    arguments = iter(argv)
+    for arg in arguments:
+        if arg in ('-O', '--optimize-ast'):
+            args.optimize_ast = True
+        elif arg in ('-M', '--mode'):
+            args.mode = next(arguments, None)
+            if args.mode not in MODES:
+                return None
+        elif script is None and arg[:1] not in ('', '-'):
+            script = arg
+        else:
+            return None
+    if script is None:
+        return None
+    args.script = script
+    return args
+
+
+# 'scy <command> ...' hands the remaining arguments to <module>.main
+SUBCOMMANDS = {
+    'build':      'scy.build',
+    'cache':      'scy.cache',
+    'check':      'scy.check',
+    'compileall': 'scy.compileall',
+    'server':     'scy.server',
+}
 
 
 # This was copied from the runpy module
@@ -41,27 +91,66 @@ def _run_code(code, run_globals, init_globals=None,
     return run_globals
 
 
-def main() -> int:
-    args = parser.parse_args()
+def main(argv: list[str] = None) -> int:
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv and argv[0] in SUBCOMMANDS:
+        module = importlib.import_module(SUBCOMMANDS[argv[0]])
+        return module.main(argv[1:], prog=f'{PROG} {argv[0]}')
+    args = quick_args(argv) or make_parser().parse_args(argv)
     if args.mode == 'auto':
         args.mode = 'run'
-    source = args.script.read()
-    try:
-        filename = args.script.name
-    except Exception:
-        filename = '<unknown>'
-    tree = parse(source, filename)
+    filename = '<stdin>' if args.script == '-' else args.script
+    if args.script == '-' and args.mode in ('watch', 'stats'):
+        # Both read the script from disk, watch mode again on every change
+        print(f"{PROG}: error: {args.mode} mode can't read the script from standard input", file=sys.stderr)
+        return 2
+    if args.script != '-':
+        try:
+            os.stat(filename)
+        except OSError as e:
+            print(f"{PROG}: error: can't open '{filename}': {e}", file=sys.stderr)
+            return 2
+    if args.mode == 'watch':
+        from scy.watch import watch
+        return watch(filename, args.interval, args.optimize_ast)
+    if args.mode == 'stats':
+        from scy import importer
+        from scy.stats import Profile
+        profile = Profile(filename, args.tracemalloc, args.optimize_ast)
+        try:
+            compiled = profile.compile()
+            sys.path[0] = os.path.dirname(os.path.abspath(filename))
+            importer.install()
+            with profile.phase('run'):
+                _run_code(compiled, {
+                    '__builtins__': builtins
+                }, mod_name='__main__', script_name=filename)
+        finally:
+            profile.report(args.json)
+        return 0
+    if args.script == '-':
+        tree = parse(sys.stdin.read(), filename, optimize_ast=args.optimize_ast)
+    else:
+        tree = parse_file(filename, optimize_ast=args.optimize_ast)
+    # The importer is only loaded by the modes that run code, so compile_only
+    # doesn't pay for the import machinery
     if args.mode == 'dump':
         print(ast.dump(tree, indent=3, include_attributes=True))
     elif args.mode == 'run':
         compiled = compile(tree, filename, 'exec')
+        # Let the script import sibling .scy modules, like running a .py file would
+        sys.path[0] = os.path.dirname(os.path.abspath(filename))
+        from scy import importer
+        importer.install()
         _run_code(compiled, {
             '__builtins__': builtins
         }, mod_name='__main__', script_name=filename)
     elif args.mode == 'py':
         print(ast.unparse(tree))
     elif args.mode == 'compile_only':
-        error: None
+        import time
+        error = None
         start = time.process_time_ns()
         try:
             compile(tree, filename, 'exec')
@@ -0,0 +1,136 @@
+import asyncio
+import marshal
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from types import CodeType
+from typing import Any, Iterable, Mapping, Optional, Union
+
+from scy.builtins import _string_cache, scy_compile as _scy_compile
+
+__all__ = ['AsyncCompiler', 'get_executor', 'scy_compile', 'scy_compile_many', 'scy_eval', 'scy_exec', 'set_executor']
+
+CompileKey = tuple[str, str, str, int, bool, int, bool]
+
+
+def _compile_marshalled(source: str, filename: str, mode: str, flags: int, dont_inherit: bool,
+                        optimize: int, optimize_ast: bool) -> bytes:
+    # Runs in worker processes; code objects don't pickle, but they marshal
+    code = _scy_compile(source, filename, mode, flags, dont_inherit, optimize, optimize_ast=optimize_ast)
+    return marshal.dumps(code)
+
+
+class AsyncCompiler:
+    # Runs scy_compile in an executor so the event loop keeps serving while big
+    # sources compile. Requests for the same source and options that arrive
+    # while one is already compiling wait for that one instead of starting
+    # another. With no executor the loop's default (thread) executor is used.
+    executor: Optional[Executor]
+    pending: dict[tuple[asyncio.AbstractEventLoop, CompileKey], asyncio.Future]
+
+    def __init__(self, executor: Optional[Executor] = None) -> None:
+        self.executor = executor
+        self.pending = {}
+
+    async def compile(
+        self,
+        source: str,
+        filename: Union[str, os.PathLike],
+        mode: str,
+        flags: int = 0,
+        dont_inherit: bool = False,
+        optimize: int = -1,
+        optimize_ast: bool = False) -> CodeType:
+        loop = asyncio.get_running_loop()
+        key = (loop, (source, os.fspath(filename), mode, flags, bool(dont_inherit), optimize, optimize_ast))
+        future = self.pending.get(key)
+        if future is None:
+            future = self.start(loop, key[1])
+            self.pending[key] = future
+            future.add_done_callback(lambda _: self.pending.pop(key, None))
+        # One caller being cancelled mustn't cancel the compile for the others
+        result = await asyncio.shield(future)
+        if isinstance(result, bytes):
+            return marshal.loads(result)
+        return result
+
+    def start(self, loop: asyncio.AbstractEventLoop, key: CompileKey) -> asyncio.Future:
+        source, filename, mode, flags, dont_inherit, optimize, optimize_ast = key
+        if isinstance(self.executor, ProcessPoolExecutor):
+            function = partial(_compile_marshalled, *key)
+        else:
+            function = partial(_scy_compile, source, filename, mode, flags, dont_inherit, optimize,
+                               optimize_ast=optimize_ast)
+        return loop.run_in_executor(self.executor, function)
+
+    async def compile_many(
+        self,
+        sources: Iterable[tuple[str, Union[str, os.PathLike]]],
+        mode: str = 'exec',
+        return_exceptions: bool = False,
+        **options) -> list[Union[CodeType, BaseException]]:
+        return await asyncio.gather(*(self.compile(source, filename, mode, **options)
+                                      for (source, filename) in sources),
+                                    return_exceptions=return_exceptions)
+
+    async def compile_string(self, source: str, mode: str, filename: str = '<string>') -> CodeType:
+        # Shares scy_eval/scy_exec's cache of compiled strings
+        key = (source, mode, filename)
+        code = _string_cache.get(key)
+        if code is None:
+            code = await self.compile(source, filename, mode)
+            _string_cache.put(key, code)
+        return code
+
+
+_compiler = AsyncCompiler()
+
+
+def set_executor(executor: Optional[Executor]) -> None:
+    # Any ThreadPoolExecutor or ProcessPoolExecutor; None goes back to the
+    # event loop's default executor. The front end is pure Python and holds the
+    # GIL, so threads still slow the loop down; processes don't.
+    _compiler.executor = executor
+
+
+def get_executor() -> Optional[Executor]:
+    return _compiler.executor
+
+
+async def scy_compile(
+    source: str,
+    filename: Union[str, os.PathLike],
+    mode: str,
+    flags: int = 0,
+    dont_inherit: bool = False,
+    optimize: int = -1,
+    optimize_ast: bool = False) -> CodeType:
+    return await _compiler.compile(source, filename, mode, flags, dont_inherit, optimize, optimize_ast)
+
+
+async def scy_compile_many(
+    sources: Iterable[tuple[str, Union[str, os.PathLike]]],
+    mode: str = 'exec',
+    return_exceptions: bool = False,
+    **options) -> list[Union[CodeType, BaseException]]:
+    return await _compiler.compile_many(sources, mode, return_exceptions, **options)
+
+
+async def scy_eval(
+    expression: Union[str, CodeType],
+    globals: Optional[dict[str, Any]] = None,
+    locals: Optional[Mapping[str, Any]] = None) -> Any:
+    # Only compiling leaves the loop's thread; the code itself runs on it, like
+    # any other coroutine's code would
+    if not isinstance(expression, CodeType):
+        expression = await _compiler.compile_string(expression, 'eval')
+    return eval(expression, globals, locals)
+
+
+async def scy_exec(
+    expression: Union[str, CodeType],
+    globals: Optional[dict[str, Any]] = None,
+    locals: Optional[Mapping[str, Any]] = None) -> Any:
+    if not isinstance(expression, CodeType):
+        expression = await _compiler.compile_string(expression, 'exec')
+    return exec(expression, globals, locals)
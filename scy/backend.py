@@ -1,12 +1,72 @@
 import ast
-from typing import Union
+import mmap
+import os
+from typing import Any, Iterator, Union
 
 from scy.parser import parse_tree
-from scy.tokenizer import tokenize
+from scy.tokenizer import iter_bytes_tokens, iter_tokens
 from scy.tokens import Token
+from scy.utils import LineIndex, ascii_compatible, detect_encoding
 
 
-def parse(source, filename: str = '<unknown>', mode: str = 'exec') -> Union[ast.Expression, ast.Module]:
-    tokens: list[Token] = tokenize(source, filename)
-    tree = parse_tree(tokens, mode, filename, source)
+def parse(source, filename: str = '<unknown>', mode: str = 'exec',
+          optimize_ast: bool = False) -> Union[ast.Expression, ast.Module]:
+    # Tokens are produced as the parser asks for them, so they never all exist at once
+    lines = LineIndex(source)
+    tokens: Iterator[Token] = iter_tokens(source, filename, lines=lines)
+    tree = parse_tree(tokens, mode, filename, source, lines)
+    if optimize_ast:
+        # Only imported when asked for, so plain compiles don't load it
+        from scy.optimizer import optimize
+        tree = optimize(tree)
     return tree
+
+
+def parse_bytes(data: Any, filename: str = '<unknown>', mode: str = 'exec',
+                optimize_ast: bool = False) -> Union[ast.Expression, ast.Module]:
+    # Parses encoded source (bytes, or any buffer with find()) without
+    # decoding it up front; the encoding comes from a BOM or coding comment
+    encoding, start = detect_encoding(data, filename)
+    if not ascii_compatible(encoding):
+        with memoryview(data)[start:] as view:
+            return parse(str(view, encoding), filename, mode, optimize_ast)
+    # utf-8-sig drops the BOM from the first line when an error quotes it
+    lines = LineIndex(data, 'utf-8-sig' if start else encoding)
+    tokens: Iterator[Token] = iter_bytes_tokens(data, filename, encoding, start, lines)
+    tree = parse_tree(tokens, mode, filename, data, lines)
+    if optimize_ast:
+        from scy.optimizer import optimize
+        tree = optimize(tree)
+    return tree
+
+
+def parse_file(path: Union[str, os.PathLike], mode: str = 'exec',
+               optimize_ast: bool = False) -> Union[ast.Expression, ast.Module]:
+    # Tokenizes straight from a memory map of the file, so even sources of
+    # hundreds of megabytes are never held as one bytes or str object
+    filename = os.fspath(path)
+    with open(path, 'rb') as fp:
+        try:
+            data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # Empty files and pipes can't be mapped
+            return parse_bytes(fp.read(), filename, mode, optimize_ast)
+    with data:
+        try:
+            return parse_bytes(data, filename, mode, optimize_ast)
+        except SyntaxError as e:
+            # Errors look up their line lazily, which has to happen before the
+            # mapping goes away
+            e.text = e.text
+            raise
+
+
+def parse_recovering(source, filename: str = '<unknown>') -> tuple[ast.Module, list[SyntaxError]]:
+    # Collects every syntax error instead of stopping at the first. The tree
+    # leaves out the statements that had errors.
+    lines = LineIndex(source)
+    errors: list[SyntaxError] = []
+    tokens: Iterator[Token] = iter_tokens(source, filename, lines=lines, errors=errors)
+    tree = parse_tree(tokens, 'exec', filename, source, lines, errors)
+    errors.sort(key=lambda error: (error.lineno, error.offset))
+    return tree, errors
@@ -0,0 +1,291 @@
+# Ahead-of-time transpiling, so production hosts run plain CPython and never
+# import the front end. A source tree is mirrored into an output directory
+# with every .scy file turned into the .py that '-M py' prints; other files
+# are copied. OUTPUT/scy-build.json records each source's hash, so unchanged
+# files are skipped next time, and the .scy line each generated line came
+# from, which translate_traceback uses to point tracebacks back at the source.
+#
+#     scy build src/ build/ -j 0
+import ast
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Iterator, Optional
+
+from scy import __version__
+from scy.backend import parse_file
+from scy.importer import SOURCE_SUFFIX
+
+__all__ = ['build', 'line_map', 'load_manifest', 'translate_traceback', 'transpile_file']
+
+MANIFEST_NAME = 'scy-build.json'
+HEADER = '# Generated by scy build from {}; edit that file instead.\n'
+
+# Generated line (1-based, as an index + 1) -> .scy line, None where no node starts
+LineMap = list[Optional[int]]
+Manifest = dict[str, Any]
+
+TRACEBACK_LINE = re.compile(r'File "([^"]+)", line (\d+)')
+
+
+def line_map(tree: ast.AST, text: str) -> LineMap:
+    # Parses the generated code back and pairs its nodes with the tree it was
+    # unparsed from; each line maps to the first node found starting on it.
+    # Statements always unparse to statements of the same kind, but folded
+    # expressions may not ('-1' reparses as a unary minus), so statements are
+    # paired on their own and each one's expressions only with each other.
+    lines: LineMap = [None] * text.count('\n')
+    pairs = zip(statement_nodes(tree), statement_nodes(ast.parse(text)))
+    for original_statement, generated_statement in pairs:
+        if type(original_statement) is not type(generated_statement):
+            # Unparsing changed the shape of the tree; the rest can't be paired
+            break
+        for original, generated in zip(own_nodes(original_statement), own_nodes(generated_statement)):
+            if type(original) is not type(generated):
+                break
+            lineno = getattr(generated, 'lineno', None)
+            if lineno is not None and lineno <= len(lines) and lines[lineno - 1] is None:
+                lines[lineno - 1] = getattr(original, 'lineno', None)
+    return lines
+
+
+def statement_nodes(tree: ast.AST) -> Iterator[ast.stmt]:
+    return (node for node in ast.walk(tree) if isinstance(node, ast.stmt))
+
+
+def own_nodes(statement: ast.stmt) -> Iterator[ast.AST]:
+    # statement and the nodes inside it, leaving out the statements it contains
+    todo = [statement]
+    while todo:
+        node = todo.pop(0)
+        yield node
+        todo.extend(child for child in ast.iter_child_nodes(node) if not isinstance(child, ast.stmt))
+
+
+def transpile_file(source: str, output: str, name: Optional[str] = None,
+                   optimize_ast: bool = False) -> LineMap:
+    tree = parse_file(source, optimize_ast=optimize_ast)
+    text = HEADER.format(name or os.path.basename(source)) + ast.unparse(tree) + '\n'
+    write_atomic(output, text.encode('utf-8'))
+    return line_map(tree, text)
+
+
+def write_atomic(path: str, data: bytes) -> None:
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, temp = tempfile.mkstemp(prefix='.tmp-', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as fp:
+            fp.write(data)
+        os.chmod(temp, 0o644)
+        os.replace(temp, path)
+    except BaseException:
+        os.unlink(temp)
+        raise
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fp:
+        for block in iter(lambda: fp.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def iter_tree(root: str, skip: str) -> Iterator[str]:
+    # Every file under root, relative to it, leaving out skip (the output
+    # directory, when it's inside the source tree) and bytecode caches
+    for directory, dirs, files in os.walk(root):
+        dirs[:] = sorted(name for name in dirs
+                         if name != '__pycache__' and os.path.realpath(os.path.join(directory, name)) != skip)
+        for name in sorted(files):
+            yield os.path.relpath(os.path.join(directory, name), root)
+
+
+def manifest_key(relative: str) -> str:
+    return relative.replace(os.sep, '/')
+
+
+def load_manifest(output: str) -> Optional[Manifest]:
+    try:
+        with open(os.path.join(output, MANIFEST_NAME), encoding='utf-8') as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        return None
+
+
+def build_one(source: str, output: str, name: str, optimize_ast: bool) -> tuple[str, Optional[LineMap], Optional[str]]:
+    # Runs in worker processes, so only return things that pickle
+    try:
+        lines = transpile_file(source, output, name, optimize_ast)
+    except SyntaxError as e:
+        return output, None, ''.join(traceback.format_exception_only(type(e), e))
+    except Exception as e:
+        return output, None, f'{type(e).__name__}: {e}\n'
+    return output, lines, None
+
+
+def copy_if_changed(source: str, output: str) -> bool:
+    try:
+        have = os.stat(output)
+    except OSError:
+        pass
+    else:
+        want = os.stat(source)
+        if have.st_size == want.st_size and have.st_mtime_ns == want.st_mtime_ns:
+            return False
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    shutil.copy2(source, output)
+    return True
+
+
+def build(source: str, output: str, workers: int = 1, force: bool = False,
+          optimize_ast: bool = False, quiet: int = 0) -> bool:
+    source = os.path.abspath(source)
+    output = os.path.abspath(output)
+    manifest = load_manifest(output)
+    # Sources built by another version or with other options are all rebuilt
+    options = {'version': __version__, 'optimize_ast': optimize_ast}
+    previous: dict[str, Any] = {} if manifest is None else manifest.get('files', {})
+    old_files: dict[str, Any] = {}
+    if manifest is not None and not force and all(manifest.get(key) == value for (key, value) in options.items()):
+        old_files = previous
+
+    files: dict[str, Any] = {}
+    jobs: list[tuple[str, str, str]] = []
+    relatives = set(iter_tree(source, os.path.realpath(output)))
+    for relative in sorted(relatives):
+        path = os.path.join(source, relative)
+        if not relative.endswith(SOURCE_SUFFIX):
+            if relative != MANIFEST_NAME and copy_if_changed(path, os.path.join(output, relative)) and quiet < 1:
+                print(f'Copying {relative!r}...')
+            continue
+        target = relative[:-len(SOURCE_SUFFIX)] + '.py'
+        if target in relatives:
+            # The import system would pick the .py over the .scy anyway
+            if quiet < 2:
+                print(f'*** Skipping {relative!r}: {target!r} is next to it')
+            continue
+        key = manifest_key(target)
+        digest = file_hash(path)
+        entry = old_files.get(key)
+        if entry is not None and entry.get('sha256') == digest and os.path.exists(os.path.join(output, target)):
+            files[key] = entry
+            continue
+        files[key] = {'source': manifest_key(relative), 'sha256': digest}
+        jobs.append((path, os.path.join(output, target), manifest_key(relative)))
+
+    success = True
+    for (path, lines, error) in run_jobs(jobs, workers, optimize_ast):
+        key = manifest_key(os.path.relpath(path, output))
+        name = files[key]['source']
+        if error is None:
+            files[key]['lines'] = lines
+            if quiet < 1:
+                print(f'Transpiling {name!r}...')
+            continue
+        success = False
+        # Keep what the last good build wrote; the changed hash retries it next time
+        if key in old_files:
+            files[key] = old_files[key]
+        else:
+            del files[key]
+        if quiet < 2:
+            print(f'*** Error transpiling {name!r}...')
+            print(error, end='')
+
+    # Outputs whose source is gone
+    sources = {manifest_key(relative) for relative in relatives}
+    for key in previous.keys() - files.keys():
+        if previous[key].get('source') not in sources:
+            try:
+                os.unlink(os.path.join(output, key))
+            except FileNotFoundError:
+                pass
+
+    manifest = {**options, 'source_root': source, 'files': files}
+    write_atomic(os.path.join(output, MANIFEST_NAME), json.dumps(manifest, indent=1).encode('utf-8'))
+    return success
+
+
+def run_jobs(jobs: list[tuple[str, str, str]], workers: int,
+             optimize_ast: bool) -> Iterator[tuple[str, Optional[LineMap], Optional[str]]]:
+    if workers == 1 or len(jobs) < 2:
+        for (source, output, name) in jobs:
+            yield build_one(source, output, name, optimize_ast)
+        return
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(workers) as executor:
+        yield from executor.map(build_one, *zip(*jobs), [optimize_ast] * len(jobs),
+                                chunksize=max(1, len(jobs) // (8 * workers)))
+
+
+def translate_traceback(text: str, manifest: Manifest) -> str:
+    # Rewrites 'File "....py", line N' for generated files into the .scy file
+    # and line they came from. Files are matched by their path inside the
+    # output directory, so tracebacks from wherever it was deployed work.
+    files = manifest.get('files', {})
+    root = manifest.get('source_root', '')
+
+    def replace(match: re.Match) -> str:
+        path = match.group(1).replace(os.sep, '/')
+        for key, entry in files.items():
+            if path == key or path.endswith('/' + key):
+                break
+        else:
+            return match.group()
+        lines = entry.get('lines') or []
+        lineno = int(match.group(2))
+        if not 1 <= lineno <= len(lines) or lines[lineno - 1] is None:
+            return match.group()
+        return f'File "{os.path.join(root, entry["source"])}", line {lines[lineno - 1]}'
+
+    return TRACEBACK_LINE.sub(replace, text)
+
+
+def main(argv: Optional[list[str]] = None, prog: str = 'python -m scy.build') -> int:
+    import argparse
+    parser = argparse.ArgumentParser(prog, description='Transpile a tree of .scy files to plain Python.')
+    parser.add_argument('source', help='directory to mirror')
+    parser.add_argument('output', nargs='?', help='directory to write the .py files and the manifest to')
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help='number of worker processes (0 means one per CPU)')
+    parser.add_argument('-f', '--force', action='store_true', help='transpile even unchanged files')
+    parser.add_argument('-O', '--optimize-ast', action='store_true',
+                        help='fold constants and drop dead branches first')
+    parser.add_argument('-q', '--quiet', action='count', default=0,
+                        help='only report errors (-qq to print nothing)')
+    parser.add_argument('--translate', metavar='TRACEBACK',
+                        help="instead of building, point a saved traceback ('-' for stdin) at the .scy "
+                             "sources, using the manifest in output (or the only directory given)")
+    args = parser.parse_args(argv)
+    if args.translate is not None:
+        directory = args.source if args.output is None else args.output
+        manifest = load_manifest(directory)
+        if manifest is None:
+            parser.error(f'no {MANIFEST_NAME} in {directory}')
+        if args.translate == '-':
+            text = sys.stdin.read()
+        else:
+            with open(args.translate, encoding='utf-8') as fp:
+                text = fp.read()
+        print(translate_traceback(text, manifest), end='')
+        return 0
+    if args.output is None:
+        parser.error('the output directory is required')
+    if args.workers < 0:
+        parser.error('the number of workers must be at least 0')
+    if not os.path.isdir(args.source):
+        parser.error(f'{args.source} is not a directory')
+    success = build(args.source, args.output, args.workers, args.force, args.optimize_ast, args.quiet)
+    return 0 if success else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,12 +1,17 @@
+import ast
 import os
 from types import CodeType
 from typing import Any, Mapping, Optional, Union
 
 from scy.backend import parse
+from scy.cache import CacheInfo, CompileCache, MemoryCache, default_cache
 
 
 __all__ = ['scy_compile', 'scy_eval', 'scy_exec']
 
+# Code compiled from strings handed to scy_eval/scy_exec
+_string_cache = MemoryCache(512)
+
 
 def scy_compile(
     source: str,
@@ -14,10 +19,23 @@ def scy_compile(
     mode: str,
     flags: int = 0,
     dont_inherit: int = False,
-    optimize: int = -1) -> CodeType:
+    optimize: int = -1,
+    cache: Optional[CompileCache] = None,
+    optimize_ast: bool = False) -> CodeType:
     filename = os.fspath(filename)
-    tree = parse(source, filename, mode)
-    return compile(tree, filename, mode, flags, dont_inherit, optimize)
+    if cache is None:
+        cache = default_cache()
+    key = None
+    if cache is not None and not flags & ast.PyCF_ONLY_AST:
+        key = cache.key(source, mode, flags, dont_inherit, optimize, optimize_ast)
+        code = cache.get(key, filename)
+        if code is not None:
+            return code
+    tree = parse(source, filename, mode, optimize_ast)
+    code = compile(tree, filename, mode, flags, dont_inherit, optimize)
+    if key is not None:
+        cache.put(key, code)
+    return code
 
 
 def scy_eval(
@@ -25,7 +43,7 @@ def scy_eval(
     globals: Optional[dict[str, Any]] = None,
     locals: Optional[Mapping[str, Any]] = None) -> Any:
     if not isinstance(expression, CodeType):
-        expression = scy_compile(expression, '<string>', 'eval')
+        expression = _compile_string(expression, 'eval')
     return eval(expression, globals, locals)
 
 
@@ -34,5 +52,22 @@ def scy_exec(
     globals: Optional[dict[str, Any]] = None,
     locals: Optional[Mapping[str, Any]] = None) -> Any:
     if not isinstance(expression, CodeType):
-        expression = scy_compile(expression, '<string>', 'exec')
+        expression = _compile_string(expression, 'exec')
     return exec(expression, globals, locals)
+
+
+def _compile_string(source: str, mode: str, filename: str = '<string>') -> CodeType:
+    key = (source, mode, filename)
+    code = _string_cache.get(key)
+    if code is None:
+        code = scy_compile(source, filename, mode)
+        _string_cache.put(key, code)
+    return code
+
+
+def cache_info() -> CacheInfo:
+    return _string_cache.info()
+
+
+def cache_clear() -> None:
+    _string_cache.clear()
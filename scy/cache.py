@@ -0,0 +1,272 @@
+import hashlib
+import importlib.util
+import marshal
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from types import CodeType
+from typing import Hashable, NamedTuple, Optional
+
+from scy import __version__
+
+__all__ = ['CacheInfo', 'CompileCache', 'MemoryCache', 'configure', 'default_cache']
+
+ENTRY_SUFFIX = '.scyc'
+ENTRY_HEADER = b'SCYC' + importlib.util.MAGIC_NUMBER
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+# Temporary files older than this were left behind by a crashed writer
+STALE_TEMP_AGE = 3600
+
+SIZE_UNITS = {
+    '':  1,
+    'K': 1024,
+    'M': 1024 ** 2,
+    'G': 1024 ** 3,
+}
+
+
+def replace_filename(code: CodeType, filename: str) -> CodeType:
+    consts = tuple(
+        replace_filename(const, filename) if isinstance(const, CodeType) else const
+        for const in code.co_consts
+    )
+    return code.replace(co_filename=filename, co_consts=consts)
+
+
+class CompileCache:
+    # Content-addressed store of marshalled code objects. Entries are written to a
+    # temporary file and renamed into place, so concurrent readers (even on other
+    # hosts sharing the directory) see either a whole entry or none. Hits bump the
+    # entry's mtime, which is what eviction orders by.
+    directory: str
+    max_size: Optional[int]
+    size_estimate: Optional[int]
+
+    def __init__(self, directory: str, max_size: Optional[int] = DEFAULT_MAX_SIZE) -> None:
+        self.directory = os.fspath(directory)
+        self.max_size = max_size
+        self.size_estimate = None
+
+    def key(self, source: str, mode: str, flags: int = 0,
+            dont_inherit: bool = False, optimize: int = -1, optimize_ast: bool = False) -> str:
+        digest = hashlib.sha256()
+        digest.update(f'{__version__}\0{importlib.util.MAGIC_NUMBER.hex()}\0'
+                      f'{mode}\0{flags}\0{int(dont_inherit)}\0{optimize}\0{int(optimize_ast)}\0'.encode())
+        digest.update(source.encode('utf-8', 'surrogatepass'))
+        return digest.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ENTRY_SUFFIX)
+
+    def get(self, key: str, filename: str) -> Optional[CodeType]:
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as fp:
+                data = fp.read()
+        except OSError:
+            return None
+        code = None
+        if data.startswith(ENTRY_HEADER):
+            try:
+                code = marshal.loads(data[len(ENTRY_HEADER):])
+            except (EOFError, ValueError, TypeError):
+                pass
+        if not isinstance(code, CodeType):
+            self.discard(path)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        if code.co_filename != filename:
+            code = replace_filename(code, filename)
+        return code
+
+    def put(self, key: str, code: CodeType) -> None:
+        path = self.path(key)
+        data = ENTRY_HEADER + marshal.dumps(code)
+        directory = os.path.dirname(path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, temp = tempfile.mkstemp(prefix='.tmp-', dir=directory)
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                fp.write(data)
+            # mkstemp creates the file owner-only, but the cache may be shared
+            os.chmod(temp, 0o644)
+            os.replace(temp, path)
+        except OSError:
+            self.discard(temp)
+            return
+        if self.max_size is not None:
+            if self.size_estimate is None:
+                self.size_estimate = self.total_size()
+            else:
+                self.size_estimate += len(data)
+            if self.size_estimate > self.max_size:
+                self.prune()
+
+    def discard(self, path: str) -> None:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+    def entries(self) -> list[tuple[float, int, str]]:
+        result = []
+        now = time.time()
+        try:
+            buckets = list(os.scandir(self.directory))
+        except OSError:
+            return result
+        for bucket in buckets:
+            if not bucket.is_dir():
+                continue
+            try:
+                files = list(os.scandir(bucket.path))
+            except OSError:
+                continue
+            for entry in files:
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                if entry.name.endswith(ENTRY_SUFFIX):
+                    result.append((stat.st_mtime, stat.st_size, entry.path))
+                elif entry.name.startswith('.tmp-') and now - stat.st_mtime > STALE_TEMP_AGE:
+                    self.discard(entry.path)
+        return result
+
+    def total_size(self) -> int:
+        return sum(size for (mtime, size, path) in self.entries())
+
+    def prune(self, max_size: Optional[int] = None) -> int:
+        if max_size is None:
+            max_size = self.max_size
+        entries = self.entries()
+        total = sum(size for (mtime, size, path) in entries)
+        freed = 0
+        if max_size is not None:
+            entries.sort()
+            for (mtime, size, path) in entries:
+                if total - freed <= max_size:
+                    break
+                self.discard(path)
+                freed += size
+        self.size_estimate = total - freed
+        return freed
+
+    def clear(self) -> int:
+        return self.prune(0)
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: int
+    currsize: int
+
+
+class MemoryCache:
+    # Thread-safe in-process LRU of code objects
+    maxsize: int
+    entries: 'OrderedDict[Hashable, CodeType]'
+    hits: int
+    misses: int
+    evictions: int
+    lock: threading.Lock
+
+    def __init__(self, maxsize: int = 512) -> None:
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[CodeType]:
+        with self.lock:
+            code = self.entries.get(key)
+            if code is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.entries.move_to_end(key)
+            return code
+
+    def put(self, key: Hashable, code: CodeType) -> None:
+        with self.lock:
+            self.entries[key] = code
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def info(self) -> CacheInfo:
+        with self.lock:
+            return CacheInfo(self.hits, self.misses, self.evictions, self.maxsize, len(self.entries))
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+
+_default_cache: Optional[CompileCache] = None
+_default_configured = False
+
+
+def configure(directory: Optional[str], max_size: Optional[int] = DEFAULT_MAX_SIZE) -> Optional[CompileCache]:
+    global _default_cache, _default_configured
+    _default_cache = None if directory is None else CompileCache(directory, max_size)
+    _default_configured = True
+    return _default_cache
+
+
+def default_cache() -> Optional[CompileCache]:
+    if not _default_configured:
+        directory = os.environ.get('SCY_CACHE_DIR')
+        max_size = os.environ.get('SCY_CACHE_MAX_SIZE')
+        configure(directory or None, DEFAULT_MAX_SIZE if not max_size else parse_size(max_size))
+    return _default_cache
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().upper().removesuffix('B')
+    unit = text[-1:] if text[-1:] in SIZE_UNITS else ''
+    return int(float(text[:len(text) - len(unit)]) * SIZE_UNITS[unit])
+
+
+def main(argv: Optional[list[str]] = None, prog: str = 'python -m scy.cache') -> int:
+    # argparse is only needed here, so don't make scy_compile pay for it
+    import argparse
+    parser = argparse.ArgumentParser(prog)
+    parser.add_argument('action', choices=['info', 'prune', 'clear'])
+    parser.add_argument('-d', '--dir', help='cache directory (default: $SCY_CACHE_DIR)')
+    parser.add_argument('--max-size', type=parse_size, help="size to prune down to, e.g. '512M'")
+    args = parser.parse_args(argv)
+    directory = args.dir or os.environ.get('SCY_CACHE_DIR')
+    if not directory:
+        parser.error('no cache directory given and SCY_CACHE_DIR is not set')
+    max_size = args.max_size
+    if max_size is None:
+        max_size = parse_size(os.environ.get('SCY_CACHE_MAX_SIZE') or str(DEFAULT_MAX_SIZE))
+    cache = CompileCache(directory, max_size)
+    if args.action == 'info':
+        entries = cache.entries()
+        print(f'{directory}: {len(entries)} entries, {sum(size for (mtime, size, path) in entries)} bytes')
+    elif args.action == 'prune':
+        print(f'Freed {cache.prune()} bytes from {directory}.')
+    elif args.action == 'clear':
+        print(f'Freed {cache.clear()} bytes from {directory}.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,67 @@
+import importlib.util
+import sys
+import warnings
+from typing import Iterator, Optional
+
+from scy.backend import parse_recovering
+from scy.compileall import find_sources
+
+__all__ = ['check_file', 'check_paths']
+
+
+def check_file(path: str) -> list[SyntaxError]:
+    with open(path, 'rb') as fp:
+        source = importlib.util.decode_source(fp.read())
+    tree, errors = parse_recovering(source, path)
+    if not errors:
+        # Some errors (a 'return' outside a function, say) only compile() finds
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', SyntaxWarning)
+                compile(tree, path, 'exec', dont_inherit=True)
+        except SyntaxError as e:
+            errors.append(e)
+    return errors
+
+
+def format_error(error: SyntaxError) -> str:
+    return f'{error.filename}:{error.lineno}:{error.offset}: {error.msg}'
+
+
+def check_paths(paths: list[str], quiet: int = 0) -> bool:
+    success = True
+    for path in iter_sources(paths):
+        try:
+            errors = check_file(path)
+        except (OSError, UnicodeDecodeError) as e:
+            success = False
+            if quiet < 2:
+                print(f'{path}: {e}')
+            continue
+        if errors:
+            success = False
+            if quiet < 2:
+                for error in errors:
+                    print(format_error(error))
+        elif not quiet:
+            print(f'{path}: ok')
+    return success
+
+
+def iter_sources(paths: list[str]) -> Iterator[str]:
+    for path in paths:
+        yield from find_sources(path)
+
+
+def main(argv: Optional[list[str]] = None, prog: str = 'python -m scy.check') -> int:
+    import argparse
+    parser = argparse.ArgumentParser(prog, description='Report every syntax error in the given .scy files.')
+    parser.add_argument('paths', nargs='+', metavar='PATH', help='.scy files or directories to search')
+    parser.add_argument('-q', '--quiet', action='count', default=0,
+                        help="don't list files without errors (-qq to print nothing)")
+    args = parser.parse_args(argv)
+    return 0 if check_paths(args.paths, args.quiet) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,154 @@
+# Thin client for the compile server (scy.server). It only imports what
+# talking to the socket needs, so asking a running server for work costs
+# little more than starting the interpreter.
+#
+#     python -m scy.client transpile FILE
+#     python -m scy.client check FILE...
+#     python -m scy.client compile FILE...     # write __pycache__ entries
+#     python -m scy.client ping | stop
+import errno
+import json
+import os
+import socket
+import stat
+import sys
+from typing import Any, BinaryIO, Optional
+
+__all__ = ['Client', 'ServerError', 'default_socket_path']
+
+USAGE = '''usage: scy-client [--socket PATH] {ping,stop,transpile,check,compile} [FILE...]'''
+
+
+def default_socket_path() -> str:
+    path = os.environ.get('SCY_SERVER_SOCKET')
+    if path:
+        return path
+    runtime = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime:
+        # Only this user can get in there already
+        return os.path.join(runtime, f'scy-{os.getuid()}.sock')
+    # In a shared temporary directory anyone could bind a fixed name first, so
+    # the socket gets a directory of its own that only this user can enter
+    directory = os.path.join(os.environ.get('TMPDIR') or '/tmp', f'scy-{os.getuid()}')
+    private_directory(directory)
+    return os.path.join(directory, 'server.sock')
+
+
+def private_directory(path: str) -> None:
+    # Creates path for this user alone, or checks that it already is. lstat,
+    # so a symlink someone else planted doesn't pass.
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(errno.EPERM, 'not a directory private to this user', path)
+
+
+def check_owner(path: str) -> None:
+    # Another user's socket could collect the sources sent to it, or answer
+    # with code of its choosing
+    if os.stat(path).st_uid != os.getuid():
+        raise PermissionError(errno.EPERM, 'socket belongs to another user', path)
+
+
+class ServerError(Exception):
+    # A failed request; error holds the server's description of the problem
+    error: dict[str, Any]
+
+    def __init__(self, error: dict[str, Any]) -> None:
+        super().__init__(format_error(error))
+        self.error = error
+
+
+def format_error(error: dict[str, Any]) -> str:
+    if error.get('lineno') is not None:
+        return f'{error.get("filename")}:{error["lineno"]}:{error.get("offset")}: {error["msg"]}'
+    return f'{error.get("type", "Error")}: {error.get("msg")}'
+
+
+class Client:
+    path: str
+    sock: socket.socket
+    file: BinaryIO
+
+    def __init__(self, path: Optional[str] = None, timeout: Optional[float] = None) -> None:
+        self.path = path or default_socket_path()
+        check_owner(self.path)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        try:
+            self.sock.connect(self.path)
+        except OSError:
+            self.sock.close()
+            raise
+        self.file = self.sock.makefile('rwb')
+
+    def request(self, op: str, **fields: Any) -> dict[str, Any]:
+        self.file.write(json.dumps({'op': op, **fields}).encode() + b'\n')
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError('compile server closed the connection')
+        response = json.loads(line)
+        if not response.pop('ok'):
+            raise ServerError(response['error'])
+        return response
+
+    def close(self) -> None:
+        self.file.close()
+        self.sock.close()
+
+    def __enter__(self) -> 'Client':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    # No argparse: importing it would cost more than the request itself
+    argv = sys.argv[1:] if argv is None else list(argv)
+    path = None
+    if argv[:1] == ['--socket'] and len(argv) > 1:
+        path = argv[1]
+        del argv[:2]
+    if not argv or argv[0] not in ('ping', 'stop', 'transpile', 'check', 'compile'):
+        print(USAGE, file=sys.stderr)
+        return 2
+    command, files = argv[0], [os.path.abspath(file) for file in argv[1:]]
+    if command == 'transpile' and len(files) != 1:
+        print(USAGE, file=sys.stderr)
+        return 2
+    try:
+        path = path or default_socket_path()
+        client = Client(path)
+    except OSError as e:
+        print(f"scy-client: can't reach a compile server at {path or e.filename} ({e.strerror}); "
+              f"start one with 'scy server'", file=sys.stderr)
+        return 2
+    status = 0
+    with client:
+        if command == 'ping':
+            print(json.dumps(client.request('ping')))
+        elif command == 'stop':
+            client.request('shutdown')
+        for file in files:
+            try:
+                if command == 'transpile':
+                    print(client.request('transpile', path=file)['python'])
+                elif command == 'check':
+                    for error in client.request('check', path=file)['errors']:
+                        print(format_error(error))
+                        status = 1
+                else:
+                    client.request('compile', path=file)
+            except ServerError as e:
+                print(e, file=sys.stderr)
+                status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
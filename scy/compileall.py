@@ -0,0 +1,93 @@
+import os
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from py_compile import PycInvalidationMode
+from typing import Iterator, Optional
+
+from scy.importer import SOURCE_SUFFIX, compile_file
+
+__all__ = ['compile_dir', 'compile_paths', 'find_sources']
+
+INVALIDATION_MODES = {
+    'timestamp':      PycInvalidationMode.TIMESTAMP,
+    'checked-hash':   PycInvalidationMode.CHECKED_HASH,
+    'unchecked-hash': PycInvalidationMode.UNCHECKED_HASH,
+}
+
+
+def find_sources(path: str) -> Iterator[str]:
+    if not os.path.isdir(path):
+        yield path
+        return
+    for root, dirs, files in os.walk(path):
+        dirs[:] = sorted(name for name in dirs if name != '__pycache__')
+        for name in sorted(files):
+            if name.endswith(SOURCE_SUFFIX):
+                yield os.path.join(root, name)
+
+
+def compile_one(path: str, invalidation_mode: Optional[PycInvalidationMode],
+                force: bool) -> tuple[str, bool, Optional[str]]:
+    # Runs in worker processes, so only return things that pickle
+    try:
+        compiled = compile_file(path, invalidation_mode, force)
+    except SyntaxError as e:
+        return path, False, ''.join(traceback.format_exception_only(type(e), e))
+    except Exception as e:
+        return path, False, f'{type(e).__name__}: {e}\n'
+    return path, compiled, None
+
+
+def compile_paths(paths: list[str], workers: int = 1, force: bool = False,
+                  invalidation_mode: Optional[PycInvalidationMode] = None,
+                  quiet: int = 0) -> bool:
+    sources = [source for path in paths for source in find_sources(path)]
+    if workers == 1 or len(sources) < 2:
+        results = (compile_one(source, invalidation_mode, force) for source in sources)
+        return report(results, quiet)
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(workers) as executor:
+        results = executor.map(compile_one, sources,
+                               [invalidation_mode] * len(sources), [force] * len(sources),
+                               chunksize=max(1, len(sources) // (8 * workers)))
+        return report(results, quiet)
+
+
+def compile_dir(path: str, **kwargs) -> bool:
+    return compile_paths([path], **kwargs)
+
+
+def report(results: Iterator[tuple[str, bool, Optional[str]]], quiet: int) -> bool:
+    success = True
+    for (path, compiled, error) in results:
+        if error is not None:
+            success = False
+            if quiet < 2:
+                print(f'*** Error compiling {path!r}...')
+                print(error, end='')
+        elif compiled and not quiet:
+            print(f'Compiling {path!r}...')
+    return success
+
+
+def main(argv: Optional[list[str]] = None, prog: str = 'python -m scy.compileall') -> int:
+    import argparse
+    parser = argparse.ArgumentParser(prog, description='Compile every .scy file under the given paths to bytecode.')
+    parser.add_argument('paths', nargs='+', metavar='PATH', help='.scy files or directories to search')
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help='number of worker processes (0 means one per CPU)')
+    parser.add_argument('-f', '--force', action='store_true', help='recompile even if up to date')
+    parser.add_argument('-q', '--quiet', action='count', default=0,
+                        help='only report errors (-qq to print nothing)')
+    parser.add_argument('--invalidation-mode', choices=sorted(INVALIDATION_MODES))
+    args = parser.parse_args(argv)
+    if args.workers < 0:
+        parser.error('the number of workers must be at least 0')
+    mode = INVALIDATION_MODES[args.invalidation_mode] if args.invalidation_mode else None
+    success = compile_paths(args.paths, args.workers, args.force, mode, args.quiet)
+    return 0 if success else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
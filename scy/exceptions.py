@@ -1,3 +1,7 @@
+from typing import Optional
+
+from scy.utils import LineIndex
+
 # Tokenizer exceptions
 UNEXPECTED_CHARACTER = 'Unexpected character.'
 RESERVED_KEYWORD = "Reserved keyword '%s'."
@@ -7,14 +11,48 @@ EOF_DURING_STRING = 'EOF reached during string.'
 UNEXPECTED_EOF = 'Unexpected EOF.'
 NUMBER_NOT_ZERO = "Number cannot start with '0'."
 ALTERNATE_BASE_FLOAT = 'Cannot have alternate bases on floats.'
+INVALID_DIGIT = "Invalid digit '%s' in base %i literal."
+MISSING_DIGITS = 'Expect digits after base prefix.'
 UNDERSCORE_ENDED_NUMBER = "Cannot end number literal with '_'."
+DOUBLE_UNDERSCORE_NUMBER = "Cannot have consecutive '_' in number literal."
 INVALID_ESCAPE = "Invalid escape character '%s'."
 
 # Parser exceptions
 INVALID_ASSIGNMENT = 'Invalid assignment target.'
 ITERATION_INVALID_ASSIGNMENT = 'Invalid assignment target for iteration.'
+INVALID_AUGMENTED_ASSIGNMENT = 'Invalid augmented assignment target.'
 EXPECT_EXPRESSOIN = 'Expect expression.'
 INVALID_ASYNC = "Async keyword not supported with '%s' statements."
 INVALID_ASYNC_EXPR = 'Async keyword not supported with expression statements.'
 INVALID_ASYNC_FOR = "Async for loops only compatible with iteration (using ':' syntax)."
 EXPECT_PROPERTY_NAME = "Expect property name after '.'."
+
+# SyntaxError's own text slot, which SourceSyntaxError.text wraps
+_text = SyntaxError.text
+
+
+class SourceSyntaxError(SyntaxError):
+    # The offending line (SyntaxError.text) is only looked up when something
+    # reads it, which most caught errors never do
+    lines: Optional[LineIndex]
+
+    def __init__(self, msg: str, filename: str, lineno: int, offset: int, lines: LineIndex) -> None:
+        super().__init__(msg, (filename, lineno, offset, None))
+        self.lines = lines
+
+    @property
+    def text(self) -> Optional[str]:
+        text = _text.__get__(self)
+        if text is None and self.lines is not None:
+            text = self.lines.line_text(self.lineno)
+            _text.__set__(self, text)
+        return text
+
+    @text.setter
+    def text(self, value: Optional[str]) -> None:
+        _text.__set__(self, value)
+        self.lines = None
+
+    def __reduce__(self) -> tuple:
+        # Unpickle as a plain SyntaxError, without the whole source attached
+        return SyntaxError, (self.msg, (self.filename, self.lineno, self.offset, self.text))
@@ -0,0 +1,250 @@
+import _imp
+import importlib.machinery
+import importlib.util
+import marshal
+import os
+import sys
+from importlib.machinery import ModuleSpec
+from types import CodeType
+from typing import TYPE_CHECKING, Callable, Optional, Sequence
+
+from scy import __version__
+
+if TYPE_CHECKING:
+    from py_compile import PycInvalidationMode
+
+__all__ = ['ScyFileLoader', 'ScyFinder', 'cache_from_source', 'compile_file', 'install', 'uninstall']
+
+SOURCE_SUFFIX = '.scy'
+
+FLAG_HASH_BASED = 0b01
+FLAG_CHECK_SOURCE = 0b10
+
+
+def cache_from_source(path: str) -> str:
+    # Same __pycache__ layout CPython uses, but tagged with the Scython version so
+    # a neighbouring .py module or an older front end never shares the file.
+    cache = importlib.util.cache_from_source(path)
+    return cache[:-len('.pyc')] + f'.scy-{__version__}.pyc'
+
+
+# py_compile (for PycInvalidationMode) and tempfile are only imported once a
+# .scy module actually gets compiled, which keeps install() cheap at startup
+def default_invalidation_mode() -> 'PycInvalidationMode':
+    from py_compile import PycInvalidationMode
+    if os.environ.get('SOURCE_DATE_EPOCH'):
+        return PycInvalidationMode.CHECKED_HASH
+    return PycInvalidationMode.TIMESTAMP
+
+
+def pyc_header(source: bytes, mtime: float, mode: 'PycInvalidationMode') -> bytes:
+    from py_compile import PycInvalidationMode
+    data = bytearray(importlib.util.MAGIC_NUMBER)
+    if mode == PycInvalidationMode.TIMESTAMP:
+        data.extend((0).to_bytes(4, 'little'))
+        data.extend((int(mtime) & 0xFFFFFFFF).to_bytes(4, 'little'))
+        data.extend((len(source) & 0xFFFFFFFF).to_bytes(4, 'little'))
+    else:
+        flags = FLAG_HASH_BASED
+        if mode == PycInvalidationMode.CHECKED_HASH:
+            flags |= FLAG_CHECK_SOURCE
+        data.extend(flags.to_bytes(4, 'little'))
+        data.extend(importlib.util.source_hash(source))
+    return bytes(data)
+
+
+def code_to_pyc(code: CodeType, source: bytes, mtime: float, mode: 'PycInvalidationMode') -> bytes:
+    return pyc_header(source, mtime, mode) + marshal.dumps(code)
+
+
+def code_from_pyc(data: bytes, mtime: float, size: int, get_source: Callable[[], bytes]) -> Optional[CodeType]:
+    if len(data) < 16 or data[:4] != importlib.util.MAGIC_NUMBER:
+        return None
+    flags = int.from_bytes(data[4:8], 'little')
+    if flags & ~(FLAG_HASH_BASED | FLAG_CHECK_SOURCE):
+        return None
+    if flags & FLAG_HASH_BASED:
+        check = _imp.check_hash_based_pycs
+        if check == 'always' or (check != 'never' and flags & FLAG_CHECK_SOURCE):
+            if data[8:16] != importlib.util.source_hash(get_source()):
+                return None
+    else:
+        if int.from_bytes(data[8:12], 'little') != int(mtime) & 0xFFFFFFFF:
+            return None
+        if int.from_bytes(data[12:16], 'little') != size & 0xFFFFFFFF:
+            return None
+    try:
+        code = marshal.loads(data[16:])
+    except (EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(code, CodeType):
+        return None
+    return code
+
+
+class ScyFileLoader(importlib.machinery.SourceFileLoader):
+    invalidation_mode: Optional['PycInvalidationMode']
+
+    def __init__(self, fullname: str, path: str,
+                 invalidation_mode: Optional['PycInvalidationMode'] = None) -> None:
+        super().__init__(fullname, path)
+        self.invalidation_mode = invalidation_mode
+
+    def source_to_code(self, data: bytes, path: str, *, _optimize: int = -1) -> CodeType:
+        from scy.builtins import scy_compile
+        source = importlib.util.decode_source(data)
+        return scy_compile(source, path, 'exec', dont_inherit=True, optimize=_optimize)
+
+    def get_code(self, fullname: str) -> CodeType:
+        source_path = self.get_filename(fullname)
+        cache_path = cache_from_source(source_path)
+        stats = self.path_stats(source_path)
+        source: Optional[bytes] = None
+
+        def get_source() -> bytes:
+            nonlocal source
+            if source is None:
+                source = self.get_data(source_path)
+            return source
+
+        try:
+            data = self.get_data(cache_path)
+        except OSError:
+            pass
+        else:
+            code = code_from_pyc(data, stats['mtime'], stats['size'], get_source)
+            if code is not None:
+                return code
+
+        code = self.source_to_code(get_source(), source_path)
+        if not sys.dont_write_bytecode:
+            mode = self.invalidation_mode or default_invalidation_mode()
+            try:
+                self.set_data(cache_path, code_to_pyc(code, source, stats['mtime'], mode))
+            except NotImplementedError:
+                pass
+        return code
+
+
+def compile_file(path: str, invalidation_mode: Optional['PycInvalidationMode'] = None,
+                 force: bool = False) -> bool:
+    # Returns False if the cached bytecode was already up to date
+    mode = invalidation_mode or default_invalidation_mode()
+    cache_path = cache_from_source(path)
+    loader = ScyFileLoader('__main__', path, mode)
+    source = loader.get_data(path)
+    mtime = loader.path_stats(path)['mtime']
+    header = pyc_header(source, mtime, mode)
+    if not force:
+        try:
+            with open(cache_path, 'rb') as fp:
+                if fp.read(len(header)) == header:
+                    return False
+        except OSError:
+            pass
+    code = loader.source_to_code(source, path)
+    # Unlike set_data, let write failures reach the caller
+    directory = os.path.dirname(cache_path)
+    os.makedirs(directory, exist_ok=True)
+    import tempfile
+    fd, temp = tempfile.mkstemp(prefix='.tmp-', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as fp:
+            fp.write(header + marshal.dumps(code))
+        os.chmod(temp, 0o644)
+        os.replace(temp, cache_path)
+    except BaseException:
+        os.unlink(temp)
+        raise
+    return True
+
+
+# A meta path finder by duck typing; subclassing importlib.abc.MetaPathFinder
+# would pull in importlib.resources and friends for nothing
+class ScyFinder:
+    invalidation_mode: Optional['PycInvalidationMode']
+    # Directory -> its mtime and the names in it when it was listed
+    listings: dict[str, tuple[float, frozenset[str]]]
+
+    def __init__(self, invalidation_mode: Optional['PycInvalidationMode'] = None) -> None:
+        self.invalidation_mode = invalidation_mode
+        self.listings = {}
+
+    def invalidate_caches(self) -> None:
+        self.listings.clear()
+
+    def listing(self, directory: str) -> frozenset[str]:
+        # Every import runs through here before PathFinder, stdlib ones
+        # included, so like FileFinder it looks names up in a cached listing
+        # instead of trying each suffix, and only lists a directory again once
+        # its mtime changes (or importlib.invalidate_caches() is called)
+        try:
+            mtime = os.stat(directory).st_mtime
+        except OSError:
+            return frozenset()
+        cached = self.listings.get(directory)
+        if cached is None or cached[0] != mtime:
+            try:
+                names = frozenset(os.listdir(directory))
+            except OSError:
+                # Zip files and the like
+                names = frozenset()
+            cached = self.listings[directory] = (mtime, names)
+        return cached[1]
+
+    def find_spec(self, fullname: str, path: Optional[Sequence[str]] = None,
+                  target: object = None) -> Optional[ModuleSpec]:
+        name = fullname.rpartition('.')[2]
+        python_suffixes = importlib.machinery.all_suffixes()
+        python_files = [name + suffix for suffix in python_suffixes]
+        for entry in sys.path if path is None else path:
+            if not isinstance(entry, str):
+                continue
+            directory = entry or os.getcwd()
+            names = self.listing(directory)
+            if name not in names and name + SOURCE_SUFFIX not in names and names.isdisjoint(python_files):
+                continue
+            base = os.path.join(directory, name)
+            # A regular Python module earlier on the path keeps its precedence
+            if any(file in names and os.path.isfile(os.path.join(directory, file)) for file in python_files):
+                return None
+            if name in names and os.path.isdir(base):
+                if any(os.path.isfile(os.path.join(base, '__init__' + suffix)) for suffix in python_suffixes):
+                    return None
+                init = os.path.join(base, '__init__' + SOURCE_SUFFIX)
+                if os.path.isfile(init):
+                    return self.spec(fullname, init, [base])
+            if name + SOURCE_SUFFIX in names and os.path.isfile(base + SOURCE_SUFFIX):
+                return self.spec(fullname, base + SOURCE_SUFFIX, None)
+        return None
+
+    def loader(self, fullname: str, filename: str) -> ScyFileLoader:
+        return ScyFileLoader(fullname, filename, self.invalidation_mode)
+
+    def spec(self, fullname: str, filename: str, search_locations: Optional[list[str]]) -> ModuleSpec:
+        loader = self.loader(fullname, filename)
+        spec = importlib.util.spec_from_file_location(fullname, filename, loader=loader,
+                                                      submodule_search_locations=search_locations)
+        spec.cached = cache_from_source(filename)
+        return spec
+
+
+def install(invalidation_mode: Optional['PycInvalidationMode'] = None,
+            finder: Optional[ScyFinder] = None) -> ScyFinder:
+    for existing in sys.meta_path:
+        if isinstance(existing, ScyFinder):
+            return existing
+    if finder is None:
+        finder = ScyFinder(invalidation_mode)
+    # Go before PathFinder, otherwise a directory holding __init__.scy would be
+    # picked up as a namespace package
+    try:
+        index = sys.meta_path.index(importlib.machinery.PathFinder)
+    except ValueError:
+        index = len(sys.meta_path)
+    sys.meta_path.insert(index, finder)
+    return finder
+
+
+def uninstall() -> None:
+    sys.meta_path[:] = [finder for finder in sys.meta_path if not isinstance(finder, ScyFinder)]
@@ -0,0 +1,303 @@
+import ast
+import random
+from dataclasses import dataclass
+from typing import Callable, Iterator, Optional
+
+from scy.parser import Parser
+from scy.tokenizer import SCANNER_EOF_ERRORS, RegexTokenizer
+from scy.utils import LineIndex
+
+__all__ = ['IncrementalParser', 'Segment']
+
+
+@dataclass(init=True, repr=True)
+class Segment:
+    # One top-level declaration, with the source from its start up to the next
+    # one's; the first also holds what comes before it, and the last what comes
+    # after. A segment never knows its own offset or line, so an edit doesn't
+    # have to touch the segments after it. column is the lexer column the
+    # segment starts at, and nodes_line the line the nodes were parsed at, so
+    # line shifts from edits before it can be applied lazily.
+    text: str
+    newlines: int
+    column: int
+    nodes: list[ast.stmt]
+    nodes_line: int
+
+
+class Node:
+    # The segments are kept in a treap, in source order. Every node holds the
+    # segment count, length and newlines of its subtree, which is all it takes
+    # to find a segment by offset and to work out where it starts.
+    segment: Segment
+    priority: float
+    left: Optional['Node']
+    right: Optional['Node']
+    count: int
+    length: int
+    newlines: int
+
+    def __init__(self, segment: Segment) -> None:
+        self.segment = segment
+        self.priority = random.random()
+        self.left = None
+        self.right = None
+        self.update()
+
+    def update(self) -> 'Node':
+        count, length, newlines = 1, len(self.segment.text), self.segment.newlines
+        for child in (self.left, self.right):
+            if child is not None:
+                count += child.count
+                length += child.length
+                newlines += child.newlines
+        self.count, self.length, self.newlines = count, length, newlines
+        return self
+
+
+def build(segments: list[Segment]) -> Optional[Node]:
+    # Lays the segments out by priority in one pass; a node is finished once
+    # one with a higher priority comes along
+    stack: list[Node] = []
+    for segment in segments:
+        node = Node(segment)
+        last = None
+        while stack and stack[-1].priority < node.priority:
+            last = stack.pop().update()
+        node.left = last
+        if stack:
+            stack[-1].right = node
+        stack.append(node)
+    while stack:
+        last = stack.pop().update()
+    return last if segments else None
+
+
+def merge(left: Optional[Node], right: Optional[Node]) -> Optional[Node]:
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = merge(left.right, right)
+        return left.update()
+    right.left = merge(left, right.left)
+    return right.update()
+
+
+def split(node: Optional[Node], count: int) -> tuple[Optional[Node], Optional[Node]]:
+    # The first count segments, and the rest
+    if node is None:
+        return None, None
+    left_count = 0 if node.left is None else node.left.count
+    if count <= left_count:
+        first, node.left = split(node.left, count)
+        return first, node.update()
+    node.right, rest = split(node.right, count - left_count - 1)
+    return node.update(), rest
+
+
+def locate(node: Node, offset: int) -> tuple[int, int, int, Segment]:
+    # Index, start offset and line of the segment offset falls in; the end of
+    # the source falls in the last one
+    index, start, line = 0, 0, 1
+    while True:
+        left = node.left
+        if left is not None and offset < start + left.length:
+            node = left
+            continue
+        if left is not None:
+            index += left.count
+            start += left.length
+            line += left.newlines
+        segment = node.segment
+        if offset < start + len(segment.text) or node.right is None:
+            return index, start, line, segment
+        index += 1
+        start += len(segment.text)
+        line += segment.newlines
+        node = node.right
+
+
+def iter_segments(node: Optional[Node], reverse: bool = False) -> Iterator[Segment]:
+    stack: list[Node] = []
+    while stack or node is not None:
+        if node is not None:
+            stack.append(node)
+            node = node.right if reverse else node.left
+        else:
+            node = stack.pop()
+            yield node.segment
+            node = node.left if reverse else node.right
+
+
+class IncrementalParser:
+    # Keeps a source split into top-level declarations so an edit only re-lexes
+    # and re-parses from the declaration before the edit up to the first
+    # untouched declaration after it. Top-level declarations always end with ';'
+    # or '}', which never merge with a following token, so declaration starts are
+    # safe points to restart the lexer from. Nothing after that point is looked
+    # at, not even to shift its offsets, so an edit takes time proportional to
+    # what it re-parses, and the log of the declaration count.
+    filename: str
+    root: Optional[Node]
+    reparsed: int
+
+    def __init__(self, source: str, filename: str = '<unknown>') -> None:
+        self.filename = filename
+        segments, _ = self.parse_from(source, 1, 0)
+        self.root = build(segments)
+        self.reparsed = len(segments)
+
+    @property
+    def source(self) -> str:
+        return ''.join(segment.text for segment in iter_segments(self.root))
+
+    @property
+    def segments(self) -> list[Segment]:
+        return list(iter_segments(self.root))
+
+    @property
+    def tree(self) -> ast.Module:
+        # Line shifts from edits are only applied here, so a burst of edits
+        # doesn't walk the unchanged tail of the file once per keystroke
+        body = []
+        line = 1
+        for segment in iter_segments(self.root):
+            if line != segment.nodes_line:
+                for node in segment.nodes:
+                    ast.increment_lineno(node, line - segment.nodes_line)
+                segment.nodes_line = line
+            body.extend(segment.nodes)
+            line += segment.newlines
+        return ast.Module(body=body, type_ignores=[])
+
+    def edit(self, start: int, end: int, text: str) -> None:
+        if not 0 <= start <= end <= (0 if self.root is None else self.root.length):
+            raise ValueError(f'edit range {start}:{end} is outside the source')
+        before = middle = after = None
+        line, column, end_line = 1, 0, 1
+        head = text
+        if self.root is not None:
+            # The declaration before the edited one is re-parsed too, since the
+            # edit may change the token it peeked at (an 'else' appearing, for
+            # example).
+            first = max(locate(self.root, start)[0] - 1, 0)
+            last, last_start, end_line, segment = locate(self.root, end)
+            end_line += segment.text.count('\n', 0, end - last_start)
+            before, rest = split(self.root, first)
+            middle, after = split(rest, last + 1 - first)
+            restart = 0 if before is None else before.length
+            line += 0 if before is None else before.newlines
+            column = next(iter_segments(middle)).column
+            old = ''.join(segment.text for segment in iter_segments(middle))
+            head = old[:start - restart] + text + old[end - restart:]
+
+        # Old declarations after the edit are added to the text being parsed as
+        # they're needed, twice as many each time. They can be reused once the
+        # parser reaches one of their starts; ones beginning on the edit's last
+        # line would need their columns shifted, so those are simply re-parsed.
+        taken: Optional[Node] = None
+        texts = [head]
+        offset = len(head)
+        old_line = line + (0 if middle is None else middle.newlines)
+        resyncs: dict[int, int] = {}
+        window = head
+        try:
+            while True:
+                more, after = split(after, 1 if taken is None else taken.count)
+                for index, segment in enumerate(iter_segments(more), 0 if taken is None else taken.count):
+                    if old_line > end_line:
+                        resyncs[offset] = index
+                    texts.append(segment.text)
+                    offset += len(segment.text)
+                    old_line += segment.newlines
+                taken = merge(taken, more)
+                window = ''.join(texts)
+                parsed = self.parse_from(window, line, column, resyncs.get, after is None)
+                if parsed is not None:
+                    break
+        except BaseException as e:
+            # The edited source only exists in pieces, so the error can't look
+            # its line up itself. The edit never happened as far as the
+            # segments are concerned.
+            if isinstance(e, SyntaxError) and e.lineno is not None:
+                e.text = edited_line(window, line, e.lineno, before, after)
+            self.root = merge(before, merge(middle, merge(taken, after)))
+            raise
+        segments, reuse = parsed
+        self.reparsed = len(segments)
+        kept = None if reuse is None else split(taken, reuse)[1]
+        self.root = merge(before, merge(build(segments), merge(kept, after)))
+
+    def parse_from(self, source: str, line: int, column: int,
+                   resync: Callable[[int], Optional[int]] = None,
+                   complete: bool = True) -> Optional[tuple[list[Segment], Optional[int]]]:
+        # Parses source, which starts at the given line and column of the file,
+        # into segments. Stops early where resync finds an old segment to reuse;
+        # if source isn't the rest of the file that has to happen, and None
+        # means more of the file is needed.
+        lines = LineIndex(source)
+        tokenizer = RegexTokenizer(source, self.filename, lines)
+        tokenizer.line = line
+        tokenizer.start_column = tokenizer.column = column
+        parser = Parser(tokenizer.iter_tokens(), self.filename, source, lines)
+        starts = [(0, line, column)]
+        declarations = []
+        reuse = None
+        stop = len(source)
+        try:
+            while not parser.is_at_end():
+                token = parser.peek()
+                position = token.index - len(token.lexeme)
+                if declarations:
+                    if resync is not None:
+                        reuse = resync(position)
+                        if reuse is not None:
+                            stop = position
+                            break
+                    starts.append((position, token.line, token.column))
+                declarations.append(parser.declaration())
+        except SyntaxError as e:
+            # Running out of text may be all that's wrong
+            if not complete and (tokenizer.current == len(source) or e.msg in SCANNER_EOF_ERRORS):
+                return None
+            raise
+        if not complete and reuse is None:
+            return None
+        if not declarations:
+            # Only blank lines and comments, which still need a segment to live in
+            declarations.append([])
+        segments = []
+        ends = [start for (start, _, _) in starts[1:]] + [stop]
+        for (start, line, column), end, nodes in zip(starts, ends, declarations):
+            text = source[start:end]
+            segments.append(Segment(text, text.count('\n'), column, nodes, line))
+        return (segments if source else []), reuse
+
+
+def edited_line(window: str, line: int, lineno: int, before: Optional[Node], after: Optional[Node]) -> str:
+    # Line lineno of the edited source for an error found in window, which
+    # starts at line. It may begin in the segments before window and run on
+    # into the ones after it.
+    start = 0
+    for _ in range(lineno - line):
+        start = window.find('\n', start) + 1
+    end = window.find('\n', start)
+    text = window[start:] if end == -1 else window[start:end]
+    if end == -1:
+        for segment in iter_segments(after):
+            newline = segment.text.find('\n')
+            if newline != -1:
+                text += segment.text[:newline]
+                break
+            text += segment.text
+    if lineno == line:
+        prefix = []
+        for segment in iter_segments(before, reverse=True):
+            newline = segment.text.rfind('\n')
+            prefix.append(segment.text[newline + 1:])
+            if newline != -1:
+                break
+        text = ''.join(reversed(prefix)) + text
+    return text
@@ -0,0 +1,447 @@
+import ast
+import copy
+import operator
+from typing import Any, Callable, Iterator, Optional, Union
+
+__all__ = ['Optimizer', 'optimize']
+
+# Same limits CPython's own AST optimizer uses, so folding never builds
+# constants much bigger than the expressions they replace
+MAX_INT_SIZE = 128
+MAX_STR_SIZE = 4096
+
+FOLDABLE_TYPES = (int, float, complex, str, bytes)
+
+BINARY_FUNCTIONS: dict[type[ast.operator], Callable[[Any, Any], Any]] = {
+    ast.Add:      operator.add,
+    ast.Sub:      operator.sub,
+    ast.Mult:     operator.mul,
+    ast.Div:      operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod:      operator.mod,
+    ast.Pow:      operator.pow,
+    ast.LShift:   operator.lshift,
+    ast.RShift:   operator.rshift,
+    ast.BitOr:    operator.or_,
+    ast.BitXor:   operator.xor,
+    ast.BitAnd:   operator.and_,
+}
+
+UNARY_FUNCTIONS: dict[type[ast.unaryop], Callable[[Any], Any]] = {
+    ast.UAdd:   operator.pos,
+    ast.USub:   operator.neg,
+    ast.Invert: operator.invert,
+    ast.Not:    operator.not_,
+}
+
+COMPARISON_FUNCTIONS: dict[type[ast.cmpop], Callable[[Any, Any], Any]] = {
+    ast.Eq:    operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt:    operator.lt,
+    ast.LtE:   operator.le,
+    ast.Gt:    operator.gt,
+    ast.GtE:   operator.ge,
+}
+
+
+def is_constant(node: ast.AST) -> bool:
+    return isinstance(node, ast.Constant) and type(node.value) in FOLDABLE_TYPES + (bool, type(None))
+
+
+def too_large(op: ast.operator, left: Any, right: Any) -> bool:
+    # Checked before computing anything, as '2 ** 10 ** 10' would never finish
+    if isinstance(left, bool):
+        left = int(left)
+    if isinstance(right, bool):
+        right = int(right)
+    if isinstance(op, ast.Mod):
+        # printf-style formatting can pad to any width
+        return isinstance(left, (str, bytes))
+    if isinstance(op, ast.Pow):
+        return (type(left) is int and type(right) is int and right > 0
+                and left.bit_length() * right > MAX_INT_SIZE)
+    if isinstance(op, ast.LShift):
+        return (type(left) is int and type(right) is int and 0 <= right
+                and left.bit_length() + right > MAX_INT_SIZE)
+    if isinstance(op, ast.Mult):
+        if type(left) is int and type(right) is int:
+            return left.bit_length() + right.bit_length() > MAX_INT_SIZE
+        for sequence, count in ((left, right), (right, left)):
+            if isinstance(sequence, (str, bytes)) and type(count) is int:
+                return count > 0 and len(sequence) * count > MAX_STR_SIZE
+    return False
+
+
+def fits(value: Any) -> bool:
+    if isinstance(value, (str, bytes)):
+        return len(value) <= MAX_STR_SIZE
+    if type(value) is int:
+        return value.bit_length() <= MAX_INT_SIZE
+    return True
+
+
+def binds_or_yields(nodes: list[ast.AST], function: bool) -> bool:
+    # Dropping code that yields turns a generator into a plain function, and
+    # inside a function dropping an assignment can turn a local into a global,
+    # or a name in a class body into the enclosing function's variable
+    for node in nodes:
+        for child in ast.walk(node):
+            if isinstance(child, (ast.Yield, ast.YieldFrom, ast.Await)):
+                return True
+            if function and (
+                    isinstance(child, ast.Name) and not isinstance(child.ctx, ast.Load)
+                    or isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef,
+                                          ast.Import, ast.ImportFrom, ast.NamedExpr, ast.Global, ast.Nonlocal))):
+                return True
+    return False
+
+
+COMPREHENSIONS = (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+SCOPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef) + COMPREHENSIONS
+
+# (comparison, increment operator) -> how the comparison's bound maps onto
+# range()'s stop, and the sign of the step
+COUNTING_LOOPS: dict[tuple[type[ast.cmpop], type[ast.operator]], tuple[int, int]] = {
+    (ast.Lt, ast.Add):  (0, 1),
+    (ast.LtE, ast.Add): (1, 1),
+    (ast.Gt, ast.Sub):  (0, -1),
+    (ast.GtE, ast.Sub): (-1, -1),
+}
+
+
+# Names the lowered loops call
+LOWERING_BUILTINS = frozenset({'range', 'type', 'int'})
+
+
+def scope_nodes(node: ast.AST) -> Iterator[ast.AST]:
+    # Like ast.walk, but doesn't descend into nested functions, classes or comprehensions
+    todo = [node]
+    while todo:
+        child = todo.pop()
+        yield child
+        if not isinstance(child, SCOPES):
+            todo.extend(ast.iter_child_nodes(child))
+
+
+def binds(node: ast.AST) -> Iterator[str]:
+    # Names node itself binds, not counting its children
+    if isinstance(node, ast.Name):
+        if not isinstance(node.ctx, ast.Load):
+            yield node.id
+    elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        yield node.name
+    elif isinstance(node, (ast.Import, ast.ImportFrom)):
+        for alias in node.names:
+            yield (alias.asname or alias.name).partition('.')[0]
+    elif isinstance(node, (ast.Global, ast.Nonlocal)):
+        yield from node.names
+    elif isinstance(node, ast.arg):
+        yield node.arg
+
+
+def comprehension_targets(node: ast.AST) -> Iterator[str]:
+    # Names ':=' binds inside a comprehension, which belong to the scope around
+    # it, as do those in comprehensions nested in it
+    todo = list(ast.iter_child_nodes(node))
+    while todo:
+        child = todo.pop()
+        if isinstance(child, ast.NamedExpr) and isinstance(child.target, ast.Name):
+            yield child.target.id
+        if not isinstance(child, SCOPES) or isinstance(child, COMPREHENSIONS):
+            todo.extend(ast.iter_child_nodes(child))
+
+
+def bound_names(node: ast.AST) -> set[str]:
+    # Names the code directly inside node binds
+    names = set()
+    for child in scope_nodes(node):
+        names.update(binds(child))
+        if isinstance(child, COMPREHENSIONS) and child is not node:
+            names.update(comprehension_targets(child))
+    return names
+
+
+def continues(body: list[ast.stmt]) -> bool:
+    # Whether body has a 'continue' for the loop it's the body of, leaving out
+    # those in nested loops and scopes
+    todo = list(body)
+    while todo:
+        node = todo.pop()
+        if isinstance(node, ast.Continue):
+            return True
+        if not isinstance(node, SCOPES + (ast.For, ast.AsyncFor, ast.While)):
+            todo.extend(ast.iter_child_nodes(node))
+        elif isinstance(node, (ast.For, ast.AsyncFor, ast.While)):
+            # A loop's else clause still belongs to the outer loop
+            todo.extend(node.orelse)
+    return False
+
+
+def counter_step(statement: ast.stmt, counter: str) -> Optional[tuple[type[ast.operator], int]]:
+    # 'i = i + k', 'i += k' or the same with '-', for a positive int constant k
+    if isinstance(statement, ast.AugAssign):
+        target, op, step = statement.target, statement.op, statement.value
+    elif isinstance(statement, ast.Assign) and len(statement.targets) == 1 and isinstance(statement.value, ast.BinOp):
+        target, op, step = statement.targets[0], statement.value.op, statement.value.right
+        left = statement.value.left
+        if not (isinstance(left, ast.Name) and left.id == counter):
+            return None
+    else:
+        return None
+    if not (isinstance(target, ast.Name) and target.id == counter
+            and isinstance(step, ast.Constant) and type(step.value) is int and step.value > 0):
+        return None
+    return type(op), step.value
+
+
+def located(node: ast.AST, like: ast.AST) -> ast.AST:
+    for child in ast.walk(node):
+        ast.copy_location(child, like)
+    return node
+
+
+def lower_counting_loop(initializer: ast.stmt, loop: ast.stmt, local_names: set[str],
+                        shadowed: set[str]) -> Optional[list[ast.stmt]]:
+    # 'i = a; while (i < n) { ...; i += k; }', which is what a C-style for
+    # loop parses into, becomes a for loop over range(a, n, k) when nothing can
+    # tell the difference: i only ever holds ints, n (a local or a constant)
+    # can't change, and nothing skips the increment. i still ends up with the
+    # value the while loop would leave it with.
+    if not (isinstance(initializer, ast.Assign) and len(initializer.targets) == 1
+            and isinstance(initializer.targets[0], ast.Name)
+            and isinstance(initializer.value, ast.Constant) and type(initializer.value.value) is int):
+        return None
+    if not (isinstance(loop, ast.While) and loop.body and isinstance(loop.test, ast.Compare)
+            and len(loop.test.ops) == 1):
+        return None
+    counter = initializer.targets[0].id
+    test = loop.test
+    bound = test.comparators[0]
+    if not (isinstance(test.left, ast.Name) and test.left.id == counter):
+        return None
+    if isinstance(bound, ast.Name):
+        if bound.id == counter or bound.id not in local_names:
+            return None
+    elif not (isinstance(bound, ast.Constant) and type(bound.value) is int):
+        return None
+    step = counter_step(loop.body[-1], counter)
+    if step is None or (type(test.ops[0]), step[0]) not in COUNTING_LOOPS:
+        return None
+    if shadowed & (LOWERING_BUILTINS if isinstance(bound, ast.Name) else {'range'}):
+        return None
+    body = loop.body[:-1]
+    rebound = set()
+    for statement in body:
+        rebound |= bound_names(statement)
+        # Closures can only rebind them by declaring them nonlocal
+        rebound.update(name for node in ast.walk(statement) if isinstance(node, ast.Nonlocal) for name in node.names)
+    if counter in rebound or (isinstance(bound, ast.Name) and bound.id in rebound) or continues(body):
+        return None
+
+    offset, sign = COUNTING_LOOPS[type(test.ops[0]), step[0]]
+    if isinstance(bound, ast.Constant):
+        stop = ast.Constant(bound.value + offset)
+    elif offset:
+        stop = ast.BinOp(ast.Name(bound.id, ast.Load()), ast.Add() if offset > 0 else ast.Sub(), ast.Constant(1))
+    else:
+        stop = ast.Name(bound.id, ast.Load())
+    arguments = [ast.Constant(initializer.value.value), stop, ast.Constant(sign * step[1])]
+    if arguments[2].value == 1:
+        del arguments[2]
+    # A while loop that finishes leaves the counter one step past the last
+    # value the body saw; range() leaves it at that value
+    finish = ast.If(copy.deepcopy(test), [copy.deepcopy(loop.body[-1])], [])
+    lowered = ast.For(
+        ast.Name(counter, ast.Store()),
+        ast.Call(ast.Name('range', ast.Load()), arguments, []),
+        body or [ast.Pass()],
+        [located(finish, loop.body[-1]), *loop.orelse],
+    )
+    ast.copy_location(lowered, loop)
+    located(lowered.iter, test)
+    located(lowered.target, initializer.targets[0])
+    if isinstance(bound, ast.Constant):
+        return [initializer, lowered]
+    # range() only takes ints, and n < i works for any number
+    guard = ast.Compare(
+        ast.Call(ast.Name('type', ast.Load()), [ast.Name(bound.id, ast.Load())], []),
+        [ast.Is()], [ast.Name('int', ast.Load())],
+    )
+    fallback = copy.deepcopy(loop)
+    return [initializer, ast.copy_location(ast.If(located(guard, test), [lowered], [fallback]), loop)]
+
+
+class Optimizer(ast.NodeTransformer):
+    # Folds constant expressions, drops branches that can never run and
+    # simplifies boolean operations on constants. Everything it replaces keeps
+    # its source location.
+    function_depth: int
+    shadowed: set[str]
+
+    def __init__(self) -> None:
+        self.function_depth = 0
+        # Builtins the module rebinds somewhere, which lowering can't rely on
+        self.shadowed = set()
+
+    def visit_Module(self, node: ast.Module) -> ast.AST:
+        for child in ast.walk(node):
+            if isinstance(child, ast.ImportFrom) and any(alias.name == '*' for alias in child.names):
+                # Could bind any of them
+                self.shadowed.update(LOWERING_BUILTINS)
+            self.shadowed.update(name for name in binds(child) if name in LOWERING_BUILTINS)
+        return self.generic_visit(node)
+
+    def generic_visit(self, node: ast.AST) -> ast.AST:
+        super().generic_visit(node)
+        # Removing dead branches can leave a block with nothing in it
+        if not isinstance(node, ast.Module) and getattr(node, 'body', None) == []:
+            node.body.append(ast.copy_location(ast.Pass(), node))
+        return node
+
+    def visit_FunctionDef(self, node: Union[ast.FunctionDef, ast.AsyncFunctionDef]) -> ast.AST:
+        self.function_depth += 1
+        try:
+            self.generic_visit(node)
+        finally:
+            self.function_depth -= 1
+        if isinstance(node.body, list):
+            # Only locals are safe from being changed behind the loop's back
+            arguments = node.args
+            local_names = {arg.arg for arg in (*arguments.posonlyargs, *arguments.args, *arguments.kwonlyargs,
+                                               arguments.vararg, arguments.kwarg) if arg is not None}
+            for statement in node.body:
+                local_names |= bound_names(statement)
+            node.body = self.lower_loops(node.body, local_names)
+        return node
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+    visit_Lambda = visit_FunctionDef
+
+    def removable(self, nodes: list[ast.AST]) -> bool:
+        return not binds_or_yields(nodes, self.function_depth > 0)
+
+    def constant(self, value: Any, node: ast.AST) -> ast.Constant:
+        return ast.copy_location(ast.Constant(value), node)
+
+    def visit_BinOp(self, node: ast.BinOp) -> ast.expr:
+        self.generic_visit(node)
+        if not (is_constant(node.left) and is_constant(node.right)):
+            return node
+        left, right = node.left.value, node.right.value
+        if too_large(node.op, left, right):
+            return node
+        try:
+            value = BINARY_FUNCTIONS[type(node.op)](left, right)
+        except Exception:
+            # Leave it to raise at run time, like CPython does
+            return node
+        if type(value) not in FOLDABLE_TYPES + (bool,) or not fits(value):
+            return node
+        return self.constant(value, node)
+
+    def visit_UnaryOp(self, node: ast.UnaryOp) -> ast.expr:
+        self.generic_visit(node)
+        if not is_constant(node.operand):
+            return node
+        if isinstance(node.op, ast.Invert) and isinstance(node.operand.value, bool):
+            # Deprecated, so let it warn at run time
+            return node
+        try:
+            value = UNARY_FUNCTIONS[type(node.op)](node.operand.value)
+        except Exception:
+            return node
+        return self.constant(value, node)
+
+    def visit_Compare(self, node: ast.Compare) -> ast.expr:
+        self.generic_visit(node)
+        operands = [node.left, *node.comparators]
+        if not all(map(is_constant, operands)):
+            return node
+        try:
+            for op, left, right in zip(node.ops, operands, operands[1:]):
+                function = COMPARISON_FUNCTIONS.get(type(op))
+                if function is None:
+                    return node
+                if not function(left.value, right.value):
+                    return self.constant(False, node)
+        except Exception:
+            return node
+        return self.constant(True, node)
+
+    def visit_BoolOp(self, node: ast.BoolOp) -> ast.expr:
+        self.generic_visit(node)
+        # 'a && b' is b when a is truthy and a otherwise, so a constant that
+        # doesn't stop evaluation can go, and one that does ends the chain
+        stops = isinstance(node.op, ast.Or)
+        values = []
+        for index, value in enumerate(node.values):
+            if is_constant(value):
+                if bool(value.value) == stops:
+                    values.append(value)
+                    # What never runs can still make a generator or a local
+                    rest = node.values[index + 1:]
+                    if not self.removable(rest):
+                        values += rest
+                    break
+                if value is not node.values[-1]:
+                    continue
+            values.append(value)
+        if len(values) == 1:
+            return values[0]
+        node.values = values
+        return node
+
+    def visit_IfExp(self, node: ast.IfExp) -> ast.expr:
+        self.generic_visit(node)
+        if not is_constant(node.test):
+            return node
+        taken, dropped = (node.body, node.orelse) if node.test.value else (node.orelse, node.body)
+        if not self.removable([dropped]):
+            return node
+        return taken
+
+    def visit_If(self, node: ast.If) -> Union[ast.stmt, list[ast.stmt]]:
+        self.generic_visit(node)
+        if not is_constant(node.test):
+            return node
+        taken, dropped = (node.body, node.orelse) if node.test.value else (node.orelse, node.body)
+        if not self.removable(dropped):
+            return node
+        return self.statements(taken)
+
+    def visit_While(self, node: ast.While) -> Union[ast.stmt, list[ast.stmt]]:
+        self.generic_visit(node)
+        if not is_constant(node.test):
+            return node
+        if node.test.value:
+            # 'while (1)' compiles like 'while True', without testing anything
+            if node.test.value is not True:
+                node.test = self.constant(True, node.test)
+            return node
+        if not self.removable(node.body):
+            return node
+        return self.statements(node.orelse)
+
+    def lower_loops(self, body: list[ast.stmt], local_names: set[str]) -> list[ast.stmt]:
+        result = []
+        for statement in body:
+            if not isinstance(statement, SCOPES):
+                for field in ('body', 'orelse'):
+                    block = getattr(statement, field, None)
+                    if isinstance(block, list):
+                        setattr(statement, field, self.lower_loops(block, local_names))
+            if result:
+                lowered = lower_counting_loop(result[-1], statement, local_names, self.shadowed)
+                if lowered is not None:
+                    result[-1:] = lowered
+                    continue
+            result.append(statement)
+        return result
+
+    def statements(self, body: list[ast.stmt]) -> list[ast.stmt]:
+        # Spliced into the enclosing block; its emptiness is dealt with there
+        return [statement for statement in body if not isinstance(statement, ast.Pass)]
+
+
+def optimize(tree: ast.AST) -> ast.AST:
+    return ast.fix_missing_locations(Optimizer().visit(tree))
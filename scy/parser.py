@@ -1,10 +1,15 @@
 import ast
-from typing import Any, Union
+from enum import IntEnum
+from typing import Any, Generator, Iterable, Iterator, Optional, Sequence, Union
 
 from scy import exceptions
-from scy.tokens import (BINARY_OPERATORS, COMPARISON_OPERATORS,
-                        UNARY_OPERATORS, Token, TokenGroup, TokenType)
-from scy.utils import find_line
+from scy.tokens import (AUGMENTED_OPERATORS, BINARY_OPERATORS,
+                        BOOLEAN_OPERATORS, COMPARISON_OPERATORS, UNARY_OPERATORS, Token,
+                        TokenBuffer, TokenGroup, TokenType)
+from scy.utils import LineIndex
+
+# A statement parser; see Parser.run
+Steps = Generator['Steps', Any, Any]
 
 ASSIGNABLES = (
     ast.Attribute,
@@ -15,48 +20,292 @@ ASSIGNABLES = (
     ast.Tuple,
 )
 
+# Targets 'x += y' can update in place
+AUGMENTABLES = (
+    ast.Attribute,
+    ast.Subscript,
+    ast.Name,
+)
+
+
+class Precedence(IntEnum):
+    # Where an operand may also be a named expression, or a yield
+    NAMED = -1
+    YIELD = 0
+    OR = 1
+    AND = 2
+    NOT = 3
+    COMPARISON = 4
+    BIT_OR = 5
+    BIT_XOR = 6
+    BIT_AND = 7
+    BIT_SHIFT = 8
+    TERM = 9
+    FACTOR = 10
+    UNARY = 11
+    POWER = 12
+
+
+BINARY_PRECEDENCE: dict[TokenType, Precedence] = {
+    TokenType.PIPE_PIPE:           Precedence.OR,
+    TokenType.AMPERSAND_AMPERSAND: Precedence.AND,
+    **dict.fromkeys(TokenGroup.SINGLE_COMPARISON, Precedence.COMPARISON),
+    TokenType.NOT:                 Precedence.COMPARISON,
+    TokenType.PIPE:                Precedence.BIT_OR,
+    TokenType.CARET:               Precedence.BIT_XOR,
+    TokenType.AMPERSAND:           Precedence.BIT_AND,
+    **dict.fromkeys(TokenGroup.BIT_SHIFT, Precedence.BIT_SHIFT),
+    **dict.fromkeys(TokenGroup.TERMS, Precedence.TERM),
+    **dict.fromkeys(TokenGroup.FACTORS, Precedence.FACTOR),
+    TokenType.STAR_STAR:           Precedence.POWER,
+}
+
+# Prefix operator -> (its precedence, precedence its operand is parsed at).
+# '!' takes a comparison, the others nest and take a power.
+PREFIX_PRECEDENCE: dict[TokenType, tuple[Precedence, Precedence]] = {
+    TokenType.BANG: (Precedence.NOT, Precedence.COMPARISON),
+    **dict.fromkeys(TokenGroup.UNARY_LOW, (Precedence.UNARY, Precedence.UNARY)),
+}
+
+# The operator nodes carry no data, so like CPython's own parser share one of each
+BINARY_NODES: dict[TokenType, ast.operator] = {kind: klass() for (kind, klass) in BINARY_OPERATORS.items()}
+UNARY_NODES: dict[TokenType, ast.unaryop] = {kind: klass() for (kind, klass) in UNARY_OPERATORS.items()}
+AUGMENTED_NODES: dict[TokenType, ast.operator] = {kind: klass() for (kind, klass) in AUGMENTED_OPERATORS.items()}
+
+CONSTANTS: dict[TokenType, Any] = {
+    TokenType.FALSE:    False,
+    TokenType.TRUE:     True,
+    TokenType.NONE:     None,
+    TokenType.ELLIPSIS: Ellipsis,
+}
+
+# Statements that can hold others, parsed by generators (see Parser.run); the
+# rest are parsed with plain calls
+NESTING_KINDS = frozenset((TokenType.ASYNC, TokenType.DEF, TokenType.CLASS,
+                           TokenType.FOR, TokenType.IF, TokenType.WHILE))
+# Tokens a block's '{' comes right after
+BLOCK_OPENERS = frozenset((TokenType.RIGHT_PAREN, TokenType.ELSE, TokenType.IDENTIFIER))
+POSTFIX_KINDS = frozenset((TokenType.LEFT_PAREN, TokenType.DOT))
+CLAUSE_KINDS = frozenset((TokenType.FOR, TokenType.ASYNC))
+COMPARISON_KINDS = frozenset(kind for (kind, precedence) in BINARY_PRECEDENCE.items()
+                             if precedence == Precedence.COMPARISON)
+
+# Frames on the expression parser's stack are tuples starting with one of
+# these, saying what the frame waits for, followed by what it needs to finish
+ASSIGN_TARGET = 0       # an expression '=' may follow
+ASSIGN_VALUE = 1        # the value of a named expression: (target, '=' token)
+YIELD_VALUE = 2         # (Yield or YieldFrom, first token, last token)
+PREFIX_OPERAND = 3      # (operator kind, min precedence to continue at)
+INFIX = 4               # an operand binary operators may follow: (min precedence)
+BINARY_RIGHT = 5        # (min precedence, left, operator kind)
+BOOLEAN_VALUE = 6       # (min precedence, operator kind, values)
+COMPARISON_RIGHT = 7    # (min precedence, left, operators, comparators)
+AWAIT_VALUE = 8         # ('await' token)
+POSTFIX = 9             # a primary calls and attributes may follow
+ARGUMENT = 10           # (callee, arguments so far, '(' token)
+GROUP = 11              # the inside of '(' ... ')': ('(' token)
+# The rest belong to comprehensions
+ELEMENT = 12            # the element, or a dict's key: (node class, opening token, closing kind)
+DICT_VALUE = 13         # (opening token, closing kind, key)
+CLAUSE_ITERABLE = 14    # the iterable in 'for (x : ...)': (comprehension, target, is_async)
+CLAUSE_CONDITION = 15   # the condition in 'if (...)': (comprehension)
+GENERATOR_ARGUMENT = 16 # a generator expression that is a call's only argument: (callee)
+
+ASSIGN_TARGET_FRAME = (ASSIGN_TARGET,)
+INFIX_FRAMES = [(INFIX, precedence) for precedence in range(Precedence.POWER + 2)]
+POSTFIX_FRAME = (POSTFIX,)
+
+# A comprehension being parsed: (node class, opening token, closing kind,
+# element or key and value, generators)
+Comprehension = tuple[type[ast.expr], Token, TokenType, list[ast.expr], list[ast.comprehension]]
+
+# Brackets that only start comprehensions -> (node class, closing kind). '{'
+# is a set comprehension unless a ':' follows the first expression.
+COMPREHENSION_BRACKETS: dict[TokenType, tuple[Optional[type[ast.expr]], TokenType]] = {
+    TokenType.LEFT_BRACKET: (ast.ListComp, TokenType.RIGHT_BRACKET),
+    TokenType.LEFT_BRACE:   (None, TokenType.RIGHT_BRACE),
+}
+CLOSING_BRACKETS: dict[TokenType, str] = {
+    TokenType.RIGHT_PAREN:   ')',
+    TokenType.RIGHT_BRACKET: ']',
+    TokenType.RIGHT_BRACE:   '}',
+}
+
+
+class TokenWindow:
+    # Ring buffer over a token iterator. The parser never looks further than one
+    # token ahead or one behind, so only the last few tokens are kept alive.
+    tokens: Iterator[Token]
+    buffer: list[Optional[Token]]
+    size: int
+    end: int
+    kinds: 'TokenWindowKinds'
+
+    def __init__(self, tokens: Iterable[Token], size: int = 4) -> None:
+        self.tokens = iter(tokens)
+        self.buffer = [None] * size
+        self.size = size
+        self.end = 0
+        self.kinds = TokenWindowKinds(self)
+
+    def __getitem__(self, index: int) -> Token:
+        while index >= self.end:
+            self.buffer[self.end % self.size] = next(self.tokens)
+            self.end += 1
+        if index < 0 or index < self.end - self.size:
+            raise IndexError(f'token {index} is no longer buffered')
+        return self.buffer[index % self.size]
+
+
+class TokenWindowKinds:
+    window: TokenWindow
+
+    def __init__(self, window: TokenWindow) -> None:
+        self.window = window
+
+    def __getitem__(self, index: int) -> TokenType:
+        return self.window[index].type
+
 
 class Parser:
-    tokens: list[Token]
+    tokens: Sequence[Token]
+    kinds: Sequence[int]
     filename: str
     source: str
+    lines: LineIndex
+    errors: Optional[list[SyntaxError]]
     current: int
-
-    def __init__(self, tokens: list[Token], filename: str, source: str) -> None:
+    current_kind: int
+    open_braces: int
+
+    def __init__(self, tokens: Union[Sequence[Token], Iterator[Token]], filename: str, source: str,
+                 lines: Optional[LineIndex] = None, errors: Optional[list[SyntaxError]] = None) -> None:
+        if isinstance(tokens, Iterator):
+            tokens = TokenWindow(tokens)
+        if isinstance(tokens, (TokenWindow, TokenBuffer)):
+            kinds = tokens.kinds
+        else:
+            kinds = [token.type for token in tokens]
         self.tokens = tokens
+        self.kinds = kinds
         self.filename = filename
         self.source = source
+        self.lines = LineIndex(source) if lines is None else lines
+        # When given a list, a bad statement is recorded there and skipped
+        # instead of ending the parse
+        self.errors = errors
+        self.open_braces = 0
         self.current = 0
+        self.current_kind = kinds[0]
 
     def declaration(self) -> list[ast.stmt]:
+        if self.current_kind in NESTING_KINDS:
+            return self.run(self.declaration_steps())
+        return self.statement()
+
+    def run(self, steps: Steps) -> Any:
+        # Statements are parsed by generators that, instead of calling each
+        # other, yield the generator for a nested statement or block and are
+        # sent its result (or have its exception thrown in). Nesting grows this
+        # list rather than the Python stack.
+        stack = [steps]
+        value = None
+        error = None
+        while True:
+            try:
+                if error is None:
+                    request = stack[-1].send(value)
+                else:
+                    request = stack[-1].throw(error)
+            except StopIteration as e:
+                stack.pop()
+                if not stack:
+                    return e.value
+                value = e.value
+                error = None
+            except Exception as e:
+                stack.pop()
+                if not stack:
+                    raise
+                value = None
+                error = e
+            else:
+                stack.append(request)
+                value = None
+                error = None
+
+    def declaration_steps(self) -> Steps:
         is_async = self.match_(TokenType.ASYNC)
         if self.match_(TokenType.DEF):
-            return [self.function(self.peek(), is_async)]
+            return [(yield self.function(self.peek(), is_async))]
         elif self.match_(TokenType.CLASS):
             self.raise_if_async(is_async)
-            return [self.class_(self.peek())]
+            return [(yield self.class_(self.peek()))]
+        elif self.match_(TokenType.FOR):
+            return (yield self.for_statement(is_async))
+        elif self.match_(TokenType.IF):
+            self.raise_if_async(is_async)
+            return [(yield self.if_statement())]
+        elif self.match_(TokenType.WHILE):
+            self.raise_if_async(is_async)
+            return [(yield self.while_statement())]
         return self.statement(is_async)
 
-    def function(self, creator: Token, is_async: bool) -> ast.FunctionDef:
+    def recovering_declaration(self) -> Steps:
+        start = self.current
+        try:
+            return (yield self.declaration_steps())
+        except SyntaxError as e:
+            self.errors.append(e)
+            self.synchronize(start)
+            return []
+
+    def synchronize(self, start: int) -> None:
+        # Skip to the end of the broken statement: past a ';' or a braced block
+        # at the same nesting level, or up to the '}' closing the enclosing one.
+        # Braces of set and dict comprehensions don't end a statement; blocks
+        # are the ones opened right after a ')', 'else' or class name.
+        braces = [False] * self.open_braces
+        self.open_braces = 0
+        while not self.is_at_end():
+            kind = self.current_kind
+            if kind == TokenType.RIGHT_BRACE:
+                if not braces:
+                    if self.current == start:
+                        # A stray '}' that nothing will consume
+                        self.advance()
+                    return
+                block = braces.pop()
+                self.advance()
+                if block and not braces:
+                    return
+                continue
+            if kind == TokenType.LEFT_BRACE:
+                braces.append(self.current == 0 or self.kinds[self.current - 1] in BLOCK_OPENERS)
+            self.advance()
+            if kind == TokenType.SEMICOLON and not braces:
+                return
+
+    def function(self, creator: Token, is_async: bool) -> Steps:
         klass = ast.AsyncFunctionDef if is_async else ast.FunctionDef
         name = self.consume(TokenType.IDENTIFIER, f'Expect function name.')
         self.consume(TokenType.LEFT_PAREN, f"Expect '(' after function name.")
         arguments = self.parse_args_def()
         self.consume(TokenType.LEFT_BRACE, f"Expect '{{' before function body.")
-        body = self.block()
+        body = yield self.block()
         if not body:
             body = [self.ast_token(klass=ast.Pass)]
         return self.ast_token(name.lexeme, arguments, body, [],
             klass=klass, first=creator, last=self.previous())
 
-    def class_(self, creator: Token) -> ast.FunctionDef:
+    def class_(self, creator: Token) -> Steps:
         name = self.consume(TokenType.IDENTIFIER, f'Expect class name.')
         if self.match_(TokenType.LEFT_PAREN):
             args, kwargs, paren = self.parse_args_call()
         else:
             args, kwargs, paren = [], [], None
         self.consume(TokenType.LEFT_BRACE, f"Expect '{{' before class body.")
-        body = self.block()
+        body = yield self.block()
         if not body:
             body = [self.ast_token(klass=ast.Pass)]
         return self.ast_token(name.lexeme, args, kwargs, body, [],
@@ -84,17 +333,9 @@ class Parser:
         elif self.match_(TokenType.FROM):
             self.raise_if_async(is_async)
             return [self.from_statement()]
-        elif self.match_(TokenType.FOR):
-            return self.for_statement(is_async)
-        elif self.match_(TokenType.IF):
-            self.raise_if_async(is_async)
-            return [self.if_statement()]
         elif self.match_(TokenType.RETURN):
             self.raise_if_async(is_async)
             return [self.return_statement()]
-        elif self.match_(TokenType.WHILE):
-            self.raise_if_async(is_async)
-            return [self.while_statement()]
         elif self.match_(TokenType.BREAK, TokenType.CONTINUE):
             self.raise_if_async(is_async)
             word = self.previous()
@@ -169,7 +410,7 @@ class Parser:
             self.consume(TokenType.SEMICOLON, "Expect ';' after return value.")
             return self.ast_token(value, klass=ast.Return, first=keyword, last=last)
 
-    def for_statement(self, is_async: bool) -> list[ast.stmt]:
+    def for_statement(self, is_async: bool) -> Steps:
         for_word = self.previous()
         self.consume(TokenType.LEFT_PAREN, "Expect '(' after 'for'.")
         if self.match_(TokenType.SEMICOLON):
@@ -182,7 +423,7 @@ class Parser:
             if self.previous().type == TokenType.COLON:
                 if isinstance(initializer.value, ast.Name):
                     initializer.value.ctx = ast.Store()
-                    return [self.for_in_statement(initializer.value, for_word, is_async)]
+                    return [(yield self.for_in_statement(initializer.value, for_word, is_async))]
                 else:
                     raise self.error(self.previous(), exceptions.ITERATION_INVALID_ASSIGNMENT)
             if is_async:
@@ -199,13 +440,13 @@ class Parser:
         else:
             increment = self.expression_statement(TokenType.RIGHT_PAREN,
                                                   "Expect ')' after for clauses")
-        body = self.optional_block(increment is None)
+        body = yield self.optional_block(increment is None)
         if increment is not None:
             body.append(increment)
         if condition is None:
             condition = self.ast_token(True, first=condition_tok)
         if self.match_(TokenType.ELSE):
-            else_branch = self.optional_block()
+            else_branch = yield self.optional_block()
         else:
             else_branch = []
         result = [self.ast_token(condition, body, else_branch,
@@ -214,48 +455,56 @@ class Parser:
             result.insert(0, initializer)
         return result
 
-    def for_in_statement(self, target: ast.Name, for_word: Token, is_async: bool) -> Union[ast.For, ast.AsyncFor]:
+    def for_in_statement(self, target: ast.Name, for_word: Token, is_async: bool) -> Steps:
         klass = ast.AsyncFor if is_async else ast.For
         iterable = self.expression(False)
         self.consume(TokenType.RIGHT_PAREN, "Expect ')' after for clauses")
-        body = self.optional_block()
+        body = yield self.optional_block()
         if self.match_(TokenType.ELSE):
-            else_branch = self.optional_block()
+            else_branch = yield self.optional_block()
         else:
             else_branch = []
         return self.ast_token(target, iterable, body, else_branch,
                               klass=klass, first=for_word, last=self.previous())
 
-    def if_statement(self) -> ast.If:
+    def if_statement(self) -> Steps:
         if_word = self.previous()
         self.consume(TokenType.LEFT_PAREN, "Expect '(' after 'if'.")
         condition = self.expression(False)
         self.consume(TokenType.RIGHT_PAREN, "Expect ')' after if condition.")
-        then_branch = self.optional_block()
+        then_branch = yield self.optional_block()
         if self.match_(TokenType.ELSE):
-            else_branch = self.optional_block()
+            else_branch = yield self.optional_block()
         else:
             else_branch = []
         return self.ast_token(condition, then_branch, else_branch,
                               klass=ast.If, first=if_word, last=self.previous())
 
-    def while_statement(self) -> ast.stmt:
+    def while_statement(self) -> Steps:
         while_word = self.previous()
         self.consume(TokenType.LEFT_PAREN, "Expect '(' after 'while'.")
         condition = self.expression(False)
         self.consume(TokenType.RIGHT_PAREN, "Expect ')' after condition")
-        body = self.optional_block()
+        body = yield self.optional_block()
         if self.match_(TokenType.ELSE):
-            else_branch = self.optional_block()
+            else_branch = yield self.optional_block()
         else:
             else_branch = []
         return self.ast_token(condition, body, else_branch,
                               klass=ast.While, first=while_word, last=self.previous())
 
     def expression_statement(self, end: Union[TokenType, tuple[TokenType]] = TokenType.SEMICOLON,
-                                   error: str = "Expect ';' after statement.") -> Union[ast.Expr]:
+                                   error: str = "Expect ';' after statement.") -> Union[ast.Expr, ast.Assign, ast.AugAssign]:
         expr = self.expression()
-        if self.match_(TokenType.EQUAL):
+        operator = AUGMENTED_NODES.get(self.current_kind)
+        if operator is not None:
+            if not isinstance(expr, AUGMENTABLES):
+                raise self.error(self.peek(), exceptions.INVALID_AUGMENTED_ASSIGNMENT)
+            self.advance()
+            expr.ctx = ast.Store()
+            value = self.expression()
+            statement = ast.AugAssign(expr, operator, value, **self.get_loc(expr, value))
+        elif self.match_(TokenType.EQUAL):
             if not isinstance(expr, ASSIGNABLES):
                 raise self.error(self.previous(), exceptions.INVALID_ASSIGNMENT)
             extra = [expr, self.expression()]
@@ -298,9 +547,9 @@ class Parser:
             raise self.error(self.peek(), error)
         return result
 
-    def optional_block(self, fill_empty: bool = True) -> list[ast.stmt]:
+    def optional_block(self, fill_empty: bool = True) -> Steps:
         if self.match_(TokenType.LEFT_BRACE):
-            result = self.block()
+            result = yield self.block()
             if not result and fill_empty:
                 result = [self.ast_token(klass=ast.Pass)]
             return result
@@ -309,181 +558,322 @@ class Parser:
             if fill_empty:
                 return [self.ast_token(klass=ast.Pass)]
             return []
-        return self.declaration()
+        elif self.current_kind in NESTING_KINDS:
+            return (yield self.declaration_steps())
+        return self.statement()
 
-    def block(self) -> list[ast.stmt]:
+    def block(self) -> Steps:
         statements = []
         while not self.check(TokenType.RIGHT_BRACE) and not self.is_at_end():
-            statements.extend(self.declaration())
+            if self.errors is not None:
+                statements.extend((yield self.recovering_declaration()))
+            elif self.current_kind in NESTING_KINDS:
+                statements.extend((yield self.declaration_steps()))
+            else:
+                statements.extend(self.statement())
+        if self.errors is not None and self.is_at_end():
+            # Keep what the unclosed block held
+            self.errors.append(self.error(self.peek(), "Expect '}' after block."))
+            return statements
         self.consume(TokenType.RIGHT_BRACE, "Expect '}' after block.")
         return statements
 
     def expression(self, toplevel: bool = True) -> ast.expr:
-        if not toplevel:
-            return self.assignment_expression()
-        return self.yield_()
-
-    def assignment_expression(self) -> ast.expr:
-        expr = self.yield_()
-        if self.match_(TokenType.EQUAL):
-            equals = self.previous()
-            value = self.assignment_expression()
-            if isinstance(expr, ASSIGNABLES):
-                expr.ctx = ast.Store()
-                return ast.NamedExpr(expr, value, **self.get_loc(expr, value))
-            raise self.error(equals, exceptions.INVALID_ASSIGNMENT)
-        return expr
-
-    def yield_(self) -> ast.expr:
-        if self.match_(TokenType.YIELD):
-            first_word = self.previous()
-            if self.match_(TokenType.FROM):
-                klass = ast.YieldFrom
-                second_word = self.previous()
-            else:
-                klass = ast.Yield
-                second_word = first_word
+        stack: list[tuple] = []
+        min_precedence = Precedence.YIELD if toplevel else Precedence.NAMED
+        if self.errors is None:
+            return self.climb(stack, min_precedence)
+        try:
+            return self.climb(stack, min_precedence)
+        except SyntaxError:
+            # Tell synchronize() about the comprehension braces still open
+            self.open_braces = sum(self.frame_closing(frame) == TokenType.RIGHT_BRACE for frame in stack)
+            raise
+
+    def climb(self, stack: list[tuple], min_precedence: int) -> ast.expr:
+        # Precedence climbing without recursion, so nesting is only limited by
+        # memory. operand() pushes a frame for everything waiting on the next
+        # operand and returns that operand; the loop below hands each finished
+        # operand to the top frame, which either completes its node and passes
+        # that down the stack, or goes back on it to wait for another operand.
+        kinds = self.kinds
+        while True:
             try:
-                value = self.or_()
+                value = self.operand(stack, min_precedence)
             except SyntaxError as e:
-                if e.msg == exceptions.EXPECT_EXPRESSOIN:
-                    return self.ast_token(klass=klass, first=first_word, last=second_word)
+                value = self.bare_yield(stack, e)
+            while stack:
+                frame = stack.pop()
+                tag = frame[0]
+                if tag == POSTFIX:
+                    value = self.postfix(value, stack)
+                    if value is None:
+                        min_precedence = Precedence.NAMED
+                        break
+                elif tag == INFIX:
+                    kind = self.current_kind
+                    precedence = BINARY_PRECEDENCE.get(kind, 0)
+                    if precedence < frame[1]:
+                        continue
+                    self.current += 1
+                    self.current_kind = kinds[self.current]
+                    if precedence == Precedence.COMPARISON:
+                        stack.append((COMPARISON_RIGHT, frame[1], value, [self.comparison_operator(kind)], []))
+                    elif precedence <= Precedence.AND:
+                        stack.append((BOOLEAN_VALUE, frame[1], kind, [value]))
+                    else:
+                        stack.append((BINARY_RIGHT, frame[1], value, kind))
+                    min_precedence = precedence + 1
+                    break
+                elif tag == ASSIGN_TARGET:
+                    if self.current_kind == TokenType.EQUAL:
+                        stack.append((ASSIGN_VALUE, value, self.advance()))
+                        min_precedence = Precedence.NAMED
+                        break
+                elif tag == BINARY_RIGHT:
+                    left = frame[2]
+                    value = ast.BinOp(left, BINARY_NODES[frame[3]], value, **self.get_loc(left, value))
+                    stack.append(INFIX_FRAMES[frame[1]])
+                elif tag == ARGUMENT:
+                    if self.current_kind in CLAUSE_KINDS:
+                        if frame[2]:
+                            raise self.error(self.peek(), 'Generator expression must be parenthesized.')
+                        stack.append((GENERATOR_ARGUMENT, frame[1]))
+                        value = self.comprehension_clause(stack, (ast.GeneratorExp, frame[3], TokenType.RIGHT_PAREN, [value], []))
+                        if value is None:
+                            min_precedence = Precedence.NAMED
+                            break
+                        continue
+                    frame[2].append(value)
+                    if self.match_(TokenType.COMMA):
+                        stack.append(frame)
+                        min_precedence = Precedence.NAMED
+                        break
+                    paren = self.consume(TokenType.RIGHT_PAREN, "Expect ')' after arguments")
+                    value = self.finish_call(frame[1], frame[2], paren)
+                    stack.append(POSTFIX_FRAME)
+                elif tag == GROUP:
+                    if self.current_kind in CLAUSE_KINDS:
+                        value = self.comprehension_clause(stack, (ast.GeneratorExp, frame[1], TokenType.RIGHT_PAREN, [value], []))
+                        if value is None:
+                            min_precedence = Precedence.NAMED
+                            break
+                        continue
+                    self.consume(TokenType.RIGHT_PAREN, "Expect ')' after expression.")
+                elif tag == PREFIX_OPERAND:
+                    value = ast.UnaryOp(UNARY_NODES[frame[1]], value, **self.get_loc(value, value))
+                    stack.append(INFIX_FRAMES[frame[2]])
+                elif tag == BOOLEAN_VALUE:
+                    kind = frame[2]
+                    values = frame[3]
+                    values.append(value)
+                    if self.current_kind == kind:
+                        self.current += 1
+                        self.current_kind = kinds[self.current]
+                        stack.append(frame)
+                        min_precedence = BINARY_PRECEDENCE[kind] + 1
+                        break
+                    value = ast.BoolOp(BOOLEAN_OPERATORS[kind](), values, **self.get_loc(values[0], value))
+                    stack.append(INFIX_FRAMES[frame[1]])
+                elif tag == COMPARISON_RIGHT:
+                    left = frame[2]
+                    frame[4].append(value)
+                    kind = self.current_kind
+                    if kind in COMPARISON_KINDS:
+                        self.current += 1
+                        self.current_kind = kinds[self.current]
+                        frame[3].append(self.comparison_operator(kind))
+                        stack.append(frame)
+                        min_precedence = Precedence.COMPARISON + 1
+                        break
+                    value = ast.Compare(left, frame[3], frame[4], **self.get_loc(left, value))
+                    stack.append(INFIX_FRAMES[frame[1]])
+                elif tag == AWAIT_VALUE:
+                    value = self.ast_token(value, klass=ast.Await, first=frame[1], last=self.previous())
+                elif tag == YIELD_VALUE:
+                    value = self.ast_token(value, klass=frame[1], first=frame[2], last=self.previous())
+                elif tag >= ELEMENT:
+                    if tag == ELEMENT:
+                        if frame[1] is None and self.current_kind == TokenType.COLON:
+                            self.advance()
+                            stack.append((DICT_VALUE, frame[2], frame[3], value))
+                            min_precedence = Precedence.NAMED
+                            break
+                        comprehension = (frame[1] or ast.SetComp, frame[2], frame[3], [value], [])
+                    elif tag == DICT_VALUE:
+                        comprehension = (ast.DictComp, frame[1], frame[2], [frame[3], value], [])
+                    elif tag == CLAUSE_ITERABLE:
+                        comprehension = frame[1]
+                        self.consume(TokenType.RIGHT_PAREN, "Expect ')' after for clause.")
+                        comprehension[4].append(ast.comprehension(frame[2], value, [], frame[3]))
+                    elif tag == CLAUSE_CONDITION:
+                        comprehension = frame[1]
+                        self.consume(TokenType.RIGHT_PAREN, "Expect ')' after if clause.")
+                        comprehension[4][-1].ifs.append(value)
+                    else:
+                        value = self.finish_call(frame[1], [value], self.previous())
+                        stack.append(POSTFIX_FRAME)
+                        continue
+                    value = self.comprehension_clause(stack, comprehension)
+                    if value is None:
+                        min_precedence = Precedence.NAMED
+                        break
                 else:
-                    raise
-            return self.ast_token(value, klass=klass, first=first_word, last=self.previous())
-        return self.or_()
-
-    def or_(self) -> ast.expr:
-        left = self.and_()
-        if self.match_(TokenType.PIPE_PIPE):
-            values = [left, self.and_()]
-            while self.match_(TokenType.PIPE_PIPE):
-                values.append(self.and_())
-            return ast.BoolOp(ast.Or(), values, **self.get_loc(left, values[-1]))
-        return left
-
-    def and_(self) -> ast.expr:
-        left = self.not_()
-        if self.match_(TokenType.AMPERSAND_AMPERSAND):
-            values = [left, self.not_()]
-            while self.match_(TokenType.AMPERSAND_AMPERSAND):
-                values.append(self.not_())
-            return ast.BoolOp(ast.And(), values, **self.get_loc(left, values[-1]))
-        return left
-
-    def not_(self) -> ast.expr:
-        if self.match_(TokenType.BANG):
-            right = self.comparison()
-            return ast.UnaryOp(ast.Not(), right, **self.get_loc(right, right))
-        return self.comparison()
-
-    def comparison(self) -> ast.expr:
-        left: ast.expr = self.bit_or()
-        operators: list[ast.cmpop] = []
-        extra: list[ast.expr] = []
-        while self.match_(*TokenGroup.SINGLE_COMPARISON, TokenType.NOT):
-            if self.previous().type == TokenType.IS:
-                if self.match_(TokenType.NOT):
-                    operator = ast.IsNot()
+                    target = frame[1]
+                    if not isinstance(target, ASSIGNABLES):
+                        raise self.error(frame[2], exceptions.INVALID_ASSIGNMENT)
+                    target.ctx = ast.Store()
+                    value = ast.NamedExpr(target, value, **self.get_loc(target, value))
+            else:
+                return value
+
+    def operand(self, stack: list[tuple], min_precedence: int) -> ast.expr:
+        # Everything up to and including the next primary: a named expression's
+        # target, 'yield', prefix operators, 'await' and '(' groups push frames.
+        # All binary operators are left-associative, '**' included.
+        kinds = self.kinds
+        while True:
+            kind = self.current_kind
+            if min_precedence <= Precedence.YIELD:
+                if min_precedence == Precedence.NAMED:
+                    stack.append(ASSIGN_TARGET_FRAME)
+                if kind == TokenType.YIELD:
+                    first_word = self.advance()
+                    if self.match_(TokenType.FROM):
+                        stack.append((YIELD_VALUE, ast.YieldFrom, first_word, self.previous()))
+                    else:
+                        stack.append((YIELD_VALUE, ast.Yield, first_word, first_word))
+                    kind = self.current_kind
+                min_precedence = Precedence.OR
+            prefix = PREFIX_PRECEDENCE.get(kind)
+            while prefix is not None and prefix[0] >= min_precedence:
+                self.current += 1
+                self.current_kind = kinds[self.current]
+                stack.append((PREFIX_OPERAND, kind, min_precedence))
+                min_precedence = prefix[1]
+                kind = self.current_kind
+                prefix = PREFIX_PRECEDENCE.get(kind)
+            await_word = None
+            if kind == TokenType.AWAIT:
+                await_word = self.advance()
+                kind = self.current_kind
+            if kind == TokenType.IDENTIFIER:
+                tok = self.advance()
+                value = self.ast_token(tok.lexeme, ast.Load(), klass=ast.Name, first=tok)
+            elif kind in CONSTANTS:
+                value = self.ast_token(CONSTANTS[kind], first=self.advance())
+            elif kind in TokenGroup.LITERALS:
+                tok = self.advance()
+                value = self.ast_token(tok.literal, first=tok)
+            elif kind == TokenType.LEFT_PAREN or kind in COMPREHENSION_BRACKETS:
+                opening = self.advance()
+                stack.append(INFIX_FRAMES[min_precedence])
+                if await_word is not None:
+                    stack.append((AWAIT_VALUE, await_word))
+                stack.append(POSTFIX_FRAME)
+                if kind == TokenType.LEFT_PAREN:
+                    stack.append((GROUP, opening))
                 else:
-                    operator = ast.Is()
-            elif self.previous().type == TokenType.NOT:
-                self.consume(TokenType.IN, "'in' must follow 'not' in comparison.")
-                operator = ast.NotIn()
+                    klass, closing = COMPREHENSION_BRACKETS[kind]
+                    stack.append((ELEMENT, klass, opening, closing))
+                min_precedence = Precedence.NAMED
+                continue
             else:
-                operator = COMPARISON_OPERATORS[self.previous().type]()
-            right = self.bit_or()
-            operators.append(operator)
-            extra.append(right)
-        if operators:
-            return ast.Compare(left, operators, extra, **self.get_loc(left, extra[-1]))
-        else:
-            return left
-
-    def bit_or(self):
-        left = self.bit_xor()
-        while self.match_(TokenType.PIPE):
-            right = self.bit_xor()
-            left = ast.BinOp(left, ast.BitOr(), right, **self.get_loc(left, right))
-        return left
-
-    def bit_xor(self):
-        left = self.bit_and()
-        while self.match_(TokenType.CARET):
-            right = self.bit_and()
-            left = ast.BinOp(left, ast.BitXor(), right, **self.get_loc(left, right))
-        return left
-
-    def bit_and(self):
-        left = self.bit_shift()
-        while self.match_(TokenType.AMPERSAND):
-            right = self.bit_shift()
-            left = ast.BinOp(left, ast.BitAnd(), right, **self.get_loc(left, right))
-        return left
-
-    def bit_shift(self):
-        left = self.term()
-        while self.match_(*TokenGroup.BIT_SHIFT):
-            operator = BINARY_OPERATORS[self.previous().type]()
-            right = self.term()
-            left = ast.BinOp(left, operator, right, **self.get_loc(left, right))
-        return left
-
-    def term(self) -> ast.expr:
-        left = self.factor()
-        while self.match_(*TokenGroup.TERMS):
-            operator = BINARY_OPERATORS[self.previous().type]()
-            right = self.factor()
-            left = ast.BinOp(left, operator, right, **self.get_loc(left, right))
-        return left
-
-    def factor(self) -> ast.expr:
-        left = self.unary()
-        while self.match_(*TokenGroup.FACTORS):
-            operator = BINARY_OPERATORS[self.previous().type]()
-            right = self.unary()
-            left = ast.BinOp(left, operator, right, **self.get_loc(left, right))
-        return left
-
-    def unary(self) -> ast.expr:
-        if self.match_(*TokenGroup.UNARY_LOW):
-            operator = UNARY_OPERATORS[self.previous().type]()
-            right = self.unary()
-            return ast.UnaryOp(operator, right, **self.get_loc(right, right))
-        return self.power()
-
-    def power(self) -> ast.expr:
-        left = self.await_()
-        while self.match_(TokenType.STAR_STAR):
-            right = self.await_()
-            left = ast.BinOp(left, ast.Pow(), right, **self.get_loc(left, right))
-        return left
-
-    def await_(self) -> ast.expr:
-        if self.match_(TokenType.AWAIT):
-            first_word = self.previous()
-            value = self.call()
-            return self.ast_token(value, klass=ast.Await, first=first_word, last=self.previous())
-        return self.call()
-
-    def call(self) -> ast.expr:
-        expr = self.primary()
+                raise self.error(self.peek(), exceptions.EXPECT_EXPRESSOIN)
+            # Most operands are a lone name or literal; only push the frames
+            # that what follows it can use
+            kind = self.current_kind
+            if await_word is None and kind not in POSTFIX_KINDS:
+                if BINARY_PRECEDENCE.get(kind, 0) >= min_precedence:
+                    stack.append(INFIX_FRAMES[min_precedence])
+                return value
+            stack.append(INFIX_FRAMES[min_precedence])
+            if await_word is not None:
+                stack.append((AWAIT_VALUE, await_word))
+            stack.append(POSTFIX_FRAME)
+            return value
+
+    def bare_yield(self, stack: list[tuple], error: SyntaxError) -> ast.expr:
+        # A yield's value is optional, so when none can start the innermost
+        # pending yield becomes a bare one, dropping what was pushed after it
+        if error.msg == exceptions.EXPECT_EXPRESSOIN:
+            for depth in range(len(stack) - 1, -1, -1):
+                frame = stack[depth]
+                if frame[0] == YIELD_VALUE:
+                    del stack[depth:]
+                    return self.ast_token(klass=frame[1], first=frame[2], last=frame[3])
+        raise error
+
+    def comparison_operator(self, kind: TokenType) -> ast.cmpop:
+        # Called with the first token of the operator already consumed
+        if kind == TokenType.IS:
+            if self.match_(TokenType.NOT):
+                return ast.IsNot()
+            return ast.Is()
+        elif kind == TokenType.NOT:
+            self.consume(TokenType.IN, "'in' must follow 'not' in comparison.")
+            return ast.NotIn()
+        return COMPARISON_OPERATORS[kind]()
+
+    def frame_closing(self, frame: tuple) -> Optional[TokenType]:
+        # The bracket that closes the comprehension a frame belongs to
+        tag = frame[0]
+        if tag == ELEMENT:
+            return frame[3]
+        elif tag == DICT_VALUE:
+            return frame[2]
+        elif tag == CLAUSE_ITERABLE or tag == CLAUSE_CONDITION:
+            return frame[1][2]
+        return None
+
+    def comprehension_clause(self, stack: list[tuple], comprehension: Comprehension) -> Optional[ast.expr]:
+        # Called after the element and after each clause. Starts the next
+        # 'for (x : ...)' or 'if (...)' clause, pushing a frame for its
+        # expression and returning None, or closes the comprehension.
+        klass, opening, closing, parts, generators = comprehension
+        kind = self.current_kind
+        if kind == TokenType.IF and generators:
+            self.advance()
+            self.consume(TokenType.LEFT_PAREN, "Expect '(' after 'if'.")
+            stack.append((CLAUSE_CONDITION, comprehension))
+            return None
+        elif kind in CLAUSE_KINDS:
+            is_async = self.match_(TokenType.ASYNC)
+            self.consume(TokenType.FOR, "Expect 'for' after 'async'.")
+            self.consume(TokenType.LEFT_PAREN, "Expect '(' after 'for'.")
+            name = self.consume(TokenType.IDENTIFIER, exceptions.ITERATION_INVALID_ASSIGNMENT)
+            target = self.ast_token(name.lexeme, ast.Store(), klass=ast.Name, first=name)
+            self.consume(TokenType.COLON, "Expect ':' after loop variable.")
+            stack.append((CLAUSE_ITERABLE, comprehension, target, int(is_async)))
+            return None
+        elif not generators:
+            raise self.error(self.peek(), "Expect 'for' after comprehension element.")
+        last = self.consume(closing, f"Expect '{CLOSING_BRACKETS[closing]}' after comprehension.")
+        return self.ast_token(*parts, generators, klass=klass, first=opening, last=last)
+
+    def postfix(self, expr: ast.expr, stack: list[tuple]) -> Optional[ast.expr]:
+        # Calls and attribute accesses on expr. A call with arguments pushes an
+        # ARGUMENT frame and returns None, to be resumed once they're parsed.
         while True:
-            if self.match_(TokenType.LEFT_PAREN):
-                expr = self.finish_call(expr)
-            elif self.match_(TokenType.DOT):
+            kind = self.current_kind
+            if kind == TokenType.LEFT_PAREN:
+                paren = self.advance()
+                if not self.check(TokenType.RIGHT_PAREN):
+                    stack.append((ARGUMENT, expr, [], paren))
+                    return None
+                expr = self.finish_call(expr, [], self.advance())
+            elif kind == TokenType.DOT:
+                self.advance()
                 name = self.consume(TokenType.IDENTIFIER, exceptions.EXPECT_PROPERTY_NAME)
                 expr = ast.Attribute(expr, name.lexeme, ast.Load(),
                     lineno=expr.lineno, end_lineno=name.line,
                     col_offset=expr.col_offset, end_col_offset=name.column + len(name.lexeme)
                 )
             else:
-                break
-        return expr
+                return expr
 
-    def finish_call(self, callee: ast.expr) -> ast.expr:
-        args, kwargs, paren = self.parse_args_call()
-        return ast.Call(callee, args, kwargs,
+    def finish_call(self, callee: ast.expr, args: list[ast.expr], paren: Token) -> ast.expr:
+        return ast.Call(callee, args, [],
             lineno=callee.lineno, end_lineno=paren.line,
             col_offset=callee.col_offset, end_col_offset=paren.column + 1
         )
@@ -499,27 +889,6 @@ class Parser:
         paren = self.consume(TokenType.RIGHT_PAREN, "Expect ')' after arguments")
         return args, kwargs, paren
 
-    def primary(self) -> ast.expr:
-        if self.match_(TokenType.FALSE):
-            return self.ast_token(False)
-        elif self.match_(TokenType.TRUE):
-            return self.ast_token(True)
-        elif self.match_(TokenType.NONE):
-            return self.ast_token(None)
-        elif self.match_(TokenType.ELLIPSIS):
-            return self.ast_token(Ellipsis)
-        elif self.match_(*TokenGroup.LITERALS):
-            return self.ast_token(self.previous().literal)
-        elif self.match_(TokenType.IDENTIFIER):
-            tok = self.previous()
-            return self.ast_token(tok.lexeme, ast.Load(), klass=ast.Name)
-        elif self.match_(TokenType.LEFT_PAREN):
-            expr = self.expression(False)
-            self.consume(TokenType.RIGHT_PAREN, "Expect ')' after expression.")
-            return expr
-        else:
-            raise self.error(self.peek(), exceptions.EXPECT_EXPRESSOIN)
-
     def ast_token(self, *args, klass: type[ast.AST] = ast.Constant,
                   first: Token = None, last: Token = None) -> Any:
         if first is None:
@@ -528,9 +897,14 @@ class Parser:
             last = first
         result = klass(*args)
         result.lineno = first.line
-        result.end_lineno = last.line
         result.col_offset = first.column
-        result.end_col_offset = last.column + len(last.lexeme)
+        if '\n' in last.lexeme:
+            # Triple-quoted strings are the only tokens that span lines
+            result.end_lineno = last.line + last.lexeme.count('\n')
+            result.end_col_offset = len(last.lexeme) - last.lexeme.rfind('\n') - 1
+        else:
+            result.end_lineno = last.line
+            result.end_col_offset = last.column + len(last.lexeme)
         return result
 
     def get_loc(self, left: ast.AST, right: ast.AST):
@@ -540,8 +914,10 @@ class Parser:
         )
 
     def match_(self, *types: TokenType) -> bool:
-        if any(self.check(type) for type in types):
-            self.advance()
+        # Hot path: compare integer kinds instead of building Token objects
+        if self.current_kind in types and self.current_kind != TokenType.EOF:
+            self.current += 1
+            self.current_kind = self.kinds[self.current]
             return True
         return False
 
@@ -556,22 +932,19 @@ class Parser:
         raise self.error(self.peek(), message)
 
     def error(self, token: Token, message: str) -> SyntaxError:
-        return SyntaxError(message, (self.filename, token.line,
-                                     token.column + 1,
-                           find_line(self.source, token.index)))
+        return exceptions.SourceSyntaxError(message, self.filename, token.line, token.column + 1, self.lines)
 
     def check(self, type: TokenType) -> bool:
-        if self.is_at_end():
-            return False
-        return self.peek().type == type
+        return self.current_kind == type and type != TokenType.EOF
 
     def advance(self) -> Token:
-        if not self.is_at_end():
+        if self.current_kind != TokenType.EOF:
             self.current += 1
+            self.current_kind = self.kinds[self.current]
         return self.previous()
 
     def is_at_end(self) -> bool:
-        return self.peek().type == TokenType.EOF
+        return self.current_kind == TokenType.EOF
 
     def peek(self) -> Token:
         return self.tokens[self.current]
@@ -585,11 +958,16 @@ class Parser:
         elif mode == 'exec':
             statements = []
             while not self.is_at_end():
-                statements.extend(self.declaration())
+                if self.errors is None:
+                    statements.extend(self.declaration())
+                else:
+                    statements.extend(self.run(self.recovering_declaration()))
             return ast.Module(body=statements, type_ignores=[])
         raise ValueError(f'No such parse mode named {mode!r}')
 
 
-def parse_tree(tokens: list[Token], mode: str = 'exec', filename: str = '<unknown>', source: str = '') -> Union[ast.Expression, ast.Module]:
-    parser: Parser = Parser(tokens, filename, source)
+def parse_tree(tokens: Union[Sequence[Token], TokenBuffer, Iterator[Token]], mode: str = 'exec', filename: str = '<unknown>', source: str = '',
+               lines: Optional[LineIndex] = None,
+               errors: Optional[list[SyntaxError]] = None) -> Union[ast.Expression, ast.Module]:
+    parser: Parser = Parser(tokens, filename, source, lines, errors)
     return parser.parse(mode)
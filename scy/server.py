@@ -0,0 +1,208 @@
+# A long-running compile server, so editors and build tools don't pay for
+# starting Python and importing the front end on every file. It listens on a
+# Unix socket and speaks JSON lines: each request is one object with an 'op',
+# each response one object with 'ok' and either the result or an 'error'.
+#
+#     {"op": "compile", "path": "/abs/file.scy"}      write its __pycache__ entry
+#     {"op": "compile", "source": "...", "filename": "f.scy"}
+#                                                     -> {"code": base64 marshal data}
+#     {"op": "transpile", "path": ...} / "source"     -> {"python": "..."}
+#     {"op": "check", "path": ...} / "source"         -> {"errors": [...]}
+#     {"op": "ping"} / {"op": "shutdown"}
+#
+# compile and transpile also take "mode" (default 'exec') and "optimize_ast".
+# scy.client is the matching client.
+import ast
+import base64
+import importlib.util
+import json
+import marshal
+import os
+import socket
+import socketserver
+import sys
+import threading
+from contextlib import suppress
+from types import CodeType
+from typing import Any, Callable, Optional
+
+from scy import __version__
+from scy.backend import parse, parse_recovering
+from scy.builtins import scy_compile
+from scy.cache import MemoryCache
+from scy.check import check_file
+from scy.client import default_socket_path
+from scy.importer import compile_file
+
+__all__ = ['CompileServer', 'serve']
+
+Response = dict[str, Any]
+
+
+def error_info(error: BaseException) -> dict[str, Any]:
+    info = {'type': type(error).__name__, 'msg': str(error)}
+    if isinstance(error, SyntaxError):
+        info.update(msg=error.msg, filename=error.filename, lineno=error.lineno,
+                    offset=error.offset, text=error.text)
+    return info
+
+
+def read_source(request: dict[str, Any]) -> tuple[str, str]:
+    if 'path' in request:
+        path = request['path']
+        with open(path, 'rb') as fp:
+            return importlib.util.decode_source(fp.read()), request.get('filename', path)
+    return request['source'], request.get('filename', '<unknown>')
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    server: 'CompileServer'
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError('request must be a JSON object')
+            except ValueError as e:
+                response = {'ok': False, 'error': error_info(e)}
+            else:
+                response = self.server.dispatch(request)
+            self.wfile.write(json.dumps(response).encode() + b'\n')
+            self.wfile.flush()
+            if self.server.stopping:
+                # Only once the answer is out: handler threads die with the
+                # process. shutdown() waits for serve_forever to return, so it
+                # can't run on this thread.
+                threading.Thread(target=self.server.shutdown).start()
+                return
+
+
+class CompileServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    # Compiled code is kept in memory by source and options, on top of whatever
+    # disk cache scy_compile is configured with
+    daemon_threads = True
+    codes: MemoryCache
+    served: int
+    stopping: bool
+    lock: threading.Lock
+    ops: dict[str, Callable[[dict[str, Any]], Response]]
+
+    def __init__(self, path: str, cache_size: int = 1024) -> None:
+        self.codes = MemoryCache(cache_size)
+        self.served = 0
+        self.stopping = False
+        self.lock = threading.Lock()
+        self.ops = {
+            'compile':   self.op_compile,
+            'transpile': self.op_transpile,
+            'check':     self.op_check,
+            'ping':      self.op_ping,
+            'shutdown':  self.op_shutdown,
+        }
+        claim_socket(path)
+        # Anyone who can connect can make the server read files as this user,
+        # so the socket is created private to them
+        umask = os.umask(0o177)
+        try:
+            super().__init__(path, RequestHandler)
+        finally:
+            os.umask(umask)
+
+    def dispatch(self, request: dict[str, Any]) -> Response:
+        with self.lock:
+            self.served += 1
+        op = self.ops.get(request.get('op'))
+        if op is None:
+            return {'ok': False, 'error': {'type': 'ValueError', 'msg': f'unknown op {request.get("op")!r}'}}
+        try:
+            return {'ok': True, **op(request)}
+        except (SyntaxError, OSError, UnicodeDecodeError, KeyError, TypeError, ValueError) as e:
+            return {'ok': False, 'error': error_info(e)}
+
+    def compile(self, source: str, filename: str, mode: str, optimize_ast: bool) -> CodeType:
+        key = (source, filename, mode, optimize_ast)
+        code = self.codes.get(key)
+        if code is None:
+            code = scy_compile(source, filename, mode, dont_inherit=True, optimize_ast=optimize_ast)
+            self.codes.put(key, code)
+        return code
+
+    def op_compile(self, request: dict[str, Any]) -> Response:
+        if 'path' in request and 'source' not in request:
+            return {'written': compile_file(request['path'], force=bool(request.get('force')))}
+        source, filename = read_source(request)
+        code = self.compile(source, filename, request.get('mode', 'exec'), bool(request.get('optimize_ast')))
+        return {'code': base64.b64encode(marshal.dumps(code)).decode('ascii')}
+
+    def op_transpile(self, request: dict[str, Any]) -> Response:
+        source, filename = read_source(request)
+        tree = parse(source, filename, request.get('mode', 'exec'), bool(request.get('optimize_ast')))
+        return {'python': ast.unparse(tree)}
+
+    def op_check(self, request: dict[str, Any]) -> Response:
+        if 'path' in request and 'source' not in request:
+            errors = check_file(request['path'])
+        else:
+            source, filename = read_source(request)
+            errors = parse_recovering(source, filename)[1]
+        return {'errors': [error_info(error) for error in errors]}
+
+    def op_ping(self, request: dict[str, Any]) -> Response:
+        return {'pid': os.getpid(), 'version': __version__, 'served': self.served,
+                'cache': self.codes.info()._asdict()}
+
+    def op_shutdown(self, request: dict[str, Any]) -> Response:
+        self.stopping = True
+        return {}
+
+
+def claim_socket(path: str) -> None:
+    # A socket file left by a server that died is removed; a live one is an error
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except ConnectionRefusedError:
+        os.unlink(path)
+    else:
+        raise OSError(f'a compile server is already listening on {path}')
+    finally:
+        probe.close()
+
+
+def serve(path: Optional[str] = None, cache_size: int = 1024, quiet: bool = False) -> None:
+    path = path or default_socket_path()
+    with CompileServer(path, cache_size) as server:
+        if not quiet:
+            print(f'scy compile server {__version__} listening on {path}', file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            with suppress(FileNotFoundError):
+                os.unlink(path)
+
+
+def main(argv: Optional[list[str]] = None, prog: str = 'python -m scy.server') -> int:
+    import argparse
+    parser = argparse.ArgumentParser(prog, description='Serve compile, transpile and check requests on a Unix socket.')
+    parser.add_argument('--socket', metavar='PATH',
+                        help='socket to listen on (default: $SCY_SERVER_SOCKET or a per-user path)')
+    parser.add_argument('--cache-size', type=int, default=1024, help='compiled sources to keep in memory')
+    parser.add_argument('-q', '--quiet', action='store_true')
+    args = parser.parse_args(argv)
+    if not hasattr(socket, 'AF_UNIX'):
+        parser.error('Unix sockets are not available on this platform')
+    try:
+        serve(args.socket, args.cache_size, args.quiet)
+    except OSError as e:
+        print(f'{prog}: {e}', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,130 @@
+import importlib.util
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from types import CodeType
+from typing import Iterator, NamedTuple, Optional
+
+from scy.optimizer import optimize
+from scy.parser import parse_tree
+from scy.tokenizer import tokenize
+from scy.utils import count_nodes
+
+__all__ = ['PhaseStats', 'Profile']
+
+
+class PhaseStats(NamedTuple):
+    wall_ns: int
+    cpu_ns: int
+    peak_bytes: Optional[int]
+
+
+class Profile:
+    # Wall/CPU time and peak traced memory for each phase of running a script.
+    # tracemalloc slows everything down several times over, so the front end is
+    # timed untraced and then repeated traced for its memory peaks. Code can't
+    # be run twice, so with memory on the run phase's times include the overhead.
+    filename: str
+    memory: bool
+    optimize_ast: bool
+    phases: dict[str, PhaseStats]
+    size: Optional[int]
+    tokens: Optional[int]
+    nodes: Optional[int]
+
+    def __init__(self, filename: str, memory: bool = True, optimize_ast: bool = False) -> None:
+        self.filename = filename
+        self.memory = memory
+        self.optimize_ast = optimize_ast
+        self.phases = {}
+        self.size = None
+        self.tokens = None
+        self.nodes = None
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        tracing = self.memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        if self.memory:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        wall = time.perf_counter_ns()
+        cpu = time.process_time_ns()
+        try:
+            yield
+        finally:
+            cpu = time.process_time_ns() - cpu
+            wall = time.perf_counter_ns() - wall
+            peak = None
+            if self.memory:
+                peak = tracemalloc.get_traced_memory()[1] - baseline
+                if tracing:
+                    tracemalloc.stop()
+            self.phases[name] = PhaseStats(wall, cpu, peak)
+
+    def compile(self) -> CodeType:
+        memory, self.memory = self.memory, False
+        try:
+            code = self.frontend()
+        finally:
+            self.memory = memory
+        if memory:
+            times = self.phases.copy()
+            self.frontend()
+            for name, stats in self.phases.items():
+                self.phases[name] = times[name]._replace(peak_bytes=stats.peak_bytes)
+        return code
+
+    def frontend(self) -> CodeType:
+        with self.phase('read'):
+            with open(self.filename, 'rb') as fp:
+                data = fp.read()
+            source = importlib.util.decode_source(data)
+        self.size = len(data)
+        with self.phase('tokenize'):
+            tokens = tokenize(source, self.filename)
+        self.tokens = len(tokens)
+        with self.phase('parse'):
+            tree = parse_tree(tokens, 'exec', self.filename, source)
+        del tokens
+        self.nodes = count_nodes(tree)
+        if self.optimize_ast:
+            with self.phase('optimize'):
+                tree = optimize(tree)
+        with self.phase('compile'):
+            code = compile(tree, self.filename, 'exec', dont_inherit=True)
+        return code
+
+    def as_dict(self) -> dict:
+        return {
+            'filename': self.filename,
+            'bytes': self.size,
+            'tokens': self.tokens,
+            'nodes': self.nodes,
+            'tracemalloc': self.memory,
+            'phases': {name: stats._asdict() for (name, stats) in self.phases.items()},
+        }
+
+    def format(self) -> str:
+        lines = [f'{self.filename}: {self.size} bytes, {self.tokens} tokens, {self.nodes} nodes',
+                 f'{"phase":<10}{"wall":>12}{"cpu":>12}{"peak memory":>14}']
+        total_wall = total_cpu = 0
+        for name, stats in self.phases.items():
+            total_wall += stats.wall_ns
+            total_cpu += stats.cpu_ns
+            memory = '-' if stats.peak_bytes is None else f'{stats.peak_bytes / 1024:.1f} KiB'
+            lines.append(f'{name:<10}{stats.wall_ns / 1e6:>10.3f}ms{stats.cpu_ns / 1e6:>10.3f}ms{memory:>14}')
+        lines.append(f'{"total":<10}{total_wall / 1e6:>10.3f}ms{total_cpu / 1e6:>10.3f}ms')
+        return '\n'.join(lines)
+
+    def report(self, json_path: Optional[str] = None) -> None:
+        print(self.format(), file=sys.stderr)
+        if json_path == '-':
+            json.dump(self.as_dict(), sys.stdout, indent=2)
+            print()
+        elif json_path is not None:
+            with open(json_path, 'w', encoding='utf-8') as fp:
+                json.dump(self.as_dict(), fp, indent=2)
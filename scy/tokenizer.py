@@ -1,45 +1,116 @@
-from typing import Any
+import re
+from typing import Any, Iterator, Optional
 
 from scy import exceptions
-from scy.tokens import KEYWORDS, Token, TokenType
-from scy.utils import find_line
+from scy.tokens import KEYWORDS, OPERATORS, Token, TokenBuffer, TokenType
+from scy.utils import LineIndex
+
+# Anything this pattern doesn't match (or matches but can't handle on its own)
+# is handed to Tokenizer.scan, so both engines share every error path.
+TOKEN_PATTERN = re.compile(r'''
+    (?P<identifier>(?!r["'])[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<whitespace>[ \t\r]+)
+  | (?P<operator>%s)
+  | (?P<newline>\n)
+  | (?P<number>[1-9](?:_?[0-9])*(?:\.(?:[0-9](?:_?[0-9])*)?)?_?)
+  | (?P<string>"(?!"")[^"\\\n]*"|'(?!'')[^'\\\n]*')
+  | (?P<triple_string>"""[^"\\]*(?:"(?!"")[^"\\]*)*"""|\'\'\'[^'\\]*(?:'(?!'')[^'\\]*)*\'\'\')
+  | (?P<raw_string>r"(?!"")[^"\n]*"|r'(?!'')[^'\n]*')
+  | (?P<raw_triple_string>r"""[^"]*(?:"(?!"")[^"]*)*"""|r\'\'\'[^']*(?:'(?!'')[^']*)*\'\'\')
+  | (?P<dots>\.{1,3})
+  | (?P<comment>\#[^\n]*)
+''' % '|'.join(re.escape(op) for op in sorted(OPERATORS, key=len, reverse=True)), re.VERBOSE)
+
+# Characters string() has to stop at, by (quote, raw, triple-quoted)
+STRING_SPECIALS = {
+    (quote, raw, triple): re.compile('[%s%s%s]' % (quote, '' if raw else r'\\', '' if triple else r'\n'))
+    for quote in '"\''
+    for raw in (False, True)
+    for triple in (False, True)
+}
+
+BASE_PREFIXES = {'x': 16, 'b': 2, 'o': 8}
+BASE_DIGITS = {
+    16: frozenset('0123456789abcdef_'),
+    2:  frozenset('01_'),
+    8:  frozenset('01234567_'),
+}
 
 
 class Tokenizer:
     source: str
     filename: str
+    lines: LineIndex
+    errors: Optional[list[SyntaxError]]
     tokens: list[Token]
     start: int
     current: int
     line: int
+    start_line: int
     start_column: int
     column: int
 
-    def __init__(self, source: str, filename: str = '<unknown>') -> None:
+    def __init__(self, source: str, filename: str = '<unknown>', lines: Optional[LineIndex] = None,
+                 errors: Optional[list[SyntaxError]] = None) -> None:
         self.source = source
         self.filename = filename
+        self.lines = LineIndex(source) if lines is None else lines
+        # When given a list, errors are appended to it and scanning carries on
+        self.errors = errors
         self.tokens = []
         self.start = 0
         self.current = 0
         self.line = 1
         self.start_column = 0
         self.column = 0
+        self.start_line = 1
 
     def tokenize(self) -> list[Token]:
+        self.tokens = list(self.iter_tokens())
+        return self.tokens
+
+    def tokenize_compact(self) -> TokenBuffer:
+        return TokenBuffer(self.iter_tokens())
+
+    def iter_tokens(self) -> Iterator[Token]:
+        # self.tokens only holds what the latest scan() produced
+        tokens = self.tokens
+        scan = self.scan if self.errors is None else self.scan_recovering
         while not self.is_at_end():
             self.start = self.current
             self.start_column = self.column
-            self.scan()
+            self.start_line = self.line
+            scan()
+            if tokens:
+                yield from tokens
+                tokens.clear()
 
-        self.tokens.append(Token(TokenType.EOF, '', self.line, self.start_column, self.current))
-        return self.tokens
+        yield Token(TokenType.EOF, '', self.line, self.start_column, self.current)
 
     def error(self, text: str) -> SyntaxError:
         return self.errorat(text, self.start_column)
 
     def errorat(self, text: str, where: int) -> SyntaxError:
-        return SyntaxError(text, (self.filename, self.line, where + 1,
-                           find_line(self.source, self.current)))
+        return exceptions.SourceSyntaxError(text, self.filename, self.line, where + 1, self.lines)
+
+    def scan_recovering(self) -> None:
+        try:
+            self.scan()
+        except SyntaxError as e:
+            self.errors.append(e)
+            # Drop the rest of the bad token, always making progress
+            if self.current == self.start:
+                self.advance()
+            first = self.source[self.start]
+            # A bad number's fraction goes with it
+            while self.is_alpha_numeric(self.peek()) or self.peek() == '.' and self.is_digit(first):
+                self.advance()
+            # Bad numbers and reserved words still stand for an operand, so
+            # the parser doesn't report a second error for the same mistake
+            if self.is_digit(first):
+                self.add_token_literal(TokenType.INTEGER, 0)
+            elif self.is_alpha(first):
+                self.add_token(TokenType.IDENTIFIER)
 
     def scan(self) -> None:
         c: str = self.advance()
@@ -51,28 +122,36 @@ class Tokenizer:
             self.add_token(TokenType.LEFT_BRACE)
         elif c == '}':
             self.add_token(TokenType.RIGHT_BRACE)
+        elif c == '[':
+            self.add_token(TokenType.LEFT_BRACKET)
+        elif c == ']':
+            self.add_token(TokenType.RIGHT_BRACKET)
         elif c == ',':
             self.add_token(TokenType.COMMA)
         elif c == '-':
-            self.add_token(TokenType.MINUS)
+            self.add_token(TokenType.MINUS_EQUAL if self.match_('=') else TokenType.MINUS)
         elif c == '+':
-            self.add_token(TokenType.PLUS)
+            self.add_token(TokenType.PLUS_EQUAL if self.match_('=') else TokenType.PLUS)
         elif c == '~':
             self.add_token(TokenType.TILDE)
         elif c == ';':
             self.add_token(TokenType.SEMICOLON)
         elif c == '%':
-            self.add_token(TokenType.PERCENT)
+            self.add_token(TokenType.PERCENT_EQUAL if self.match_('=') else TokenType.PERCENT)
         elif c == '^':
-            self.add_token(TokenType.CARET)
+            self.add_token(TokenType.CARET_EQUAL if self.match_('=') else TokenType.CARET)
         elif c == ':':
             self.add_token(TokenType.COLON)
         elif c == '@':
-            self.add_token(TokenType.AT)
+            self.add_token(TokenType.AT_EQUAL if self.match_('=') else TokenType.AT)
         elif c == '.':
             self.ellipsis()
         elif c == '*':
-            self.add_token(TokenType.STAR_STAR if self.match_('*') else TokenType.STAR)
+            if self.match_('*'):
+                tok = TokenType.STAR_STAR_EQUAL if self.match_('=') else TokenType.STAR_STAR
+            else:
+                tok = TokenType.STAR_EQUAL if self.match_('=') else TokenType.STAR
+            self.add_token(tok)
         elif c == '!':
             self.add_token(TokenType.BANG_EQUAL if self.match_('=') else TokenType.BANG)
         elif c == '=':
@@ -81,7 +160,7 @@ class Tokenizer:
             if self.match_('='):
                 tok = TokenType.LESS_EQUAL
             elif self.match_('<'):
-                tok = TokenType.LESS_LESS
+                tok = TokenType.LESS_LESS_EQUAL if self.match_('=') else TokenType.LESS_LESS
             else:
                 tok = TokenType.LESS
             self.add_token(tok)
@@ -89,16 +168,28 @@ class Tokenizer:
             if self.match_('='):
                 tok = TokenType.GREATER_EQUAL
             elif self.match_('>'):
-                tok = TokenType.GREATER_GREATER
+                tok = TokenType.GREATER_GREATER_EQUAL if self.match_('=') else TokenType.GREATER_GREATER
             else:
                 tok = TokenType.GREATER
             self.add_token(tok)
         elif c == '/':
-            self.add_token(TokenType.SLASH_SLASH if self.match_('/') else TokenType.SLASH)
+            if self.match_('/'):
+                tok = TokenType.SLASH_SLASH_EQUAL if self.match_('=') else TokenType.SLASH_SLASH
+            else:
+                tok = TokenType.SLASH_EQUAL if self.match_('=') else TokenType.SLASH
+            self.add_token(tok)
         elif c == '&':
-            self.add_token(TokenType.AMPERSAND_AMPERSAND if self.match_('&') else TokenType.AMPERSAND)
+            if self.match_('&'):
+                tok = TokenType.AMPERSAND_AMPERSAND
+            else:
+                tok = TokenType.AMPERSAND_EQUAL if self.match_('=') else TokenType.AMPERSAND
+            self.add_token(tok)
         elif c == '|':
-            self.add_token(TokenType.PIPE_PIPE if self.match_('|') else TokenType.PIPE)
+            if self.match_('|'):
+                tok = TokenType.PIPE_PIPE
+            else:
+                tok = TokenType.PIPE_EQUAL if self.match_('=') else TokenType.PIPE
+            self.add_token(tok)
         elif c == '#':
             while self.peek() != '\n' and not self.is_at_end():
                 self.advance()
@@ -150,36 +241,44 @@ class Tokenizer:
     def number(self) -> None:
         base = 10
         if self.previous() == '0':
-            try:
-                modifier = self.advance().lower()
-            except SyntaxError:
-                self.add_token_literal(TokenType.INTEGER, 0)
-                return
-            if modifier == 'x':
-                base = 16
-            elif modifier == 'b':
-                base = 2
-            elif modifier == 'o':
-                base = 8
-            else:
-                if self.is_digit(modifier):
-                    raise self.errorat(exceptions.NUMBER_NOT_ZERO, self.start_column + 1)
-        while self.is_digit(self.peek()) or self.peek() == '_':
-            self.advance()
+            modifier = self.peek().lower()
+            if modifier in BASE_PREFIXES:
+                base = BASE_PREFIXES[modifier]
+                self.advance()
+            elif self.is_digit(modifier):
+                raise self.errorat(exceptions.NUMBER_NOT_ZERO, self.start_column + 1)
+        if base == 10:
+            self.decimal_digits()
+        else:
+            # Take the whole alphanumeric run so '0b12' is an error, not '0b1' '2'
+            digits = BASE_DIGITS[base]
+            while self.is_alpha(self.peek()) or self.is_digit(self.peek()):
+                char = self.advance()
+                if char.lower() not in digits:
+                    raise self.errorat(exceptions.INVALID_DIGIT % (char, base), self.column - 1)
+                if char == '_' and self.peek() == '_':
+                    raise self.errorat(exceptions.DOUBLE_UNDERSCORE_NUMBER, self.column)
+            if self.current - self.start == 2:
+                raise self.errorat(exceptions.MISSING_DIGITS, self.column)
+        if self.previous() == '_':
+            raise self.errorat(exceptions.UNDERSCORE_ENDED_NUMBER, self.column - 1)
         if self.peek() == '.':
             if base != 10:
                 raise self.error(exceptions.ALTERNATE_BASE_FLOAT)
             self.advance()
             if self.is_digit(self.peek()):
-                while self.is_digit(self.peek()) or self.peek() == '_':
-                    self.advance()
+                self.decimal_digits()
             if self.previous() == '_':
                 raise self.errorat(exceptions.UNDERSCORE_ENDED_NUMBER, self.column - 1)
             return self.add_token_literal(TokenType.DECIMAL, float(self.source[self.start:self.current]))
-        if self.previous() == '_':
-            raise self.errorat(exceptions.UNDERSCORE_ENDED_NUMBER, self.column - 1)
         self.add_token_literal(TokenType.INTEGER, int(self.source[self.start:self.current], base))
 
+    def decimal_digits(self) -> None:
+        # Digits, with single underscores between them
+        while self.is_digit(self.peek()) or self.peek() == '_':
+            if self.advance() == '_' and self.peek() == '_':
+                raise self.errorat(exceptions.DOUBLE_UNDERSCORE_NUMBER, self.column)
+
     def escape(self) -> str:
         self.advance()
         code = self.peek()
@@ -224,20 +323,68 @@ class Tokenizer:
             raise self.errorat(exceptions.INVALID_ESCAPE % code, self.column)
 
     def string(self, end: str, modifiers: str = '') -> None:
-        modifiers = set(modifiers) # Faster contents check
-        result = ''
-        while self.peek() != end and not self.is_at_end():
-            if self.peek() == '\n':
-                raise self.errorat(exceptions.MULTILINE_STRINGS_NOT_SUPPORTED, self.column)
-            elif 'r' not in modifiers and self.peek() == '\\':
-                result += self.escape()
+        # Unescaped runs are copied as slices, found by searching for the next
+        # character that needs attention, so long literals scan in linear time
+        source = self.source
+        raw = 'r' in modifiers
+        triple = source.startswith(end * 2, self.current)
+        if triple:
+            self.current += 2
+            self.column += 2
+        special = STRING_SPECIALS[end, raw, triple]
+        chunks = []
+        while True:
+            m = special.search(source, self.current)
+            stop = len(source) if m is None else m.start()
+            chunks.append(source[self.current:stop])
+            self.skip_to(stop, triple)
+            if m is None:
+                error = self.errorat(exceptions.EOF_DURING_STRING, self.column)
+                if self.errors is None:
+                    raise error
+                # Recovering, an unterminated string just ends where it stopped
+                self.errors.append(error)
+                break
+            c = source[stop]
+            if c == '\n':
+                error = self.errorat(exceptions.MULTILINE_STRINGS_NOT_SUPPORTED, self.column)
+                if self.errors is None:
+                    raise error
+                self.errors.append(error)
+                break
+            elif c == '\\':
+                try:
+                    chunks.append(self.escape())
+                except SyntaxError as e:
+                    if self.errors is None:
+                        raise
+                    # Resume right after the backslash and its code character
+                    self.errors.append(e)
+                    self.column -= self.current - stop
+                    self.current = stop
+                    self.skip_to(min(stop + 2, len(source)), triple)
+                    continue
+                self.advance()
+            elif not triple:
+                self.advance()
+                break
+            elif source.startswith(end * 3, stop):
+                self.current += 3
+                self.column += 3
+                break
             else:
-                result += self.peek()
-            self.advance()
-        if self.is_at_end():
-            raise self.errorat(exceptions.EOF_DURING_STRING, self.column)
-        self.advance()
-        self.add_token_literal(TokenType.STRING, result)
+                chunks.append(end)
+                self.advance()
+        self.add_token_literal(TokenType.STRING, ''.join(chunks))
+
+    def skip_to(self, index: int, multiline: bool = False) -> None:
+        newlines = self.source.count('\n', self.current, index) if multiline else 0
+        if newlines:
+            self.line += newlines
+            self.column = index - self.source.rfind('\n', self.current, index) - 1
+        else:
+            self.column += index - self.current
+        self.current = index
 
     def match_(self, expected: str) -> bool:
         if self.is_at_end():
@@ -292,13 +439,327 @@ class Tokenizer:
         self.tokens.append(Token(
             type,
             text,
-            self.line,
+            self.start_line,
             self.start_column,
             self.current,
             literal
         ))
 
 
-def tokenize(source: str, filename: str = '<unknown>') -> list[Token]:
-    tokenizer = Tokenizer(source, filename)
-    return tokenizer.tokenize()
+class RegexTokenizer(Tokenizer):
+    def iter_tokens(self) -> Iterator[Token]:
+        source = self.source
+        tokens = self.tokens
+        match = TOKEN_PATTERN.match
+        end = len(source)
+        pos = self.current
+        line = self.line
+        line_start = pos - self.column
+        last_column = self.start_column
+        while pos < end:
+            m = match(source, pos)
+            kind = m and m.lastgroup
+            column = pos - line_start
+            if kind == 'identifier':
+                text = m.group()
+                type = KEYWORDS.get(text, TokenType.IDENTIFIER)
+                if type is None:
+                    pos, line, line_start = self.fallback(pos, line, line_start)
+                    last_column = self.start_column
+                    yield from tokens
+                    tokens.clear()
+                    continue
+                pos = m.end()
+                yield Token(type, text, line, column, pos)
+            elif kind == 'whitespace':
+                pos = m.end()
+                column = pos - 1 - line_start
+            elif kind == 'operator':
+                text = m.group()
+                pos = m.end()
+                yield Token(OPERATORS[text], text, line, column, pos)
+            elif kind == 'newline':
+                pos += 1
+                line += 1
+                line_start = pos
+            elif kind == 'number':
+                text = m.group()
+                if text[-1] == '_':
+                    pos, line, line_start = self.fallback(pos, line, line_start)
+                    last_column = self.start_column
+                    yield from tokens
+                    tokens.clear()
+                    continue
+                pos = m.end()
+                if '.' in text:
+                    yield Token(TokenType.DECIMAL, text, line, column, pos, float(text))
+                else:
+                    yield Token(TokenType.INTEGER, text, line, column, pos, int(text))
+            elif kind == 'string':
+                text = m.group()
+                pos = m.end()
+                yield Token(TokenType.STRING, text, line, column, pos, text[1:-1])
+            elif kind == 'raw_string':
+                text = m.group()
+                pos = m.end()
+                yield Token(TokenType.STRING, text, line, column, pos, text[2:-1])
+            elif kind == 'triple_string' or kind == 'raw_triple_string':
+                text = m.group()
+                pos = m.end()
+                prefix = 4 if kind == 'raw_triple_string' else 3
+                yield Token(TokenType.STRING, text, line, column, pos, text[prefix:-3])
+                newlines = text.count('\n')
+                if newlines:
+                    line += newlines
+                    line_start = pos - len(text) + text.rfind('\n') + 1
+            elif kind == 'dots':
+                text = m.group()
+                pos = m.end()
+                if len(text) == 3:
+                    yield Token(TokenType.ELLIPSIS, text, line, column, pos)
+                else:
+                    for _ in range(len(text)):
+                        yield Token(TokenType.DOT, text, line, column, pos)
+            elif kind == 'comment':
+                pos = m.end()
+            else:
+                pos, line, line_start = self.fallback(pos, line, line_start)
+                column = self.start_column
+                yield from tokens
+                tokens.clear()
+            last_column = column
+
+        self.current = pos
+        self.line = line
+        self.column = pos - line_start
+        self.start_column = last_column
+        yield Token(TokenType.EOF, '', line, last_column, pos)
+
+    def fallback(self, pos: int, line: int, line_start: int) -> tuple[int, int, int]:
+        self.start = self.current = pos
+        self.line = self.start_line = line
+        self.start_column = self.column = pos - line_start
+        if self.errors is None:
+            self.scan()
+        else:
+            self.scan_recovering()
+        return self.current, self.line, self.current - self.column
+
+
+# What BytesTokenizer needs, made the first time one is used
+BYTES_TABLES: Optional[tuple[re.Pattern, dict[bytes, tuple[TokenType, str]]]] = None
+
+# Slicing a string token's lexeme down to its contents, by pattern group
+STRING_BOUNDS = {
+    'string':            (1, -1),
+    'raw_string':        (2, -1),
+    'triple_string':     (3, -3),
+    'raw_triple_string': (4, -3),
+}
+
+SCANNER_EOF_ERRORS = (exceptions.EOF_DURING_STRING, exceptions.UNEXPECTED_EOF)
+
+
+def bytes_tables() -> tuple[re.Pattern, dict[bytes, tuple[TokenType, str]]]:
+    global BYTES_TABLES
+    if BYTES_TABLES is None:
+        BYTES_TABLES = (
+            re.compile(TOKEN_PATTERN.pattern.encode('ascii'), re.VERBOSE),
+            {text.encode('ascii'): (type, text) for (text, type) in OPERATORS.items()},
+        )
+    return BYTES_TABLES
+
+
+class BytesTokenizer(Tokenizer):
+    # The regex engine over an encoded buffer (an mmap of the file, usually),
+    # so the source is never decoded as a whole: each lexeme is decoded when
+    # its token is made. Only for encodings where utils.ascii_compatible holds.
+    # Token.index is a byte offset; lines and columns still count characters.
+    source: Any
+    encoding: str
+    names: dict[bytes, str]
+
+    def __init__(self, source: Any, filename: str = '<unknown>', lines: Optional[LineIndex] = None,
+                 errors: Optional[list[SyntaxError]] = None, encoding: str = 'utf-8') -> None:
+        super().__init__(source, filename, LineIndex(source, encoding) if lines is None else lines, errors)
+        self.encoding = encoding
+        # Each distinct name is decoded once, and its tokens share the string
+        self.names = {}
+
+    def iter_tokens(self) -> Iterator[Token]:
+        source = self.source
+        encoding = self.encoding
+        names = self.names
+        tokens = self.tokens
+        pattern, operators = bytes_tables()
+        match = pattern.match
+        end = len(source)
+        pos = self.current
+        line = self.line
+        line_start = pos - self.column
+        # Bytes so far on this line that don't start a character of their own,
+        # for turning byte offsets into columns
+        shift = 0
+        last_column = self.start_column
+        while pos < end:
+            m = match(source, pos)
+            kind = m and m.lastgroup
+            column = pos - line_start - shift
+            if kind == 'identifier':
+                raw = m.group()
+                text = names.get(raw)
+                if text is None:
+                    text = names[raw] = raw.decode('ascii')
+                type = KEYWORDS.get(text, TokenType.IDENTIFIER)
+                if type is None:
+                    pos, line, line_start, shift = self.fallback(pos, line, line_start, shift)
+                    last_column = self.start_column
+                    yield from tokens
+                    tokens.clear()
+                    continue
+                pos = m.end()
+                yield Token(type, text, line, column, pos)
+            elif kind == 'whitespace':
+                pos = m.end()
+                column = pos - 1 - line_start - shift
+            elif kind == 'operator':
+                type, text = operators[m.group()]
+                pos = m.end()
+                yield Token(type, text, line, column, pos)
+            elif kind == 'newline':
+                pos += 1
+                line += 1
+                line_start = pos
+                shift = 0
+            elif kind == 'number':
+                raw = m.group()
+                if raw[-1] == ord('_'):
+                    pos, line, line_start, shift = self.fallback(pos, line, line_start, shift)
+                    last_column = self.start_column
+                    yield from tokens
+                    tokens.clear()
+                    continue
+                pos = m.end()
+                text = raw.decode('ascii')
+                if '.' in text:
+                    yield Token(TokenType.DECIMAL, text, line, column, pos, float(text))
+                else:
+                    yield Token(TokenType.INTEGER, text, line, column, pos, int(text))
+            elif kind in STRING_BOUNDS:
+                raw = m.group()
+                text = raw.decode(encoding)
+                pos = m.end()
+                first, last = STRING_BOUNDS[kind]
+                yield Token(TokenType.STRING, text, line, column, pos, text[first:last])
+                newlines = text.count('\n')
+                if newlines:
+                    line += newlines
+                    line_start = pos - len(raw) + raw.rfind(b'\n') + 1
+                    shift = pos - line_start - (len(text) - text.rfind('\n') - 1)
+                else:
+                    shift += len(raw) - len(text)
+            elif kind == 'dots':
+                text = m.group().decode('ascii')
+                pos = m.end()
+                if len(text) == 3:
+                    yield Token(TokenType.ELLIPSIS, text, line, column, pos)
+                else:
+                    for _ in range(len(text)):
+                        yield Token(TokenType.DOT, text, line, column, pos)
+            elif kind == 'comment':
+                raw = m.group()
+                pos = m.end()
+                # The newline after it still needs its column
+                if not raw.isascii():
+                    shift += len(raw) - len(raw.decode(encoding, 'replace'))
+            else:
+                pos, line, line_start, shift = self.fallback(pos, line, line_start, shift)
+                column = self.start_column
+                yield from tokens
+                tokens.clear()
+            last_column = column
+
+        self.current = pos
+        self.line = line
+        self.column = pos - line_start - shift
+        self.start_column = last_column
+        yield Token(TokenType.EOF, '', line, last_column, pos)
+
+    def fallback(self, pos: int, line: int, line_start: int, shift: int) -> tuple[int, int, int, int]:
+        # Tokenizer.scan works on text, so it gets the decoded rest of the
+        # line; a string that runs past that gets more lines and another go
+        source = self.source
+        column = pos - line_start - shift
+        stop = pos
+        while True:
+            newline = source.find(b'\n', pos + 2 * (stop - pos))
+            stop = len(source) if newline == -1 else newline + 1
+            errors = None if self.errors is None else []
+            scanner = Tokenizer(source[pos:stop].decode(self.encoding), self.filename, self.lines, errors)
+            scanner.line = scanner.start_line = line
+            scanner.column = scanner.start_column = column
+            try:
+                if errors is None:
+                    scanner.scan()
+                else:
+                    scanner.scan_recovering()
+            except SyntaxError as e:
+                if stop < len(source) and e.msg in SCANNER_EOF_ERRORS:
+                    continue
+                raise
+            if stop < len(source) and errors and any(error.msg in SCANNER_EOF_ERRORS for error in errors):
+                continue
+            break
+        text = scanner.source
+        ascii = text.isascii()
+        for token in scanner.tokens:
+            if not ascii:
+                token.index = len(text[:token.index].encode(self.encoding))
+            token.index += pos
+        self.tokens.extend(scanner.tokens)
+        if errors:
+            self.errors.extend(errors)
+        self.start_column = scanner.start_column
+        end = pos + (scanner.current if ascii else len(text[:scanner.current].encode(self.encoding)))
+        if scanner.line != line:
+            line_start = source.rfind(b'\n', pos, end) + 1
+        return end, scanner.line, line_start, end - line_start - scanner.column
+
+
+ENGINES: dict[str, type[Tokenizer]] = {
+    'classic': Tokenizer,
+    'regex': RegexTokenizer,
+}
+
+
+def get_tokenizer(source: str, filename: str = '<unknown>', engine: str = 'regex',
+                  lines: Optional[LineIndex] = None, errors: Optional[list[SyntaxError]] = None) -> Tokenizer:
+    try:
+        klass = ENGINES[engine]
+    except KeyError:
+        raise ValueError(f'No such tokenizer engine named {engine!r}') from None
+    return klass(source, filename, lines, errors)
+
+
+def tokenize(source: str, filename: str = '<unknown>', engine: str = 'regex',
+             lines: Optional[LineIndex] = None) -> list[Token]:
+    return get_tokenizer(source, filename, engine, lines).tokenize()
+
+
+def tokenize_compact(source: str, filename: str = '<unknown>', engine: str = 'regex',
+                     lines: Optional[LineIndex] = None) -> TokenBuffer:
+    return get_tokenizer(source, filename, engine, lines).tokenize_compact()
+
+
+def iter_bytes_tokens(source: Any, filename: str = '<unknown>', encoding: str = 'utf-8', start: int = 0,
+                      lines: Optional[LineIndex] = None,
+                      errors: Optional[list[SyntaxError]] = None) -> Iterator[Token]:
+    # Scanning starts at start, past a byte order mark say
+    tokenizer = BytesTokenizer(source, filename, lines, errors, encoding)
+    tokenizer.start = tokenizer.current = start
+    return tokenizer.iter_tokens()
+
+
+def iter_tokens(source: str, filename: str = '<unknown>', engine: str = 'regex',
+                lines: Optional[LineIndex] = None, errors: Optional[list[SyntaxError]] = None) -> Iterator[Token]:
+    return get_tokenizer(source, filename, engine, lines, errors).iter_tokens()
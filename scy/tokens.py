@@ -1,10 +1,11 @@
 import ast
-from dataclasses import dataclass
-from enum import Enum, auto
-from typing import Any, Optional
+import sys
+from array import array
+from enum import IntEnum, auto
+from typing import Any, Iterable, Iterator, Optional
 
 
-class TokenType(Enum):
+class TokenType(IntEnum):
     # Single-character tokens.
     AT = auto()
     AS = auto()
@@ -14,6 +15,8 @@ class TokenType(Enum):
     RIGHT_PAREN = auto()
     LEFT_BRACE = auto()
     RIGHT_BRACE = auto()
+    LEFT_BRACKET = auto()
+    RIGHT_BRACKET = auto()
     COMMA = auto()
     MINUS = auto()
     PLUS = auto()
@@ -43,6 +46,21 @@ class TokenType(Enum):
     STAR = auto()
     STAR_STAR = auto()
 
+    # Augmented assignment.
+    PLUS_EQUAL = auto()
+    MINUS_EQUAL = auto()
+    STAR_EQUAL = auto()
+    STAR_STAR_EQUAL = auto()
+    AT_EQUAL = auto()
+    SLASH_EQUAL = auto()
+    SLASH_SLASH_EQUAL = auto()
+    PERCENT_EQUAL = auto()
+    AMPERSAND_EQUAL = auto()
+    PIPE_EQUAL = auto()
+    CARET_EQUAL = auto()
+    LESS_LESS_EQUAL = auto()
+    GREATER_GREATER_EQUAL = auto()
+
     # Literals.
     IDENTIFIER = auto()
     STRING = auto()
@@ -83,14 +101,103 @@ class TokenType(Enum):
     EOF = auto()
 
 
-@dataclass(init=True, repr=True)
 class Token:
+    # Written out rather than a dataclass: importing dataclasses (and through it
+    # inspect) would be most of what importing scy costs
+    __slots__ = ('type', 'lexeme', 'line', 'column', 'index', 'literal')
     type: TokenType
     lexeme: str
     line: int
     column: int
     index: int
-    literal: Any = None
+    literal: Any
+
+    def __init__(self, type: TokenType, lexeme: str, line: int, column: int, index: int,
+                 literal: Any = None) -> None:
+        self.type = type
+        self.lexeme = lexeme
+        self.line = line
+        self.column = column
+        self.index = index
+        self.literal = literal
+
+    def __repr__(self) -> str:
+        return (f'Token(type={self.type!r}, lexeme={self.lexeme!r}, line={self.line!r}, '
+                f'column={self.column!r}, index={self.index!r}, literal={self.literal!r})')
+
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (self.type, self.lexeme, self.line, self.column, self.index, self.literal) == \
+            (other.type, other.lexeme, other.line, other.column, other.index, other.literal)
+
+    __hash__ = None
+
+
+# TokenType members indexed by their integer value
+TOKEN_TYPES: tuple[Optional[TokenType], ...] = (None, *TokenType)
+
+UNINTERNED_TYPES = {
+    TokenType.STRING,
+    TokenType.INTEGER,
+    TokenType.DECIMAL,
+}
+
+
+class TokenBuffer:
+    # Struct-of-arrays token storage. Kinds are kept as plain integers, names and
+    # operators share interned lexemes, and a Token is only built when indexed.
+    kinds: array
+    lines: array
+    columns: array
+    indices: array
+    lexemes: list[str]
+    literals: dict[int, Any]
+
+    def __init__(self, tokens: Iterable[Token] = ()) -> None:
+        self.kinds = array('B')
+        self.lines = array('I')
+        self.columns = array('I')
+        self.indices = array('L')
+        self.lexemes = []
+        self.literals = {}
+        self.extend(tokens)
+
+    def append(self, token: Token) -> None:
+        type = token.type
+        lexeme = token.lexeme
+        if type not in UNINTERNED_TYPES:
+            lexeme = sys.intern(lexeme)
+        if token.literal is not None:
+            self.literals[len(self.kinds)] = token.literal
+        self.kinds.append(type)
+        self.lines.append(token.line)
+        self.columns.append(token.column)
+        self.indices.append(token.index)
+        self.lexemes.append(lexeme)
+
+    def extend(self, tokens: Iterable[Token]) -> None:
+        for token in tokens:
+            self.append(token)
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def __getitem__(self, index: int) -> Token:
+        if index < 0:
+            index += len(self.kinds)
+        return Token(
+            TOKEN_TYPES[self.kinds[index]],
+            self.lexemes[index],
+            self.lines[index],
+            self.columns[index],
+            self.indices[index],
+            self.literals.get(index)
+        )
+
+    def __iter__(self) -> Iterator[Token]:
+        for i in range(len(self.kinds)):
+            yield self[i]
 
 
 class TokenGroup:
@@ -176,6 +283,57 @@ KEYWORDS: dict[str, Optional[TokenType]] = {
     'yield':    TokenType.YIELD,
 }
 
+# Fixed-spelling tokens recognized by the table-driven scanner. Dots are left
+# out because '..' has to be split into two DOT tokens.
+OPERATORS: dict[str, TokenType] = {
+    '(':  TokenType.LEFT_PAREN,
+    ')':  TokenType.RIGHT_PAREN,
+    '{':  TokenType.LEFT_BRACE,
+    '}':  TokenType.RIGHT_BRACE,
+    '[':  TokenType.LEFT_BRACKET,
+    ']':  TokenType.RIGHT_BRACKET,
+    ',':  TokenType.COMMA,
+    '-':  TokenType.MINUS,
+    '+':  TokenType.PLUS,
+    '~':  TokenType.TILDE,
+    ';':  TokenType.SEMICOLON,
+    '%':  TokenType.PERCENT,
+    '^':  TokenType.CARET,
+    ':':  TokenType.COLON,
+    '@':  TokenType.AT,
+    '*':  TokenType.STAR,
+    '**': TokenType.STAR_STAR,
+    '!':  TokenType.BANG,
+    '!=': TokenType.BANG_EQUAL,
+    '=':  TokenType.EQUAL,
+    '==': TokenType.EQUAL_EQUAL,
+    '<':  TokenType.LESS,
+    '<=': TokenType.LESS_EQUAL,
+    '<<': TokenType.LESS_LESS,
+    '>':  TokenType.GREATER,
+    '>=': TokenType.GREATER_EQUAL,
+    '>>': TokenType.GREATER_GREATER,
+    '/':  TokenType.SLASH,
+    '//': TokenType.SLASH_SLASH,
+    '&':  TokenType.AMPERSAND,
+    '&&': TokenType.AMPERSAND_AMPERSAND,
+    '|':  TokenType.PIPE,
+    '||': TokenType.PIPE_PIPE,
+    '+=':  TokenType.PLUS_EQUAL,
+    '-=':  TokenType.MINUS_EQUAL,
+    '*=':  TokenType.STAR_EQUAL,
+    '**=': TokenType.STAR_STAR_EQUAL,
+    '@=':  TokenType.AT_EQUAL,
+    '/=':  TokenType.SLASH_EQUAL,
+    '//=': TokenType.SLASH_SLASH_EQUAL,
+    '%=':  TokenType.PERCENT_EQUAL,
+    '&=':  TokenType.AMPERSAND_EQUAL,
+    '|=':  TokenType.PIPE_EQUAL,
+    '^=':  TokenType.CARET_EQUAL,
+    '<<=': TokenType.LESS_LESS_EQUAL,
+    '>>=': TokenType.GREATER_GREATER_EQUAL,
+}
+
 COMPARISON_OPERATORS: dict[TokenType, ast.cmpop] = {
     TokenType.LESS:          ast.Lt,
     TokenType.LESS_EQUAL:    ast.LtE,
@@ -198,10 +356,36 @@ BINARY_OPERATORS: dict[TokenType, ast.operator] = {
     TokenType.PLUS:            ast.Add,
     TokenType.MINUS:           ast.Sub,
     TokenType.PERCENT:         ast.Mod,
+    TokenType.PIPE:            ast.BitOr,
+    TokenType.CARET:           ast.BitXor,
+    TokenType.AMPERSAND:       ast.BitAnd,
+    TokenType.STAR_STAR:       ast.Pow,
+}
+
+AUGMENTED_OPERATORS: dict[TokenType, ast.operator] = {
+    TokenType.PLUS_EQUAL:            ast.Add,
+    TokenType.MINUS_EQUAL:           ast.Sub,
+    TokenType.STAR_EQUAL:            ast.Mult,
+    TokenType.STAR_STAR_EQUAL:       ast.Pow,
+    TokenType.AT_EQUAL:              ast.MatMult,
+    TokenType.SLASH_EQUAL:           ast.Div,
+    TokenType.SLASH_SLASH_EQUAL:     ast.FloorDiv,
+    TokenType.PERCENT_EQUAL:         ast.Mod,
+    TokenType.AMPERSAND_EQUAL:       ast.BitAnd,
+    TokenType.PIPE_EQUAL:            ast.BitOr,
+    TokenType.CARET_EQUAL:           ast.BitXor,
+    TokenType.LESS_LESS_EQUAL:       ast.LShift,
+    TokenType.GREATER_GREATER_EQUAL: ast.RShift,
+}
+
+BOOLEAN_OPERATORS: dict[TokenType, ast.boolop] = {
+    TokenType.PIPE_PIPE:           ast.Or,
+    TokenType.AMPERSAND_AMPERSAND: ast.And,
 }
 
 UNARY_OPERATORS: dict[TokenType, ast.operator] = {
     TokenType.PLUS:  ast.UAdd,
     TokenType.MINUS: ast.USub,
     TokenType.TILDE: ast.Invert,
+    TokenType.BANG:  ast.Not,
 }
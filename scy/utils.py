@@ -1,4 +1,12 @@
 import ast
+import codecs
+import re
+from bisect import bisect_right
+from typing import Any, Optional
+
+# PEP 263 coding declarations, and the lines that may come before one
+CODING_COOKIE = rb'^[ \t\f]*#.*?coding[:=][ \t]*([-\w.]+)'
+BLANK_LINE = rb'^[ \t\f]*(?:[#\r\n]|$)'
 
 
 class NodeCounter(ast.NodeVisitor):
@@ -9,21 +17,119 @@ class NodeCounter(ast.NodeVisitor):
         self.count = 0
 
     def visit(self, node: ast.AST) -> None:
-        self.generic_visit(node)
-        self.count += 1
+        # Walks a list instead of recursing, so trees nested deeper than the
+        # recursion limit can be counted
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            stack.extend(ast.iter_child_nodes(node))
+            self.count += 1
+
+
+class LineIndex:
+    # Start offsets of every line in a source, built the first time a position
+    # or line is asked for. One index is shared by the tokenizer and the parser.
+    # With an encoding, the source is an encoded buffer (bytes or an mmap),
+    # offsets are byte offsets and only the lines asked for get decoded.
+    source: Any
+    encoding: Optional[str]
+    starts: Optional[list[int]]
+
+    def __init__(self, source: Any, encoding: Optional[str] = None) -> None:
+        self.source = source
+        self.encoding = encoding
+        self.starts = None
+
+    def line_starts(self) -> list[int]:
+        if self.starts is None:
+            starts = [0]
+            find = self.source.find
+            newline = '\n' if self.encoding is None else b'\n'
+            index = find(newline)
+            while index != -1:
+                starts.append(index + 1)
+                index = find(newline, index + 1)
+            self.starts = starts
+        return self.starts
+
+    def line_of(self, index: int) -> int:
+        return bisect_right(self.line_starts(), index)
+
+    def position(self, index: int) -> tuple[int, int]:
+        line = self.line_of(index)
+        return line, index - self.starts[line - 1]
+
+    def line_text(self, line: int) -> str:
+        starts = self.line_starts()
+        if not 1 <= line <= len(starts):
+            return ''
+        start = starts[line - 1]
+        end = starts[line] - 1 if line < len(starts) else len(self.source)
+        if self.encoding is not None:
+            return self.source[start:end].decode(self.encoding, 'replace')
+        return self.source[start:end]
+
+
+def detect_encoding(data: Any, filename: str = '<unknown>') -> tuple[str, int]:
+    # Finds a source's encoding the way Python does for its own: a UTF-8 BOM,
+    # or a coding comment on the first line, or on the second after a blank or
+    # comment line. Returns the codec's normal name and the length of the BOM.
+    start = len(codecs.BOM_UTF8) if data[:len(codecs.BOM_UTF8)] == codecs.BOM_UTF8 else 0
+    position = start
+    for lineno in (1, 2):
+        end = data.find(b'\n', position)
+        end = len(data) if end == -1 else end + 1
+        line = data[position:end]
+        position = end
+        match = re.match(CODING_COOKIE, line)
+        if match is not None:
+            name = match.group(1).decode('ascii')
+            try:
+                encoding = codecs.lookup(name).name
+            except LookupError:
+                raise SyntaxError(f'unknown encoding: {name}', (filename, lineno, 1, None)) from None
+            if start and encoding != 'utf-8':
+                raise SyntaxError(f'encoding problem: {name} with BOM', (filename, lineno, 1, None))
+            return encoding, start
+        if not re.match(BLANK_LINE, line):
+            break
+    return 'utf-8', start
+
+
+def ascii_compatible(encoding: str) -> bool:
+    # Whether text in this encoding can be scanned as bytes: every ASCII
+    # character has to be its own byte, which no other character's encoding
+    # may contain. True of UTF-8 and the single-byte encodings.
+    if encoding == 'utf-8':
+        return True
+    try:
+        text = bytes(range(256)).decode(encoding, 'replace')
+    except LookupError:
+        return False
+    return len(text) == 256 and text[:128] == bytes(range(128)).decode('ascii')
 
 
 def find_line(code: str, index: int) -> str:
     start = code.rfind('\n', 0, index) + 1
-    code = code[start:]
-    end = code.find('\n')
+    end = code.find('\n', start)
     if end == -1:
         end = len(code)
-    print(repr(code[:end]))
-    return code[:end]
+    return code[start:end]
 
 
 def count_nodes(tree: ast.AST) -> int:
     counter = NodeCounter()
     counter.visit(tree)
     return counter.count
+
+
+def tree_depth(tree: ast.AST) -> int:
+    # Nodes on the longest path from tree down to a leaf, found without recursion
+    deepest = 0
+    stack = [(tree, 1)]
+    while stack:
+        node, depth = stack.pop()
+        if depth > deepest:
+            deepest = depth
+        stack.extend((child, depth + 1) for child in ast.iter_child_nodes(node))
+    return deepest
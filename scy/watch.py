@@ -0,0 +1,179 @@
+import builtins
+import importlib.util
+import os
+import sys
+import time
+import traceback
+from types import CodeType
+
+from scy import importer
+from scy.parser import parse_tree
+from scy.tokenizer import tokenize
+
+__all__ = ['Watcher', 'watch']
+
+PHASES = ('tokenize', 'parse', 'optimize', 'compile')
+
+
+class WatchLoader(importer.ScyFileLoader):
+    watcher: 'Watcher'
+
+    def __init__(self, fullname: str, path: str, watcher: 'Watcher') -> None:
+        super().__init__(fullname, path)
+        self.watcher = watcher
+
+    def get_code(self, fullname: str) -> CodeType:
+        path = self.get_filename(fullname)
+        return self.watcher.code(path, self.watcher.read(path))
+
+
+class WatchFinder(importer.ScyFinder):
+    watcher: 'Watcher'
+
+    def __init__(self, watcher: 'Watcher') -> None:
+        super().__init__()
+        self.watcher = watcher
+
+    def loader(self, fullname: str, filename: str) -> WatchLoader:
+        return WatchLoader(fullname, filename, self.watcher)
+
+
+class Watcher:
+    # Reruns a script in-process whenever it or a .scy module it imported changes.
+    # Code objects are kept per file and keyed by a hash of the source, so a cycle
+    # only re-parses the files whose content is actually different.
+    script: str
+    interval: float
+    optimize_ast: bool
+    stats: dict[str, tuple[int, int]]
+    codes: dict[str, tuple[bytes, CodeType]]
+    timings: dict[str, float]
+    reparsed: int
+    reused: int
+
+    def __init__(self, script: str, interval: float = 0.5, optimize_ast: bool = False) -> None:
+        self.script = script
+        self.interval = interval
+        self.optimize_ast = optimize_ast
+        self.stats = {}
+        self.codes = {}
+        self.timings = dict.fromkeys(PHASES, 0.0)
+        self.reparsed = 0
+        self.reused = 0
+
+    def read(self, path: str) -> bytes:
+        stat = os.stat(path)
+        self.stats[path] = (stat.st_mtime_ns, stat.st_size)
+        with open(path, 'rb') as fp:
+            return fp.read()
+
+    def code(self, path: str, data: bytes, optimize_ast: bool = False) -> CodeType:
+        key = importlib.util.source_hash(data)
+        cached = self.codes.get(path)
+        if cached is not None and cached[0] == key:
+            self.reused += 1
+            return cached[1]
+        source = importlib.util.decode_source(data)
+        start = time.perf_counter()
+        tokens = tokenize(source, path)
+        tokenized = time.perf_counter()
+        tree = parse_tree(tokens, 'exec', path, source)
+        parsed = optimized = time.perf_counter()
+        if optimize_ast:
+            from scy.optimizer import optimize
+            tree = optimize(tree)
+            optimized = time.perf_counter()
+        code = compile(tree, path, 'exec', dont_inherit=True)
+        end = time.perf_counter()
+        self.timings['tokenize'] += tokenized - start
+        self.timings['parse'] += parsed - tokenized
+        self.timings['optimize'] += optimized - parsed
+        self.timings['compile'] += end - optimized
+        self.codes[path] = (key, code)
+        self.reparsed += 1
+        return code
+
+    def changed(self) -> bool:
+        result = False
+        for path, seen in list(self.stats.items()):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if (stat.st_mtime_ns, stat.st_size) == seen:
+                continue
+            try:
+                data = self.read(path)
+            except OSError:
+                continue
+            cached = self.codes.get(path)
+            if cached is None or cached[0] != importlib.util.source_hash(data):
+                result = True
+        return result
+
+    def run(self) -> None:
+        self.timings = dict.fromkeys(PHASES, 0.0)
+        self.reparsed = self.reused = 0
+        # Modules are executed again every cycle so they see changes in the
+        # modules they import; unchanged ones still come from self.codes
+        for name, module in list(sys.modules.items()):
+            if isinstance(getattr(module, '__loader__', None), WatchLoader):
+                del sys.modules[name]
+        self.stats = {}
+        run_globals = {
+            '__builtins__': builtins,
+            '__name__': '__main__',
+            '__file__': self.script,
+            '__cached__': None,
+            '__doc__': None,
+            '__loader__': None,
+            '__package__': None,
+            '__spec__': None,
+        }
+        start = time.perf_counter()
+        compiling = 0.0
+        try:
+            # Like run mode, -O only applies to the script, not what it imports
+            code = self.code(self.script, self.read(self.script), self.optimize_ast)
+            compiling = sum(self.timings.values())
+            start = time.perf_counter()
+            exec(code, run_globals)
+        except OSError as e:
+            # Keep watching for the script to come back
+            self.stats.setdefault(self.script, (0, 0))
+            print(e, file=sys.stderr)
+        except SystemExit as e:
+            if e.code not in (None, 0):
+                print(f'{self.script} exited with {e.code!r}', file=sys.stderr)
+        except SyntaxError:
+            traceback.print_exc(limit=0)
+        except Exception:
+            traceback.print_exc()
+        end = time.perf_counter()
+        # Imports compiled while the script ran are reported as their own phases
+        run = (end - start) - (sum(self.timings.values()) - compiling)
+        report = ', '.join(f'{phase} {self.timings[phase] * 1000:.2f}ms' for phase in PHASES
+                           if phase != 'optimize' or self.optimize_ast)
+        print(f'[scy] {self.script}: {report}, run {max(run, 0.0) * 1000:.2f}ms '
+              f'({self.reparsed} parsed, {self.reused} cached)', file=sys.stderr)
+
+    def wait(self) -> None:
+        while not self.changed():
+            time.sleep(self.interval)
+        # Editors often truncate and then write, so wait for files to settle
+        time.sleep(self.interval)
+        while self.changed():
+            time.sleep(self.interval)
+
+
+def watch(script: str, interval: float = 0.5, optimize_ast: bool = False) -> int:
+    watcher = Watcher(script, interval, optimize_ast)
+    sys.path[0] = os.path.dirname(os.path.abspath(script))
+    importer.uninstall()
+    importer.install(finder=WatchFinder(watcher))
+    try:
+        while True:
+            watcher.run()
+            watcher.wait()
+    except KeyboardInterrupt:
+        return 0
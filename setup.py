@@ -18,6 +18,7 @@ setup(
     entry_points = {
         'console_scripts': [
             'scy=scy.__main__:main',
+            'scy-client=scy.client:main',
         ],
     },
 )
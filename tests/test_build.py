@@ -0,0 +1,33 @@
+import os
+import tempfile
+import unittest
+
+from scy.build import transpile_file
+
+SOURCE = '''x = -1;
+
+def f(a) {
+    b = a + 1;
+    return b;
+}
+y = f(x);
+'''
+
+
+class LineMapTest(unittest.TestCase):
+    def transpile(self, optimize_ast: bool) -> list:
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'lines.scy')
+            with open(source, 'w', encoding='utf-8') as fp:
+                fp.write(SOURCE)
+            return transpile_file(source, os.path.join(directory, 'lines.py'), optimize_ast=optimize_ast)
+
+    def test_lines_after_folded_constant_are_mapped(self) -> None:
+        # '-1' folds to a constant, which reparses as a unary minus
+        expected = [None, 1, None, 3, 4, 5, 7]
+        self.assertEqual(self.transpile(False), expected)
+        self.assertEqual(self.transpile(True), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
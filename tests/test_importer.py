@@ -0,0 +1,58 @@
+import importlib
+import os
+import sys
+import tempfile
+import unittest
+
+from scy.importer import ScyFinder
+
+
+class FinderTest(unittest.TestCase):
+    def setUp(self) -> None:
+        temp = tempfile.TemporaryDirectory()
+        self.addCleanup(temp.cleanup)
+        self.directory = temp.name
+        self.finder = ScyFinder()
+
+    def write(self, name: str, text: str = '') -> None:
+        path = os.path.join(self.directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as fp:
+            fp.write(text)
+
+    def find(self, name: str) -> object:
+        return self.finder.find_spec(name, [self.directory])
+
+    def test_finds_modules_and_packages(self) -> None:
+        self.write('module.scy')
+        self.write(os.path.join('package', '__init__.scy'))
+        self.assertEqual(self.find('module').origin, os.path.join(self.directory, 'module.scy'))
+        spec = self.find('package')
+        self.assertEqual(spec.submodule_search_locations, [os.path.join(self.directory, 'package')])
+        self.assertIsNone(self.find('missing'))
+
+    def test_python_module_keeps_precedence(self) -> None:
+        self.write('module.scy')
+        self.write('module.py')
+        self.write(os.path.join('package', '__init__.scy'))
+        self.write(os.path.join('package', '__init__.py'))
+        self.assertIsNone(self.find('module'))
+        self.assertIsNone(self.find('package'))
+
+    def test_invalidate_caches_sees_new_files(self) -> None:
+        self.assertIsNone(self.find('late'))
+        self.write('late.scy')
+        # As if the directory's mtime hadn't moved on, which coarse timestamps allow
+        names = self.finder.listings[self.directory][1]
+        self.finder.listings[self.directory] = (os.stat(self.directory).st_mtime, names)
+        self.assertIsNone(self.find('late'))
+        sys.meta_path.insert(0, self.finder)
+        try:
+            importlib.invalidate_caches()
+        finally:
+            sys.meta_path.remove(self.finder)
+        self.assertIsNotNone(self.find('late'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import ast
+import unittest
+from typing import Any
+
+from scy.backend import parse
+
+
+def run(source: str, optimize_ast: bool) -> dict[str, Any]:
+    namespace: dict[str, Any] = {}
+    exec(compile(parse(source, '<test>', optimize_ast=optimize_ast), '<test>', 'exec'), namespace)
+    return namespace
+
+
+def outcome(source: str, expression: str, optimize_ast: bool) -> Any:
+    namespace = run(source, optimize_ast)
+    try:
+        return eval(expression, namespace)
+    except Exception as e:
+        return type(e)
+
+
+class OptimizerTest(unittest.TestCase):
+    def assertSameOutcome(self, source: str, expression: str) -> Any:
+        expected = outcome(source, expression, False)
+        self.assertEqual(outcome(source, expression, True), expected)
+        return expected
+
+    def test_dead_branch_in_class_in_function_keeps_binding(self) -> None:
+        # The binding makes x a class-body name, so it isn't read from f
+        source = 'def f() { x = 1; class A { if (False) { x = 2; } y = x; } return A.y; }\n'
+        self.assertIs(self.assertSameOutcome(source, 'f()'), NameError)
+
+    def test_dead_branch_in_module_level_class_is_dropped(self) -> None:
+        source = 'x = 1;\nclass A { if (False) { x = 2; } y = x; }\n'
+        self.assertEqual(self.assertSameOutcome(source, 'A.y'), 1)
+        tree = parse(source, optimize_ast=True)
+        self.assertFalse(any(isinstance(node, ast.If) for node in ast.walk(tree)))
+
+    def test_star_import_stops_loop_lowering(self) -> None:
+        source = 'from math import *;\ndef f(n) { s = 0; for (i = 0; i < n; i = i + 1) { s = s + i; } return s; }\n'
+        tree = parse(source, optimize_ast=True)
+        self.assertFalse(any(isinstance(node, ast.For) for node in ast.walk(tree)))
+        self.assertEqual(self.assertSameOutcome(source, 'f(10)'), 45)
+
+    def test_walrus_in_comprehension_stops_loop_lowering(self) -> None:
+        # ':=' in a comprehension assigns to f's i, not the comprehension's
+        source = 'def f() { for (i = 0; i < 10; i = i + 1) { z = [i = 100 for (x : range(1))]; } return i; }\n'
+        tree = parse(source, optimize_ast=True)
+        self.assertFalse(any(isinstance(node, ast.For) for node in ast.walk(tree)))
+        self.assertEqual(self.assertSameOutcome(source, 'f()'), 101)
+
+    def test_walrus_in_comprehension_rebinds_bound(self) -> None:
+        source = 'def f(n) { for (i = 0; i < n; i = i + 1) { z = [[n = 0 for (y : range(1))] for (x : range(1))]; } return i; }\n'
+        self.assertEqual(self.assertSameOutcome(source, 'f(5)'), 1)
+
+    def test_short_circuit_keeps_yield(self) -> None:
+        source = 'def g() { return false && (yield 1); }\n'
+        self.assertEqual(self.assertSameOutcome(source, 'type(g()).__name__'), 'generator')
+
+    def test_short_circuit_keeps_binding(self) -> None:
+        # The walrus makes x local to f, even though it never runs
+        source = 'x = 1;\ndef f() { y = false && (x = 2); return x; }\n'
+        self.assertIs(self.assertSameOutcome(source, 'f()'), UnboundLocalError)
+
+    def test_short_circuit_drops_plain_operands(self) -> None:
+        source = 'def f(a) { return true || a; }\n'
+        tree = parse(source, optimize_ast=True)
+        self.assertFalse(any(isinstance(node, ast.BoolOp) for node in ast.walk(tree)))
+        self.assertIs(self.assertSameOutcome(source, 'f(0)'), True)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
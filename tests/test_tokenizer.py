@@ -0,0 +1,36 @@
+import unittest
+
+from scy import exceptions
+from scy.backend import parse_recovering
+from scy.tokenizer import tokenize
+
+ENGINES = ('classic', 'regex')
+
+
+class NumberTest(unittest.TestCase):
+    def assertError(self, source: str, message: str, offset: int) -> None:
+        for engine in ENGINES:
+            with self.subTest(engine=engine):
+                with self.assertRaises(SyntaxError) as context:
+                    tokenize(source, '<test>', engine)
+                self.assertEqual((context.exception.msg, context.exception.offset), (message, offset))
+
+    def test_underscores(self) -> None:
+        self.assertError('1__0', exceptions.DOUBLE_UNDERSCORE_NUMBER, 3)
+        self.assertError('0x1__f', exceptions.DOUBLE_UNDERSCORE_NUMBER, 5)
+        self.assertError('1.5__3', exceptions.DOUBLE_UNDERSCORE_NUMBER, 5)
+        self.assertError('1_.', exceptions.UNDERSCORE_ENDED_NUMBER, 2)
+        self.assertError('1_.5', exceptions.UNDERSCORE_ENDED_NUMBER, 2)
+        self.assertError('1.5_', exceptions.UNDERSCORE_ENDED_NUMBER, 4)
+        for engine in ENGINES:
+            literals = [token.literal for token in tokenize('1_000 0x_f 1_0.2_5 0_0', '<test>', engine)]
+            self.assertEqual(literals[:-1], [1000, 15, 10.25, 0])
+
+    def test_recovering_reports_underscores(self) -> None:
+        _, errors = parse_recovering('w = 1__0;\ny = 1_.;\n', '<test>')
+        self.assertEqual([(e.msg, e.lineno) for e in errors],
+                         [(exceptions.DOUBLE_UNDERSCORE_NUMBER, 1), (exceptions.UNDERSCORE_ENDED_NUMBER, 2)])
+
+
+if __name__ == '__main__':
+    unittest.main()